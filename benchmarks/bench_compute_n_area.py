@@ -0,0 +1,77 @@
+# Benchmark of the vertice clusterarea computation mesh.compute_n_area():
+# vectorized compute_n_area_fast (bincount + cumsum) against the previous
+# python loop over all element vertices, on synthetic meshes of increasing size.
+#
+# usage: python benchmarks/bench_compute_n_area.py [--sizes 10000 100000 ...]
+#                                                  [--nlev 48] [--nrep 3]
+import argparse
+import time
+import numpy as np
+from tripyview.sub_mesh import compute_n_area_fast
+
+
+
+#___SYNTHETIC MESH______________________________________________________________
+# regular lon/lat grid split into triangles, random bottom level per element
+# and random element areas, n2dn ~ npts
+def make_mesh(npts, nlev, seed=0):
+    rng    = np.random.default_rng(seed)
+    nx     = int(np.sqrt(2*npts))
+    ny     = max(2, npts//nx)
+    idx    = np.arange(nx*ny).reshape(ny, nx)
+    a, b   = idx[:-1, :].ravel(), np.roll(idx, -1, axis=1)[:-1, :].ravel()
+    c, d   = idx[1: , :].ravel(), np.roll(idx, -1, axis=1)[1: , :].ravel()
+    e_i    = np.vstack((np.column_stack((a, b, d)), np.column_stack((a, d, c))))
+    e_iz   = rng.integers(2, nlev, e_i.shape[0])
+    e_area = rng.uniform(1.0e6, 1.0e8, e_i.shape[0])
+    return(e_i, e_area, e_iz, nx*ny)
+
+
+
+#___PREVIOUS IMPLEMENTATION (REFERENCE)_________________________________________
+# single loop over e_i.flat, as mesh.compute_n_area() did before vectorization
+def compute_n_area_loop(e_i, e_area, e_iz, nlev, n2dn):
+    e_area_x3 = np.vstack((e_area, e_area, e_area)).transpose().flatten()
+    e_iz_n    = np.vstack((e_iz  , e_iz  , e_iz  )).transpose().flatten()
+    n_area    = np.zeros((nlev, n2dn))
+    count_e   = 0
+    for idx in e_i.flat:
+        iz = e_iz_n[count_e]
+        n_area[:iz, idx] = n_area[:iz, idx] + e_area_x3[count_e]
+        count_e = count_e+1
+    return(n_area/3.0)
+
+
+
+#___TIMING______________________________________________________________________
+def timeit(func, args, nrep):
+    tmin = np.inf
+    for ii in range(nrep):
+        ts     = time.perf_counter()
+        result = func(*args)
+        tmin   = min(tmin, time.perf_counter()-ts)
+    return(result, tmin)
+
+
+
+#_______________________________________________________________________________
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='benchmark compute_n_area_fast against the previous loop')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000],
+                        help='approximate number of vertices of the synthetic meshes')
+    parser.add_argument('--nlev' , type=int, default=48, help='number of full depth levels')
+    parser.add_argument('--nrep' , type=int, default=3 , help='repetitions, minimum time is reported')
+    args = parser.parse_args()
+
+    print('{:>10s} {:>10s} {:>12s} {:>12s} {:>9s} {:>10s}'.format('n2dn', 'n2de', 'loop [s]', 'fast [s]', 'speedup', 'max rerr'))
+    for npts in args.sizes:
+        e_i, e_area, e_iz, n2dn = make_mesh(npts, args.nlev)
+        margs = (e_i, e_area, e_iz, args.nlev, n2dn)
+
+        # compile/warm up caches before timing
+        compute_n_area_fast(*margs)
+
+        ref , t_loop = timeit(compute_n_area_loop, margs, 1)
+        fast, t_fast = timeit(compute_n_area_fast, margs, args.nrep)
+        rerr = np.max(np.abs(fast-ref))/np.max(np.abs(ref))
+        print('{:10d} {:10d} {:12.4f} {:12.4f} {:9.1f} {:10.1e}'.format(n2dn, e_i.shape[0], t_loop, t_fast, t_loop/t_fast, rerr))
@@ -0,0 +1,91 @@
+# Shared fixtures of the tripyview tests: small synthetic global FESOM2 mesh
+# written as ascii mesh files, mesh cache folder in the temporary directory,
+# the same mesh as legacy pickle cache together with one year of data
+import os
+import numpy as np
+import pandas as pd
+import xarray as xr
+import pytest
+import tripyview as tpv
+from tripyview.sub_mesh import pickle, _MESH_DEFAULTS
+
+
+
+#___SYNTHETIC GLOBAL MESH_______________________________________________________
+# regular lon/lat grid over [-180, 180] split into triangles, the elements of
+# the last column connect to the first one --> periodic boundary. Rectangular
+# land areas are removed, one across the periodic boundary
+def _write_global_mesh(path, nx=36, ny=15, nlev=6, seed=0):
+    rng  = np.random.default_rng(seed)
+    dx   = 360.0/nx
+    lon  = -180.0+dx/2+np.arange(nx)*dx
+    lat  = np.linspace(-75.0, 85.0, ny)
+    X, Y = np.meshgrid(lon, lat)
+    idx  = np.arange(nx*ny).reshape(ny, nx)
+    a, b = idx[:-1, :].ravel(), np.roll(idx, -1, axis=1)[:-1, :].ravel()
+    c, d = idx[1: , :].ravel(), np.roll(idx, -1, axis=1)[1: , :].ravel()
+    tris = np.vstack((np.column_stack((a, b, d)), np.column_stack((a, d, c))))
+    ex   = X.ravel()[tris]
+    ex   = np.where(ex.max(axis=1, keepdims=True)-ex>180.0, ex+360.0, ex)
+    ex   = ((ex.mean(axis=1)+180.0) % 360.0)-180.0
+    ey   = Y.ravel()[tris].mean(axis=1)
+    land = ((ex>-60) & (ex<-20) & (ey>-30) & (ey<40)) | ((ex>40) & (ex<60) & (ey>0) & (ey<20)) | \
+           (((ex>165) | (ex<-165)) & (ey>20) & (ey<50))
+    tris = tris[~land]
+
+    # remove vertices that lost all their elements
+    used  = np.unique(tris)
+    remap = np.full(nx*ny, -1)
+    remap[used] = np.arange(used.size)
+    tris, x, y = remap[tris], X.ravel()[used], Y.ravel()[used]
+
+    elvls = rng.integers(3, nlev+1, tris.shape[0])
+    nlvls = np.zeros(used.size, dtype=int)
+    np.maximum.at(nlvls, tris.ravel(), np.repeat(elvls, 3))
+    zlev  = -np.concatenate(([0.0], np.cumsum(np.linspace(10.0, 500.0, nlev-1))))
+
+    with open(os.path.join(path, 'nod2d.out'), 'w') as fid:
+        fid.write('{:d}\n'.format(used.size))
+        for ii in range(used.size): fid.write('{:d} {:.6f} {:.6f} 0\n'.format(ii+1, x[ii], y[ii]))
+    with open(os.path.join(path, 'elem2d.out'), 'w') as fid:
+        fid.write('{:d}\n'.format(tris.shape[0]))
+        for tri in tris+1: fid.write('{:d} {:d} {:d}\n'.format(*tri))
+    with open(os.path.join(path, 'aux3d.out'), 'w') as fid:
+        fid.write('{:d}\n'.format(nlev))
+        for z in zlev: fid.write('{:.2f}\n'.format(z))
+    np.savetxt(os.path.join(path, 'nlvls.out'), nlvls, fmt='%d')
+    np.savetxt(os.path.join(path, 'elvls.out'), elvls, fmt='%d')
+
+
+
+#_______________________________________________________________________________
+@pytest.fixture
+def global_meshpath(tmp_path, monkeypatch):
+    monkeypatch.setenv('MESHPATH_TRIPYVIEW', str(tmp_path/'cache'))
+    meshpath = tmp_path/'mesh'
+    meshpath.mkdir()
+    _write_global_mesh(str(meshpath))
+    return(str(meshpath))
+
+
+
+#___LEGACY CACHE AND DATA_______________________________________________________
+# write mesh as legacy pickle without the attributes that did not exist yet and
+# one year of monthly temperature data on vertices
+@pytest.fixture
+def legacy_mesh(global_meshpath, tmp_path):
+    mesh = tpv.load_mesh_fesom2(global_meshpath, do_pickle=False, do_info=False)
+    for key in _MESH_DEFAULTS.keys(): mesh.__dict__.pop(key, None)
+    with open(os.path.join(global_meshpath, 'tripyview_fesom2_{}_focus0.pckl'.format(mesh.id)), 'wb') as fid:
+        pickle.dump(mesh, fid)
+
+    datapath = tmp_path/'data'
+    datapath.mkdir()
+    rng  = np.random.default_rng(1)
+    temp = rng.normal(10.0, 3.0, size=(12, mesh.n2dn, mesh.nlev-1)).astype('float32')
+    temp[:, np.arange(mesh.nlev-1)[None, :] >= mesh.n_iz[:, None]] = 0.0
+    data = xr.Dataset({'temp':(('time', 'nod2', 'nz1'), temp)},
+                      coords={'time':pd.date_range('2000-01-15', periods=12, freq='MS')})
+    data['temp'].attrs = dict({'description':'temperature', 'units':'degC', 'long_name':'temperature'})
+    data.to_netcdf(str(datapath/'temp.fesom.2000.nc'))
+    return(global_meshpath, str(datapath))
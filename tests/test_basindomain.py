@@ -0,0 +1,53 @@
+# calc_basindomain with the linear boundary tracing has to select the same
+# elements as the previous loop based contour walk, also on perforated meshes
+# with pinch points where the sorting of the boundary edges decides the path.
+import types
+import numpy as np
+from tripyview.sub_mesh import mesh_fesom2
+from tripyview.sub_utility import calc_basindomain, calc_ray_tracing_parallel
+
+
+
+#___PREVIOUS IMPLEMENTATION (REFERENCE)_________________________________________
+# outer coastline of calc_basindomain before the linear boundary tracing
+def _basin_polygon_loop(n_x, n_y, e_i):
+    edge    = np.concatenate((e_i[:,[0,1]], e_i[:,[0,2]], e_i[:,[1,2]]),axis=0)
+    edge    = np.sort(edge,axis=1)
+    edge    = edge[np.lexsort((edge[:,0],edge[:,1])),:]
+    idx     = np.all(np.diff(edge,axis=0)==0,axis=1)
+    idx     = np.logical_or(np.concatenate((idx,[False])),np.concatenate(([False],idx)))
+    bnde    = edge[idx==False,:]
+    maxi    = np.argmax(n_y[bnde].sum(axis=1)/2)
+
+    run_cont = [bnde[maxi,0], bnde[maxi,1]]
+    run_bnde = np.delete(bnde, (maxi), axis=0)
+    for ii in range(0,bnde.shape[0]):
+        kk_r, kk_c = np.where(run_bnde==run_cont[-1])
+        if len(kk_c)==0: return([])
+        run_cont.append(run_bnde[kk_r[0],1-kk_c[0]])
+        run_bnde = np.delete(run_bnde, kk_r[0], axis=0)
+        if run_cont[-1]==run_cont[0]: break
+    return(np.column_stack((n_x[run_cont], n_y[run_cont])))
+
+
+
+#_______________________________________________________________________________
+def test_basindomain_matches_loop(global_meshpath):
+    mesh = mesh_fesom2(global_meshpath, do_augmpbnd=False, do_lsmask=False, do_info=False)
+    rng  = np.random.default_rng(1)
+    for trial in range(40):
+        # perforate the mesh, holes touch each other at single vertices
+        kill = rng.random(mesh.n2dn)<0.15
+        keep = (~kill[mesh.e_i].any(axis=1) | (rng.random(mesh.n2de)<0.3)) & (rng.random(mesh.n2de)>0.05)
+        e_i  = mesh.e_i[keep,:]
+        lon  = rng.uniform(-170, 0)
+        box  = [lon, lon+rng.uniform(40, 150), rng.uniform(-60, 0), rng.uniform(20, 80)]
+        old  = types.SimpleNamespace(nodes_2d_xg=mesh.n_x, nodes_2d_yg=mesh.n_y, elem_2d_i=e_i, n2dea=e_i.shape[0])
+
+        # reference: centroids of box elements inside of the outer coastline
+        e_x, e_y = mesh.n_x[e_i].sum(axis=1)/3, mesh.n_y[e_i].sum(axis=1)/3
+        inbox    = np.where((e_x>=box[0]) & (e_x<=box[1]) & (e_y>=box[2]) & (e_y<=box[3]))[0]
+        polyg    = _basin_polygon_loop(mesh.n_x, mesh.n_y, e_i[inbox,:])
+        inside   = calc_ray_tracing_parallel(np.column_stack((e_x[inbox], e_y[inbox])), polyg,
+                                             np.zeros(inbox.size, dtype=bool))
+        assert np.array_equal(calc_basindomain(old, [box]), inbox[inside])
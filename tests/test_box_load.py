@@ -0,0 +1,28 @@
+# Regional data loads load_data_fesom2(..., box=...) select the data of a
+# regional sub-mesh, they must equal the global load at the selected vertices,
+# also for meshes that were migrated from a legacy pickle cache.
+import numpy as np
+import tripyview as tpv
+
+BOX = [-60, 0, 0, 40]
+
+
+
+#_______________________________________________________________________________
+def test_legacy_pickle_box_load(legacy_mesh):
+    meshpath, datapath = legacy_mesh
+    mesh = tpv.load_mesh_fesom2(meshpath, do_info=False)
+    kwargs = dict(vname='temp', year=2000, depth=100, do_info=False)
+    full = tpv.load_data_fesom2(mesh, datapath, **kwargs)
+    regn = tpv.load_data_fesom2(mesh, datapath, box=BOX, **kwargs)
+    assert regn.sizes['nod2']<full.sizes['nod2']
+    assert np.array_equal(regn['temp'].values, full['temp'].values[regn['nodi'].values], equal_nan=True)
+
+    # index time series of region inside the box
+    kwargs.update(do_tarithm=None)
+    full = tpv.load_data_fesom2(mesh, datapath, **kwargs)
+    regn = tpv.load_data_fesom2(mesh, datapath, box=BOX, **kwargs)
+    box  = [[[-40, -20, 10, 30], 'inner']]
+    ifull = tpv.load_index_fesom2(mesh, full, box)[0]
+    iregn = tpv.load_index_fesom2(mesh, regn, box)[0]
+    assert np.allclose(ifull['temp'].values, iregn['temp'].values)
@@ -0,0 +1,23 @@
+# do_boxmask with spatial index of the mesh (do_sindex=True) has to select the
+# same vertices and elements as the check of all vertices and elements.
+import numpy as np
+import pytest
+from tripyview.sub_mesh import mesh_fesom2
+from tripyview.sub_utility import do_boxmask
+
+BOXES = [[-60, 0, 0, 40], [-175, 175, -80, 80], [150, 200, -20, 60], [-200, -150, 10, 30],
+         [[-30, 10, 20, -30], [-50, -45, 20, 30]]]
+
+
+
+#_______________________________________________________________________________
+@pytest.mark.parametrize('focus', [0, 180])
+def test_boxmask_sindex_matches_full(global_meshpath, focus):
+    mesh = mesh_fesom2(global_meshpath, focus=focus, do_lsmask=False, do_info=False)
+    mesh.compute_sindex()
+    for box in BOXES:
+        for do_elem in [False, True]:
+            mesh.do_sindex = False
+            ref = do_boxmask(mesh, box, do_elem=do_elem)
+            mesh.do_sindex = True
+            assert np.array_equal(do_boxmask(mesh, box, do_elem=do_elem), ref)
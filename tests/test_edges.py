@@ -0,0 +1,47 @@
+# Edge arrays of the mesh, computed when there is no fesom.mesh.diag.nc and
+# loaded from the diag file when it is found in the data directory.
+import os
+import numpy as np
+from netCDF4 import Dataset
+from tripyview.sub_mesh import mesh_fesom2
+
+
+
+#_______________________________________________________________________________
+def test_edges_without_diag(global_meshpath):
+    mesh = mesh_fesom2(global_meshpath, do_lsmask=False, do_info=False)
+    assert mesh.find_meshdiag() is None
+    edge, edge_tri, edge_dxdy_l, edge_dxdy_r = mesh.get_edge_dxdy()
+
+    # every element edge exists once, internal edges are shared by two elements
+    is_bnd = edge_tri[1,:]<0
+    assert 3*mesh.n2de == 2*np.sum(~is_bnd) + np.sum(is_bnd)
+    for ii in range(2):
+        sel = edge_tri[ii,:]>=0
+        tri = mesh.e_i[edge_tri[ii,sel],:]
+        assert np.all((tri==edge[0,sel,None]).any(axis=1) & (tri==edge[1,sel,None]).any(axis=1))
+
+    # no right element on boundary edges, left element always exists
+    assert np.all(edge_dxdy_r[:, is_bnd]==0.0) and np.all(edge_tri[0,:]>=0)
+    assert np.all(np.hypot(*edge_dxdy_l)>0.0)
+
+
+
+#_______________________________________________________________________________
+def test_edges_from_diag_in_datapath(global_meshpath, tmp_path):
+    ref  = mesh_fesom2(global_meshpath, do_lsmask=False, do_info=False).compute_edges()
+    datapath = tmp_path/'data'
+    datapath.mkdir()
+    with Dataset(os.path.join(str(datapath), 'fesom.mesh.diag.nc'), 'w') as fid:
+        fid.createDimension('n2', 2)
+        fid.createDimension('n4', 4)
+        fid.createDimension('edg_n', ref.n2ded)
+        fid.createVariable('edges', 'i4', ('n2', 'edg_n'))[:] = ref.edges+1
+        fid.createVariable('edge_tri', 'i4', ('n2', 'edg_n'))[:] = ref.edge_tri+1
+        fid.createVariable('edge_cross_dxdy', 'f8', ('n4', 'edg_n'))[:] = 2.0*ref.edge_cross_dxdy
+
+    mesh = mesh_fesom2(global_meshpath, do_lsmask=False, do_info=False)
+    assert mesh.find_meshdiag(str(datapath)) == os.path.join(str(datapath), 'fesom.mesh.diag.nc')
+    edge, edge_tri, edge_dxdy_l, edge_dxdy_r = mesh.get_edge_dxdy(do_normvec=True, diagpath=str(datapath))
+    assert np.array_equal(edge, ref.edges) and np.array_equal(edge_tri, ref.edge_tri)
+    assert np.allclose(edge_dxdy_l, 2.0*np.array([ref.edge_cross_dxdy[1,:], -ref.edge_cross_dxdy[0,:]]))
@@ -0,0 +1,21 @@
+# Meshes that are migrated from an old tripyview_fesom2_<id>_focus<N>.pckl cache
+# miss the attributes that were added later, regional sub-meshes have to work 
+# with them anyway.
+import numpy as np
+import tripyview as tpv
+
+BOX = [-60, 0, 0, 40]
+
+
+
+#_______________________________________________________________________________
+def test_legacy_pickle_subset(legacy_mesh):
+    meshpath, datapath = legacy_mesh
+    mesh = tpv.load_mesh_fesom2(meshpath, do_info=False)
+    assert mesh.do_binmesh is False and mesh.e2n_mat is None
+    sub  = mesh.subset(BOX, do_info=False)
+    assert sub.n2dn>0 and np.array_equal(mesh.n_x[sub.n_idx_g], sub.n_x)
+
+    # converted variant is loaded again from the new cache
+    mesh = tpv.load_mesh_fesom2(meshpath, do_info=False)
+    assert mesh.subset(BOX, do_info=False).n2dn==sub.n2dn
@@ -0,0 +1,58 @@
+# npy mesh cache directories that are still read lazily by a process must not
+# be removed by meshcache_evict of an other process, rewriting a cache variant
+# must not disturb a process that reads from it.
+import os
+import sys
+import subprocess
+import numpy as np
+import pytest
+from tripyview import sub_mesh
+from tripyview.sub_mesh import mesh_fesom2, mesh_2npycache, npycache_2mesh
+
+EVICT = 'from tripyview.sub_mesh import meshcache_evict; meshcache_evict(maxsize=0, do_info=False)'
+
+
+
+#_______________________________________________________________________________
+@pytest.fixture
+def npycache(global_meshpath, tmp_path):
+    mesh = mesh_fesom2(global_meshpath, do_lsmask=False, do_info=False)
+    path = tmp_path/'cache'/mesh.id
+    path.mkdir(parents=True)
+    old  = str(path/'tripyview_fesom2_{}_a.npycache'.format(mesh.id))
+    new  = str(path/'tripyview_fesom2_{}_b.npycache'.format(mesh.id))
+    mesh_2npycache(mesh, old)
+    mesh_2npycache(mesh, new)
+    os.utime(old, (1.0e9, 1.0e9))
+    yield(mesh, old, new)
+    for key in [os.path.realpath(old), os.path.realpath(new)]:
+        fid = sub_mesh._NPYCACHE_LOCKS.pop(key, None)
+        if fid is not None: fid.close()
+
+
+
+#_______________________________________________________________________________
+@pytest.mark.skipif(sub_mesh.fcntl is None, reason='needs fcntl file locks')
+def test_evict_skips_cache_read_by_other_process(npycache):
+    mesh, old, new = npycache
+    lazy = npycache_2mesh(old, do_info=False)
+    subprocess.run([sys.executable, '-c', EVICT], check=True, env=os.environ.copy())
+    assert os.path.isdir(old)
+    assert np.array_equal(lazy.n_x, mesh.n_x) and np.array_equal(lazy.e_i, mesh.e_i)
+
+    # without the lock of this process the variant is evicted
+    del lazy
+    sub_mesh._NPYCACHE_LOCKS.pop(os.path.realpath(old)).close()
+    subprocess.run([sys.executable, '-c', EVICT], check=True, env=os.environ.copy())
+    assert not os.path.exists(old) and os.path.isdir(new)
+    assert not any('.evict' in x for x in os.listdir(os.path.dirname(old)))
+
+
+
+#_______________________________________________________________________________
+def test_rewrite_cache_while_read(npycache):
+    mesh, old, new = npycache
+    lazy = npycache_2mesh(old, do_info=False)
+    mesh_2npycache(mesh, old)
+    assert not any('.tmp' in x for x in os.listdir(old))
+    assert np.array_equal(lazy.n_y, mesh.n_y) and np.array_equal(lazy.e_i, mesh.e_i)
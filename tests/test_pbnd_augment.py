@@ -0,0 +1,71 @@
+# Compare the vectorized mesh.pbnd_augment() with the previous loop based
+# implementation on a small synthetic global mesh.
+import copy
+import numpy as np
+import pytest
+from tripyview.sub_mesh import mesh_fesom2
+
+
+
+#___PREVIOUS IMPLEMENTATION (REFERENCE)_________________________________________
+# mesh.pbnd_augment() before vectorization, loop over periodic boundary elements
+def _pbnd_augment_loop(self):
+    self.do_augmpbnd = True
+    n_pbnd_i = np.array(self.e_i[self.e_pbnd_1,:]).flatten()
+    n_pbnd_i = np.unique(n_pbnd_i)
+
+    xmin, xmax = self.n_x.min(), self.n_x.max()
+    aux_i      = np.argwhere(self.n_x[n_pbnd_i]>(xmin+(xmax-xmin)/2) ).ravel()
+    n_pbnd_i_r = n_pbnd_i[aux_i]
+    aux_i      = np.argwhere(self.n_x[n_pbnd_i]<(xmin+(xmax-xmin)/2) ).ravel()
+    n_pbnd_i_l = n_pbnd_i[aux_i]
+    self.n_pbnd_a   = np.hstack((n_pbnd_i_r,n_pbnd_i_l))
+    nn_il,nn_ir= n_pbnd_i_l.size, n_pbnd_i_r.size
+
+    aux_pos    = np.zeros(self.n2dn,dtype='uint32')
+    aux_i      = np.linspace(self.n2dn,self.n2dn+nn_ir-1,nn_ir,dtype='uint32')
+    aux_pos[n_pbnd_i_r] =aux_i
+    aux_i      = np.linspace(self.n2dn+nn_ir,self.n2dn+nn_ir+nn_il-1,nn_il,dtype='uint32')
+    aux_pos[n_pbnd_i_l]= aux_i
+
+    xmin, xmax= np.floor(xmin),np.ceil(xmax)
+    self.n_xa = np.concatenate((np.zeros(nn_ir)+xmin, np.zeros(nn_il)+xmax))
+    self.n_ya = self.n_y[self.n_pbnd_a]
+    self.n_za = self.n_z[self.n_pbnd_a]
+    self.n_iza= self.n_iz[self.n_pbnd_a]
+    if isinstance(self.n_c , np.ndarray): self.n_ca  = self.n_c[self.n_pbnd_a]
+    if isinstance(self.n_ic, np.ndarray): self.n_ica = self.n_ic[self.n_pbnd_a]
+    self.n2dna = self.n2dn + self.n_pbnd_a.size
+
+    elem_pbnd_l = np.copy(self.e_i[self.e_pbnd_1,:])
+    elem_pbnd_r = np.copy(elem_pbnd_l)
+    for ei in range(0,self.e_pbnd_1.size):
+        tri  = np.array(self.e_i[self.e_pbnd_1[ei],:]).squeeze()
+        idx_l = np.where(self.n_x[tri].squeeze()<xmin+(xmax-xmin)/2)[0]
+        idx_r = np.where(self.n_x[tri].squeeze()>xmin+(xmax-xmin)/2)[0]
+        elem_pbnd_l[ei,idx_r]=aux_pos[tri[idx_r]]
+        elem_pbnd_r[ei,idx_l]=aux_pos[tri[idx_l]]
+
+    self.e_ia     = np.vstack((elem_pbnd_r,elem_pbnd_l))
+    self.e_pbnd_a = np.hstack((self.e_pbnd_1,self.e_pbnd_1))
+    self.n2dea    = self.n2de + elem_pbnd_r.shape[0]
+    return(self)
+
+
+
+#_______________________________________________________________________________
+@pytest.mark.parametrize('focus', [0, 180])
+def test_pbnd_augment_matches_loop(global_meshpath, focus):
+    mesh = mesh_fesom2(global_meshpath, focus=focus, do_augmpbnd=False,
+                       do_lsmask=False, do_info=False)
+    assert mesh.e_pbnd_1.size>0
+    ref  = _pbnd_augment_loop(copy.deepcopy(mesh))
+    new  = copy.deepcopy(mesh).pbnd_augment()
+
+    assert np.array_equal(new.n_pbnd_a, ref.n_pbnd_a)
+    assert np.array_equal(new.n_xa    , ref.n_xa    )
+    assert np.array_equal(new.e_ia    , ref.e_ia    )
+    assert np.array_equal(new.e_pbnd_a, ref.e_pbnd_a)
+    assert np.array_equal(new.n_ya    , ref.n_ya    )
+    assert np.array_equal(new.n_iza   , ref.n_iza   )
+    assert (new.n2dna, new.n2dea)==(ref.n2dna, ref.n2dea)
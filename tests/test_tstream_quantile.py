@@ -0,0 +1,50 @@
+# Streaming median/pXX (do_tstream=True) merges the histograms of the time
+# blocks (files), it has to be close to the exact quantile of the entire time
+# series also when the distribution changes from block to block.
+import numpy as np
+import xarray as xr
+import dask.array as da
+import pytest
+from tripyview.sub_data import do_time_arithmetic_stream
+
+
+
+#_______________________________________________________________________________
+@pytest.fixture(scope='module')
+def tseries():
+    rng  = np.random.default_rng(0)
+    nt   = 60
+    t    = np.arange(nt)[:, None]
+    data = 3.0*rng.standard_normal((nt, 2000)) + 0.08*t + 2.0*np.sin(2*np.pi*t/12)
+    data = data.astype(np.float32)
+    data[rng.random(data.shape)<0.05] = np.nan
+    data[:, :5], data[:, 5:10] = np.nan, 1.5
+    return(data)
+
+
+
+#_______________________________________________________________________________
+@pytest.mark.parametrize('do_tarithm', ['median', 'p90', 'p10', 'p99', 'p0', 'p100'])
+def test_tstream_quantile(tseries, do_tarithm):
+    data = xr.Dataset({'temp':(('time', 'nod2'), da.from_array(tseries, chunks=(12, 1000)))})
+    out, str_atim = do_time_arithmetic_stream(data, do_tarithm)
+    q    = 0.5 if do_tarithm=='median' else float(do_tarithm[1:])/100.0
+    ref  = np.nanquantile(tseries.astype(np.float64), q, axis=0)
+    aux  = out['temp'].values
+    assert str_atim==do_tarithm and aux.dtype==np.float32
+    assert np.array_equal(np.isnan(aux), np.isnan(ref))
+    assert np.nanmax(np.abs(aux-ref)) < 0.1
+
+
+
+#_______________________________________________________________________________
+def test_tstream_quantile_constant_blocks():
+    # blocks that are constant in time have single valued histograms
+    aux  = np.zeros((36, 3), dtype=np.float32)
+    aux[:12], aux[12:24], aux[24:] = 1.5, 3.0, np.linspace(-1.0, 5.0, 12)[:, None]
+    aux[:, 2]  = np.nan
+    aux[30, 2] = 2.0
+    data = xr.Dataset({'temp':(('time', 'nod2'), da.from_array(aux, chunks=(12, 3)))})
+    for do_tarithm, q in [('median', 0.5), ('p10', 0.1), ('p90', 0.9)]:
+        out, _ = do_time_arithmetic_stream(data, do_tarithm)
+        assert np.allclose(out['temp'].values, np.nanquantile(aux, q, axis=0), atol=0.02)
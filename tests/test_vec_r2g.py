@@ -0,0 +1,30 @@
+# vec_r2g rotates along the given dimension of the points, for multi
+# dimensional input the dimension can not be guessed (e.g. ntime==npts).
+import numpy as np
+import dask.array as da
+import pytest
+from tripyview.sub_mesh import vec_r2g, vec_r2g_coeff
+
+ABG = [50.0, 15.0, -90.0]
+
+
+
+#_______________________________________________________________________________
+def test_vec_r2g_axis():
+    rng        = np.random.default_rng(0)
+    lon, lat   = rng.uniform(-180, 180, 12), rng.uniform(-80, 80, 12)
+    rcoef      = vec_r2g_coeff(ABG, lon, lat)
+    urot, vrot = rng.standard_normal((12, 12)), rng.standard_normal((12, 12))
+    with pytest.raises(ValueError):
+        vec_r2g(ABG, None, None, urot, vrot, rcoef=rcoef)
+
+    # every time step [ntime x npts] is rotated like the 1d points
+    ugeo, vgeo = vec_r2g(ABG, None, None, urot, vrot, rcoef=rcoef, axis=1)
+    for it in range(urot.shape[0]):
+        u1d, v1d = vec_r2g(ABG, lon, lat, urot[it], vrot[it])
+        assert np.allclose(ugeo[it], u1d) and np.allclose(vgeo[it], v1d)
+
+    # same for lazy dask arrays chunked along the points
+    udask, vdask = vec_r2g(ABG, None, None, da.from_array(urot, chunks=(5, 5)),
+                           da.from_array(vrot, chunks=(5, 5)), rcoef=rcoef, axis=1)
+    assert np.allclose(udask.compute(), ugeo) and np.allclose(vdask.compute(), vgeo)
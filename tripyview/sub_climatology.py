@@ -60,10 +60,10 @@ def load_climatology(mesh, datapath, vname, depth=None, depidx=False,
         #data_depth = data_depth.expand_dims({dim_lat:data[coord_lat].data, 
                                              #dim_lon:data[coord_lon].data}
                                             #).transpose(dim_zlev,dim_lat,dim_lon)
-        data_depth = data[coord_zlev].expand_dims(
-                        dict({dim_lat:data[coord_lat].data, dim_lon:data[coord_lon].data})
-                        ).transpose(dim_zlev,dim_lat,dim_lon)
-        data[vname_temp].data = sw.ptmp(data[vname_salt].data, data[vname_temp].data, data_depth )
+        # depth stays 1d along the vertical axis, no full size depth field
+        data_depth = data[coord_zlev].values
+        zaxis      = data[vname_temp].dims.index(dim_zlev)
+        data[vname_temp].data = eos_unesco(data[vname_salt].data, data[vname_temp].data, data_depth, which='ptmp', axis=zaxis)
         
     #___________________________________________________________________________
     # if there are multiple variables, than kick out varaible that is not needed
@@ -75,7 +75,7 @@ def load_climatology(mesh, datapath, vname, depth=None, depidx=False,
         elif vname == 'sigma3' : pref=3000
         elif vname == 'sigma4' : pref=4000
         elif vname == 'sigma5' : pref=5000
-        data = data.assign({vname: (list(data.dims), sw.pden(data[vname_salt].data, data[vname_temp].data, data_depth, pref)-1000.025)})
+        data = data.assign({vname: (list(data[vname_temp].dims), eos_unesco(data[vname_salt].data, data[vname_temp].data, data_depth, pref, which='pden', axis=zaxis, rhooff=1000.025))})
         #for labels in vname_drop:
         data = data.drop(labels=vname_drop)
         data[vname].attrs['units'] = 'kg/m^3'
@@ -2,9 +2,20 @@
 import numpy as np
 import time  as clock
 import os
+import glob
+import warnings
+import json
+import shutil
+import hashlib
+import weakref
 import xarray as xr
+from xarray.backends.locks import HDF5_LOCK, NETCDFC_LOCK, combine_locks
+from xarray.backends.file_manager import CachingFileManager
+import dask
+import dask.array as da
 import netCDF4 as nc
 import seawater as sw
+from numba import njit, prange
 from .sub_mesh import *
 xr.set_options(enable_cftimeindex=True)
 # ___LOAD FESOM2 DATA INTO XARRAY DATASET CLASS________________________________
@@ -17,14 +28,20 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
                      do_tarithm='mean', do_zarithm='mean', do_ie2n=True,
                      do_vecrot=True, do_filename=None, do_file='run', do_info=True, 
                      do_compute=True, descript='',  runid='fesom', chunks={'time':100, 'elem':1e4, 'nod2':1e4},
-                     do_showtime=False, 
-                     **kwargs):
+                     do_showtime=False, do_cache=False, do_tstream=False, box=None,
+                     do_catalog=False, **kwargs):
     """
     ---> load FESOM2 data:
     ___INPUT:___________________________________________________________________
     mesh        :   fesom2 mesh object,  with all mesh information 
     datapath    :   str, path that leads to the FESOM2 data
-    vname       :   str, (default: None), variable name that should be loaded
+    vname       :   str, list (default: None), variable name that should be loaded. 
+                    A list of variable names and derived variable recipes 
+                    (vname_new, func, [vname_in, ...]) loads all variables in a 
+                    single pass, every file set is opened once and coordinates,
+                    weights and selections are shared, e.g. 
+                    ['u', 'v', ('speed', lambda u, v: np.sqrt(u**2+v**2), ['u','v'])]
+                    Variables must be on the same horizontal grid
     year        :   int, list, np.array, range, default: None, single year or 
                     list/array of years whos file should be opened
     mon         :   list, (default=None), specific month that should be selected 
@@ -43,7 +60,14 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     do_nan      :   bool (default=True), do replace bottom fill values with nan                
     do_tarithm  :   str (default='mean') do time arithmetic on time selection
                     option are: None, 'None', 'mean', 'median', 'std', 'var', 'max'
-                    'min', 'sum'
+                    'min', 'sum', 'pXX' (XX-th percentile e.g. 'p90')
+    do_tstream  :   bool (default=False), do time arithmetic file by file with 
+                    running accumulators (sum, count, min, max, Welford 
+                    mean/variance) instead of holding the entire time series of 
+                    every spatial block in memory, peak memory is about one 
+                    yearly file. 'median' and 'pXX' are approximated from 
+                    mergeable histograms (error is a fraction of (max-min)/256), 
+                    see do_time_arithmetic_stream
     do_zarithm  :   str (default='mean') do arithmetic on selected vertical layers
                     options are: None, 'None', 'mean', 'max', 'min', 'sum'
     do_ie2n     :   bool (default=True), if data are on elements automatically 
@@ -64,6 +88,23 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     descript    :   str (default=''), string to describe dataset is written into 
                     variable attributes
     runid       :   str (default='fesom'), runid of loaded data                
+    do_cache    :   bool (default=False), store the final result in a persistent
+                    on-disk cache and load it from there when load_data_fesom2 
+                    is called again with the same arguments and unchanged input 
+                    files. Cache is in DATAPATH_TRIPYVIEW (default: 
+                    ~/datacache_tripyview) and least recently used results are 
+                    removed when it exceeds DATAPATH_TRIPYVIEW_MAXSIZE (in GB, 
+                    default: 20), see datacache_evict
+    do_catalog  :   bool (default=False), assemble the lazy dataset from the 
+                    run catalog (see build_catalog_fesom2) instead of opening 
+                    the header of every file with xr.open_mfdataset. The catalog 
+                    is built at the first use and updated for changed files
+    box         :   list, (default=None), load only the data of a region given 
+                    as box [lonmin, lonmax, latmin, latmax], polygon, shapefile 
+                    or boolean vertice mask [n2dn] (see do_boxmask). Data are 
+                    loaded on the regional sub-mesh mesh.subset(box) and from 
+                    each file only the contiguous index runs of the region are 
+                    read. Coordinates nodi/elemi hold the global indices
     ___RETURNS:_________________________________________________________________
     data        :   object, returns xarray dataset object
     """
@@ -78,6 +119,10 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     str_ldep, str_ltim = '', '' # string for labels
     str_lsave = ''    
     xr.set_options(keep_attrs=True)
+    #___________________________________________________________________________
+    # load only region --> continue with regional sub-mesh
+    if box is not None: mesh = do_boxmesh(mesh, box)
+    
     #___________________________________________________________________________
     # Create xarray dataset object with all grid information 
     if vname in ['depth', 'topo', 'topography','zcoord', 'narea', 'n_area', 'clusterarea', 'scalararea'
@@ -148,7 +193,12 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     #___________________________________________________________________________    
     # analyse vname input if vector data should be load  "vec+vnameu+vnamev"
     vname2, vname_tmp = None, None
-    if ('vec' in vname) or ('norm' in vname):
+    vname_keep, vname_load, recipes = None, None, []
+    # list of variables and derived variables is loaded in a single pass
+    if isinstance(vname, (list, tuple)):
+        vname_keep, vname_load, recipes = do_vname_list(vname)
+        vname = vname_load[0]
+    elif ('vec' in vname) or ('norm' in vname):
         if ('vec'  in vname): do_vec =True
         if ('norm' in vname): do_norm=True
         aux = vname.split('+')
@@ -160,46 +210,76 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
         do_pdens=True 
         vname_tmp = vname
         vname, vname2 = 'temp', 'salt'
+    if vname_load is None: vname_load = [vname] if vname2 is None else [vname, vname2]
         
     #___________________________________________________________________________
-    # create path name list that needs to be loaded
+    # create path name list that needs to be loaded, variables that are in the 
+    # same files (e.g. do_filename) share the file set 
     pathlist, str_ltim = do_pathlist(year, datapath, do_filename, do_file, vname, runid)
+    pathlists = [do_pathlist(year, datapath, do_filename, do_file, vname_i, runid)[0] for vname_i in vname_load]
+    pathlists = [pathlist_i for ii, pathlist_i in enumerate(pathlists) if pathlist_i not in pathlists[:ii]]
+    
+    #___________________________________________________________________________
+    # look for result in persistent cache, key contains all arguments that 
+    # change the result together with size and mtime of input files
+    if do_cache:
+        cachefname = do_datacache_fname(mesh, pathlists,
+                                        [datapath, vname, vname2, vname_tmp, vname_load, recipes, year, mon, day, record, depth, depidx, do_nan, 
+                                         do_tarithm, do_zarithm, do_ie2n, do_vecrot, do_filename, do_file, descript, runid, 
+                                         do_tstream, kwargs])
+        data = do_datacache_load(cachefname, do_compute, do_info)
+        if data is not None: return(data)
+        
+    #___________________________________________________________________________
+    # open the vertical levels as separate blocks when depth is selected, so 
+    # that after the level selection at reading, see do_select_levidx_read, 
+    # only the blocks of the selected nz1/nz slices are read from the files
+    if depth is not None: chunks = dict(chunks, nz1=1, nz_1=1, nz=1)
+    
+    # open sub-mesh data in blocks aligned to the index runs of the region, 
+    # so that only blocks within the region are read, see do_select_submesh 
+    chunks_sub = do_chunks_submesh(mesh, chunks, pathlist)
     
     #___________________________________________________________________________
     # load multiple files
     # load normal FESOM2 run file
     if do_file=='run':
-        data = xr.open_mfdataset(pathlist, parallel=True, chunks=chunks, **kwargs)
+        data = do_open_mfdataset(pathlists[0], chunks_sub, do_catalog, do_info, **kwargs)
         if do_showtime: print(data.time.data)
-        # in case of vector load also meridional data and merge into 
-        # dataset structure
-        if do_vec or do_norm or do_pdens:
-            pathlist, dum = do_pathlist(year, datapath, do_filename, do_file, vname2, runid)
-            data     = xr.merge([data, xr.open_mfdataset(pathlist,  parallel=True, chunks=chunks, **kwargs)])
-            if do_vec: is_data='vector'
+        # in case of vector, density or multi variable load also the other 
+        # file sets and merge into dataset structure, each file set is opened 
+        # only once
+        for pathlist_i in pathlists[1:]:
+            data     = xr.merge([data, do_open_mfdataset(pathlist_i, chunks_sub, do_catalog, do_info, **kwargs)])
+        if do_vec: is_data='vector'
         
-        data = data.chunk({'time': data.sizes['time']})
+        # streaming time arithmetic keeps time chunks of the files
+        if not do_tstream: data = data.chunk({'time': data.sizes['time']})
         
     # load restart or blowup files
     else:
         print(pathlist)
-        data = xr.open_mfdataset(pathlist, parallel=True, chunks=chunks, **kwargs)
-        if do_vec or do_norm or do_pdens:
-            # which variables should be dropped 
-            vname_drop = list(data.keys())
-            print(' > var in file:', vname_drop)
-            vname_drop.remove(vname)
-            vname_drop.remove(vname2)
-            
-        else:    
-            # which variables should be dropped 
-            vname_drop = list(data.keys())
-            print(' > var in file:', vname_drop)
-            vname_drop.remove(vname)
+        data = do_open_mfdataset(pathlist, chunks_sub, do_catalog, do_info, **kwargs)
+        # which variables should be dropped 
+        vname_drop = list(data.keys())
+        print(' > var in file:', vname_drop)
+        for vname_i in vname_load: vname_drop.remove(vname_i)
             
         # remove variables that are not needed
         data = data.drop(labels=vname_drop)
     
+    if ('nod2' in data.dims) and ('elem' in data.dims):
+        raise ValueError(' variables {} are on vertices and elements, they can not be loaded together'.format(str(vname_load)))
+    
+    #___________________________________________________________________________
+    # select only the vertices/elements of regional sub-mesh, see mesh.subset()
+    data = do_select_submesh(mesh, data, chunks)
+    
+    #___________________________________________________________________________
+    # select already at reading the levels that are needed for the depth 
+    # interpolation, so that only these slices are read from the files
+    data = do_select_levidx_read(data, mesh, depth, depidx)
+    
     #___________________________________________________________________________    
     # add depth axes since its not included in restart and blowup files
     # also add weights
@@ -212,7 +292,8 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     
     # do time arithmetic on data
     if 'time' in data.dims:
-        data, str_atim = do_time_arithmetic(data, do_tarithm)
+        if do_tstream: data, str_atim = do_time_arithmetic_stream(data, do_tarithm)
+        else         : data, str_atim = do_time_arithmetic(data, do_tarithm)
     
     #___________________________________________________________________________
     # make sure datas are alligned in [time, elem, nz] and not [time, nz, elem]
@@ -301,6 +382,10 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     if do_pdens and depth is None: 
         data, vname = do_potential_desnsity(data, do_pdens, vname, vname2, vname_tmp)
     
+    #___________________________________________________________________________
+    # compute derived variables of multi variable load
+    data = do_derived_vars(data, recipes, vname_keep)
+    
     #___________________________________________________________________________
     # interpolate from elements to node
     if ('elem' in list(data.dims)) and do_ie2n: is_ie2n=True
@@ -323,6 +408,10 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
     #___________________________________________________________________________
     if do_compute: data = data.compute()
     
+    #___________________________________________________________________________
+    # store result in persistent cache
+    if do_cache: data = do_datacache_save(data, cachefname, do_compute, do_info)
+    
     #___________________________________________________________________________
     if do_info: 
         info_txt ="""___FESOM2 DATA INFO________________________
@@ -349,6 +438,477 @@ def load_data_fesom2(mesh, datapath, vname=None, year=None, mon=None, day=None,
 
 
     
+# ___LOAD SEVERAL EXPERIMENTS CONCURRENTLY_____________________________________
+#| load a list of experiments (e.g. input_paths + reference run) with shared   |
+#| load_data_fesom2 arguments in a bounded pool of worker threads or processes.|
+#| The loads do not depend on each other, results are returned in input order. |
+#| netcdf/hdf5 is not thread safe and xarray only locks the reading not the    |
+#| opening of files. Therefore with threads the files of all experiments are   |
+#| opened one after the other and only the computation runs concurrently (the  |
+#| reading itself stays serialized by the hdf5 lock, what overlaps is the      |
+#| arithmetic). With processes the loads are fully independent, the mesh is    |
+#| sent only once to every worker and all arguments must be picklable (no      |
+#| lambda in vname recipes). The workers are spawned, every worker imports     |
+#| tripyview and re-imports the __main__ module of the caller, that costs a    |
+#| few seconds per worker and a script must protect its top level code with    |
+#| if __name__=='__main__':. Processes pay off only for long loads.            |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
+#| input_list   :   list, entries can be                                       |
+#|                  - (datapath, descript)                                     |
+#|                  - (datapath, descript, dict) dict overwrites the shared    |
+#|                    arguments for this entry, e.g. dict(year=[1958,1967])    |
+#|                    for the reference run                                    |
+#| nworker      :   int, (default: 4) maximum number of concurrent loads       |
+#| do_process   :   bool, (default: False) use worker threads, True use worker |
+#|                  processes (see above)                                      |
+#| do_info      :   bool, (default: True) print timing of every experiment     |
+#| **kwargs     :   shared arguments of load_data_fesom2, do_info of the single|
+#|                  loads is False unless set by the dict of an entry          |
+#| ___RETURNS_______________________________________________________________   |
+#| data_list    :   list, xarray datasets in the order of input_list           |
+#|_____________________________________________________________________________|
+def load_datalist_fesom2(mesh, input_list, nworker=4, do_process=False, do_info=True, 
+                         **kwargs):
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+    import multiprocessing
+    
+    #___________________________________________________________________________
+    # arguments of every single load
+    task_list = []
+    for entry in input_list:
+        datapath, descript = entry[0], entry[1]
+        loadargs = dict(kwargs, descript=descript, do_info=False)
+        if len(entry)>2: loadargs.update(entry[2])
+        task_list.append((datapath, loadargs))
+    if len(task_list)==0: return([])
+    
+    #___________________________________________________________________________
+    ts = clock.time()
+    nworker = max(1, min(nworker, len(task_list)))
+    if do_process:
+        # spawn instead of fork, a forked child can inherit locks that are held
+        # by netcdf/dask threads of the parent and hang
+        pool = ProcessPoolExecutor(max_workers=nworker, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_datalist_initworker, initargs=(mesh,))
+        job_list = [pool.submit(_datalist_runtask, task) for task in task_list]
+    else:
+        # open all lazy one after the other, afterwards compute concurrently
+        data_list, time_list = [], []
+        for datapath, loadargs in task_list:
+            tjob = clock.time()
+            data_list.append(load_data_fesom2(mesh, datapath, **dict(loadargs, do_compute=False)))
+            time_list.append(clock.time()-tjob)
+        pool     = ThreadPoolExecutor(max_workers=nworker)
+        job_list = [pool.submit(_datalist_computetask, data, loadargs.get('do_compute', True), topen) 
+                    for data, topen, (datapath, loadargs) in zip(data_list, time_list, task_list)]
+    
+    #___________________________________________________________________________
+    # collect in input order, on error cancel what did not start yet
+    data_list, time_list = [], []
+    try:
+        for job in job_list:
+            data, tjob = job.result()
+            data_list.append(data)
+            time_list.append(tjob)
+    finally:
+        for job in job_list: job.cancel()
+        pool.shutdown(wait=True)
+    
+    #___________________________________________________________________________
+    if do_info:
+        for ii, (datapath, loadargs) in enumerate(task_list):
+            print(' > load {:d}/{:d} {:s}: {:3.2f} sec'.format(ii+1, len(task_list), str(loadargs['descript']), time_list[ii]))
+        print(' > total: {:3.2f} sec with {:d} {:s}, sum of single loads: {:3.2f} sec'.format(
+              clock.time()-ts, nworker, 'processes' if do_process else 'threads', sum(time_list)))
+    
+    #___________________________________________________________________________
+    return(data_list)
+
+
+# mesh of worker process, is set once by the pool initializer
+_DATALIST_MESH = None
+def _datalist_initworker(mesh):
+    global _DATALIST_MESH
+    _DATALIST_MESH = mesh
+
+
+def _datalist_runtask(task):
+    ts = clock.time()
+    datapath, loadargs = task
+    data = load_data_fesom2(_DATALIST_MESH, datapath, **loadargs)
+    return(data, clock.time()-ts)
+
+
+def _datalist_computetask(data, do_compute, topen):
+    ts = clock.time()
+    if do_compute: 
+        data = data.compute()
+        # attributes were written by the lazy load
+        for vname in data.data_vars:
+            if 'do_compute' in data[vname].attrs: data[vname].attrs['do_compute'] = str(True)
+    return(data, topen + clock.time()-ts)
+
+
+
+# ___PATH OF RESULT IN PERSISTENT DATA CACHE__________________________________
+#| cache key is a hash of the normalized arguments of load_data_fesom2, the    |
+#| mesh variant (also sub-mesh) and path, size and mtime of all input files    |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
+#| pathlists    :   list of list, paths of all input files                     |
+#| args         :   list, all arguments that change the result                 |
+#| ___RETURNS_______________________________________________________________   |
+#| cachefname   :   str, path of *.nc file in cache folder                     |
+#|_____________________________________________________________________________|
+def do_datacache_fname(mesh, pathlists, args):
+    cachepath = os.environ.get('DATAPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "datacache_tripyview"))
+    
+    #___________________________________________________________________________
+    # input files, do_filename can also be a glob pattern
+    finfo = []
+    for pathlist in pathlists:
+        if isinstance(pathlist, str): pathlist = sorted(glob.glob(pathlist)) or [pathlist]
+        for fpath in pathlist:
+            try   : fstat = os.stat(fpath)
+            except OSError: finfo.append([os.path.abspath(fpath)]); continue
+            finfo.append([os.path.abspath(fpath), fstat.st_size, fstat.st_mtime_ns])
+    
+    #___________________________________________________________________________
+    # mesh variant
+    n_idx_g = getattr(mesh, 'n_idx_g', None)
+    minfo   = [mesh.id, int(mesh.n2dn), int(mesh.n2de), str(mesh.do_rot), float(mesh.focus), 
+               [float(x) for x in mesh.abg]]
+    if n_idx_g is not None: minfo.append(hashlib.blake2b(np.asarray(n_idx_g, dtype=np.int64).tobytes(), digest_size=16).hexdigest())
+    
+    #___________________________________________________________________________
+    hkey = hashlib.blake2b(digest_size=16)
+    hkey.update(json.dumps([finfo, minfo, args], sort_keys=True, default=_datacache_jsonify).encode())
+    hkey = hkey.hexdigest()
+    return(os.path.join(cachepath, hkey[:2], 'tripyview_data_{}.nc'.format(hkey)))
+
+
+
+def _datacache_jsonify(obj):
+    if isinstance(obj, (np.ndarray, range)): return([_datacache_jsonify(x) for x in obj])
+    if isinstance(obj, np.generic)         : return(obj.item())
+    # recipe functions of derived variables by name, byte code, used names, 
+    # constants (also of nested functions), defaults, closure cells and the 
+    # values of used module variables
+    if callable(obj) and hasattr(obj, '__code__'): 
+        code_list, glob_dict = _datacache_codelist(obj.__code__), dict()
+        for code in code_list:
+            for name in code.co_names:
+                if name not in obj.__globals__: continue
+                value = obj.__globals__[name]
+                if   isinstance(value, (int, float, complex, str, bytes, tuple, list, dict, np.ndarray, np.generic)): glob_dict[name] = value
+                elif callable(value) and hasattr(value, '__code__') and value is not obj: glob_dict[name] = value
+                else: glob_dict[name] = getattr(value, '__name__', type(value).__name__)
+        closure = [cell.cell_contents for cell in (obj.__closure__ or [])]
+        hkey    = hashlib.blake2b(digest_size=8)
+        for code in code_list:
+            hkey.update(code.co_code)
+            hkey.update(repr([code.co_names, code.co_varnames, code.co_freevars]).encode())
+            hkey.update(repr([x for x in code.co_consts if not hasattr(x, 'co_code')]).encode())
+        hkey.update(json.dumps([obj.__defaults__, obj.__kwdefaults__, closure, glob_dict], 
+                               sort_keys=True, default=_datacache_jsonify).encode())
+        return([obj.__module__, obj.__qualname__, hkey.hexdigest()])
+    return(str(obj))
+
+
+def _datacache_codelist(code):
+    # code object and all nested code objects (inner functions, lambdas, 
+    # comprehensions)
+    code_list = [code]
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'): code_list.extend(_datacache_codelist(const))
+    return(code_list)
+
+
+
+# ___LOAD RESULT FROM PERSISTENT DATA CACHE____________________________________
+#| ___INPUT_________________________________________________________________   |
+#| cachefname   :   str, path of *.nc file in cache folder                     |
+#| do_compute   :   bool, load data into memory, otherwise lazy                |
+#| do_info      :   bool, print info                                           |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object or None if not in cache              |
+#|_____________________________________________________________________________|
+def do_datacache_load(cachefname, do_compute, do_info):
+    if not os.path.isfile(cachefname): return(None)
+    if do_info: print(' > load data from cache: {}'.format(cachefname))
+    try:
+        data = xr.open_dataset(cachefname, chunks={})
+        # restore attributes that can not be stored in netcdf (None, bool, list)
+        for vname in list(data.keys())+list(data.coords):
+            if 'tripyview_attrs' in data[vname].attrs: 
+                data[vname].attrs = json.loads(data[vname].attrs['tripyview_attrs'])
+        if do_compute: data = data.compute()
+    except (OSError, ValueError, KeyError):
+        return(None)
+    
+    # mark result as recently used for the eviction of old cache files
+    try   : os.utime(cachefname)
+    except OSError: pass
+    return(data)
+
+
+
+# ___SAVE RESULT TO PERSISTENT DATA CACHE______________________________________
+#| result is written as zlib compressed and chunked netcdf file. It is first   |
+#| written to a temporary file and than renamed so that other processes never  |
+#| see an incomplete file. Afterwards the cache folder is evicted              |
+#| ___INPUT_________________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#| cachefname   :   str, path of *.nc file in cache folder                     |
+#| do_compute   :   bool, if False data are computed while writing and are     |
+#|                  returned lazy from the cache file                          |
+#| do_info      :   bool, print info                                           |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#|_____________________________________________________________________________|
+def do_datacache_save(data, cachefname, do_compute, do_info):
+    tmpfname = '{}.tmp{}'.format(cachefname, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cachefname), exist_ok=True)
+        aux = data.copy()
+        for vname in list(aux.keys())+list(aux.coords):
+            aux[vname].attrs = dict({'tripyview_attrs':json.dumps(aux[vname].attrs, default=_datacache_jsonify)})
+        encoding = dict()
+        for vname in list(aux.keys()):
+            encoding[vname] = dict({'zlib':True, 'complevel':4})
+        if do_info: print(' > save data to cache: {}'.format(cachefname))
+        aux.to_netcdf(tmpfname, encoding=encoding)
+        os.replace(tmpfname, cachefname)
+        del aux
+    except (OSError, ValueError, TypeError) as err:
+        print(' > could not write data to cache: {}'.format(str(err)))
+        if os.path.isfile(tmpfname): os.remove(tmpfname)
+        return(data)
+    
+    #___________________________________________________________________________
+    datacache_evict(do_info=do_info)
+    if not do_compute: 
+        cached = do_datacache_load(cachefname, do_compute, False)
+        if cached is not None: data = cached
+    return(data)
+
+
+
+# ___EVICT OLD FILES FROM DATA CACHE FOLDER____________________________________
+#| remove least recently used results from cache folder DATAPATH_TRIPYVIEW     |
+#| until their total size is below maxsize. Loading a result from cache marks  |
+#| it as used.                                                                 |
+#| ___INPUT_________________________________________________________________   |
+#| maxsize  :   float, maximum size of data cache in GB, default: None, than   |
+#|              it is taken from environment variable                          |
+#|              DATAPATH_TRIPYVIEW_MAXSIZE or is 20GB                          |
+#| do_info  :   bool, print info                                               |
+#| ___RETURNS_______________________________________________________________   |
+#| nothing                                                                     |
+#|_____________________________________________________________________________|
+def datacache_evict(maxsize=None, do_info=True):
+    #___________________________________________________________________________
+    cacheroot = os.environ.get('DATAPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "datacache_tripyview"))
+    if maxsize is None: maxsize = float(os.environ.get('DATAPATH_TRIPYVIEW_MAXSIZE', 20))
+    if not os.path.isdir(cacheroot): return
+    
+    #___________________________________________________________________________
+    entries = []
+    for fpath in glob.glob(os.path.join(cacheroot, '*', 'tripyview_data_*.nc')):
+        try   : entries.append((os.path.getmtime(fpath), os.path.getsize(fpath), fpath))
+        except OSError: pass
+    
+    #___________________________________________________________________________
+    # remove oldest results, the most recent one is always kept
+    entries.sort()
+    totsize = sum([x[1] for x in entries])
+    for mtime, fsize, fpath in entries[:-1]:
+        if totsize <= maxsize*1024**3: break
+        if do_info: print(' > evict data cache: {}'.format(fpath))
+        try   : os.remove(fpath)
+        except OSError: pass
+        totsize -= fsize
+    
+    #___________________________________________________________________________
+    return
+
+
+
+# ___BUILD RUN CATALOG_________________________________________________________
+#| scan all netcdf files of a run directory once and store variables,          |
+#| dimensions, attributes, chunk layout and the values of the dimension        |
+#| coordinates (e.g. time axis) per file in a local JSON index in              |
+#| DATAPATH_TRIPYVIEW/catalog. Only new files and files whose size or mtime    |
+#| changed are scanned again, removed files are dropped. With                  |
+#| load_data_fesom2(do_catalog=True) lazy datasets are assembled from the      |
+#| catalog without opening the file headers again                              |
+#| ___INPUT_________________________________________________________________   |
+#| datapath     :   str, path of run directory                                 |
+#| do_info      :   bool, (default=True) print info                            |
+#| ___RETURNS_______________________________________________________________   |
+#| catalog      :   dict, {fname: file entry}                                  |
+#|_____________________________________________________________________________|
+_CATALOG_CACHE = dict()
+def build_catalog_fesom2(datapath, do_info=True):
+    datapath = os.path.abspath(datapath)
+    cachepath= os.environ.get('DATAPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "datacache_tripyview"))
+    catfname = os.path.join(cachepath, 'catalog', 'tripyview_catalog_{}.json'.format(
+                            hashlib.blake2b(datapath.encode(), digest_size=8).hexdigest()))
+    
+    #___________________________________________________________________________
+    # catalog from memory or disk
+    catalog = _CATALOG_CACHE.get(datapath)
+    if catalog is None and os.path.isfile(catfname):
+        try:
+            with open(catfname, 'r') as fid: catalog = json.load(fid)['files']
+        except (OSError, ValueError, KeyError): 
+            catalog = None
+    if catalog is None: catalog = dict()
+    
+    #___________________________________________________________________________
+    # scan only new and changed files
+    fnames, is_new = [], False
+    for fpath in sorted(glob.glob(os.path.join(datapath, '*.nc'))):
+        fname = os.path.basename(fpath)
+        fnames.append(fname)
+        fstat = os.stat(fpath)
+        if fname in catalog and catalog[fname]['size']==fstat.st_size and catalog[fname]['mtime_ns']==fstat.st_mtime_ns: continue
+        try   : catalog[fname] = do_catalog_scanfile(fpath, fstat)
+        except OSError: 
+            if do_info: print(' > catalog: could not scan {}'.format(fpath))
+            catalog.pop(fname, None); continue
+        is_new = True
+    for fname in [x for x in catalog if x not in fnames]: 
+        del catalog[fname]
+        is_new = True
+    
+    #___________________________________________________________________________
+    if is_new or not os.path.isfile(catfname):
+        if do_info: print(' > write run catalog: {} ({} files)'.format(catfname, len(catalog)))
+        os.makedirs(os.path.dirname(catfname), exist_ok=True)
+        tmpfname = '{}.{}.tmp'.format(catfname, os.getpid())
+        with open(tmpfname, 'w') as fid: json.dump({'datapath':datapath, 'files':catalog}, fid)
+        os.replace(tmpfname, catfname)
+    _CATALOG_CACHE[datapath] = catalog
+    
+    #___________________________________________________________________________
+    return(catalog)
+
+
+
+# ___SCAN FILE FOR RUN CATALOG_________________________________________________
+#| read header of netcdf file and raw values of the dimension coordinates      |
+#| ___INPUT_________________________________________________________________   |
+#| fpath        :   str, path of netcdf file                                   |
+#| fstat        :   os.stat_result of file                                     |
+#| ___RETURNS_______________________________________________________________   |
+#| entry        :   dict, catalog entry of file                                |
+#|_____________________________________________________________________________|
+def do_catalog_scanfile(fpath, fstat):
+    entry = dict({'size':fstat.st_size, 'mtime_ns':fstat.st_mtime_ns, 'dims':dict(), 
+                  'attrs':dict(), 'variables':dict(), 'values':dict(), 'is_valid':True})
+    with nc.Dataset(fpath, 'r') as fid:
+        entry['dims' ] = {dname: len(dim) for dname, dim in fid.dimensions.items()}
+        entry['attrs'] = {key: _catalog_jsonify(fid.getncattr(key)) for key in fid.ncattrs()}
+        for vname, var in fid.variables.items():
+            # string and compound variables are not supported --> open_mfdataset
+            if not isinstance(var.dtype, np.dtype) or var.dtype.kind not in 'biuf': 
+                entry['is_valid'] = False
+                continue
+            chunking = var.chunking()
+            entry['variables'][vname] = dict({'dims':list(var.dimensions), 'shape':list(var.shape), 
+                                              'dtype':var.dtype.str, 'chunking':chunking if chunking=='contiguous' else list(chunking),
+                                              'attrs':{key: _catalog_jsonify(var.getncattr(key)) for key in var.ncattrs()}})
+            # raw values of dimension coordinates e.g. time axis
+            if var.dimensions==(vname,):
+                var.set_auto_maskandscale(False)
+                entry['values'][vname] = _catalog_jsonify(var[:])
+    
+    #___________________________________________________________________________
+    return(entry)
+
+
+
+def _catalog_jsonify(obj):
+    if isinstance(obj, np.ndarray): return(obj.tolist())
+    if isinstance(obj, np.generic): return(obj.item())
+    if isinstance(obj, bytes)     : return(obj.decode(errors='replace'))
+    return(obj)
+
+
+
+# ___OPEN FILES FROM RUN CATALOG_______________________________________________
+#| assemble a lazy dataset of a list of files from the run catalog, equivalent |
+#| to xr.open_mfdataset(pathlist, chunks=chunks). The variables are dask       |
+#| arrays that open the file only when a block is computed, attributes,        |
+#| fill values, scaling and time axis are decoded with xr.decode_cf. Returns   |
+#| None when a file is not in the catalog or changed since it was scanned      |
+#| ___INPUT_________________________________________________________________   |
+#| pathlist     :   list, paths of files                                       |
+#| chunks       :   dict, chunk sizes per dimension as in load_data_fesom2     |
+#| do_info      :   bool, (default=True) print info                            |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object or None                              |
+#|_____________________________________________________________________________|
+def do_catalog_open(pathlist, chunks, do_info=True):
+    if isinstance(pathlist, str): return(None)
+    
+    #___________________________________________________________________________
+    data_list = []
+    for fpath in pathlist:
+        fpath, fname = os.path.abspath(fpath), os.path.basename(fpath)
+        try   : fstat = os.stat(fpath)
+        except OSError: return(None)
+        catalog = _CATALOG_CACHE.get(os.path.dirname(fpath))
+        if catalog is None or fname not in catalog or catalog[fname]['mtime_ns']!=fstat.st_mtime_ns \
+                           or catalog[fname]['size']!=fstat.st_size:
+            catalog = build_catalog_fesom2(os.path.dirname(fpath), do_info=do_info)
+        entry = catalog.get(fname)
+        if entry is None or not entry['is_valid']: return(None)
+        
+        #_______________________________________________________________________
+        variables = dict()
+        manager   = CachingFileManager(nc.Dataset, fpath, mode='r')
+        for vname, var in entry['variables'].items():
+            dtype = np.dtype(var['dtype'])
+            if vname in entry['values']:
+                aux = np.array(entry['values'][vname], dtype=dtype)
+            else:
+                aux_chunks = tuple(chunks[dim] if isinstance(chunks.get(dim), tuple) else 
+                                   min(int(chunks.get(dim, size)), size) if size>0 else 0 
+                                   for dim, size in zip(var['dims'], var['shape']))
+                aux_name   = 'catalog-{}'.format(hashlib.blake2b(json.dumps([fpath, entry['mtime_ns'], vname, aux_chunks]).encode(), digest_size=16).hexdigest())
+                aux = da.from_array(_CatalogVariable(manager, vname, var['shape'], dtype), chunks=aux_chunks, 
+                                    name=aux_name, lock=_CATALOG_LOCK, asarray=True, 
+                                    meta=np.empty((0,)*len(var['shape']), dtype=dtype))
+            variables[vname] = xr.Variable(var['dims'], aux, attrs=var['attrs'])
+        data_list.append(xr.decode_cf(xr.Dataset(variables, attrs=entry['attrs'])))
+        
+    #___________________________________________________________________________
+    # combine like xr.open_mfdataset
+    data = xr.combine_by_coords(data_list, compat='no_conflicts', data_vars='all', 
+                                coords='different', join='outer', combine_attrs='override')
+    return(data)
+
+
+
+# lazy access to variable of netcdf file, the file is only opened when a 
+# block is read and kept open in the file cache of xarray, raw values are 
+# returned, decoding is done by xr.decode_cf
+_CATALOG_LOCK = combine_locks([NETCDFC_LOCK, HDF5_LOCK])
+class _CatalogVariable:
+    def __init__(self, manager, vname, shape, dtype):
+        self.manager, self.vname = manager, vname
+        self.shape, self.dtype = tuple(shape), dtype
+        self.ndim = len(self.shape)
+    def __getitem__(self, key):
+        var = self.manager.acquire().variables[self.vname]
+        var.set_auto_maskandscale(False)
+        return(np.asarray(var[key]))
+
+
+
 # ___CREATE FILENAME MASK FOR: RUN, RESTART AND BLOWUP FILES___________________
 #| contains filename mask to distinguish between run, restart and blowup file  |
 #| that can be loaded                                                          |
@@ -424,6 +984,155 @@ def do_pathlist(year, datapath, do_filename, do_file, vname, runid):
 
 
 
+# ___OPEN MULTIPLE FILES_______________________________________________________
+#| open list of files with xr.open_mfdataset or from the run catalog, see      |
+#| do_catalog_open, falls back to xr.open_mfdataset when files are not in the  |
+#| catalog or additional open_mfdataset arguments are given                    |
+#| ___INPUT_________________________________________________________________   |
+#| pathlist     :   list, str, paths of files                                  |
+#| chunks       :   dict, chunk sizes per dimension                            |
+#| do_catalog   :   bool, use run catalog                                      |
+#| do_info      :   bool, print info                                           |
+#| **kwargs     :   arguments of xr.open_mfdataset                             |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#|_____________________________________________________________________________|
+def do_open_mfdataset(pathlist, chunks, do_catalog, do_info, **kwargs):
+    data = None
+    if do_catalog and not kwargs: data = do_catalog_open(pathlist, chunks, do_info=do_info)
+    if data is None: data = xr.open_mfdataset(pathlist, parallel=True, chunks=chunks, **kwargs)
+    return(data)
+
+
+
+# ___SELECT DATA OF REGIONAL SUB-MESH__________________________________________
+#| select the data of the vertices/elements of a regional sub-mesh, see        |
+#| mesh.subset(), from the data of the full mesh, does nothing for a full mesh.|
+#| Afterwards the data are rechunked to the normal chunk size                  |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
+#| data         :   xarray dataset object                                      |
+#| chunks       :   dict, (default=None) chunk size of nod2 and elem after     |
+#|                  selection                                                  |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   returns xarray dataset object                              |
+#|_____________________________________________________________________________|
+def do_select_submesh(mesh, data, chunks=None):
+    n_idx_g, e_idx_g = getattr(mesh, 'n_idx_g', None), getattr(mesh, 'e_idx_g', None)
+    if n_idx_g is None: return(data)
+    #___________________________________________________________________________
+    if 'nod2' in data.dims: data = data.isel(nod2=n_idx_g)
+    if 'elem' in data.dims: data = data.isel(elem=e_idx_g)
+    if chunks is not None: 
+        data = data.chunk({dim:int(chunks[dim]) for dim in ['nod2', 'elem'] if dim in data.dims and dim in chunks})
+    
+    #___________________________________________________________________________
+    return(data)
+
+
+
+# ___BOX MASK ON DATA__________________________________________________________
+#| translate vertice/element mask of the full mesh (do_boxmask) into a mask    |
+#| of the data. For data that were loaded only for a region (sub-mesh or       |
+#| load_data_fesom2(box=...)) the global indices are taken from the coordinate |
+#| nodi/elemi                                                                  |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object of full mesh                            |
+#| data         :   xarray dataset object                                      |
+#| idx_IN       :   bool np.array, mask of the full mesh                       |
+#| dim          :   str, (default='nod2') horizontal dimension 'nod2' or 'elem'|
+#| ___RETURNS_______________________________________________________________   |
+#| idx_IN       :   bool np.array, mask of the data                            |
+#|_____________________________________________________________________________|
+def do_boxmask_data(mesh, data, idx_IN, dim='nod2'):
+    if data.sizes[dim]==idx_IN.size: return(idx_IN)
+    
+    #___________________________________________________________________________
+    cname = 'nodi' if dim=='nod2' else 'elemi'
+    if cname not in data.coords:
+        raise ValueError(' data have {} {} but mask has {} and data have no global index {}'.format(
+                         str(data.sizes[dim]), dim, str(idx_IN.size), cname))
+    idx_data = idx_IN[data[cname].values]
+    if idx_data.sum()<idx_IN.sum(): 
+        print('::: Warning: box extends beyond the region of the loaded data, {} of {} points are used :::'.format(
+              str(idx_data.sum()), str(idx_IN.sum())))
+    
+    #___________________________________________________________________________
+    return(idx_data)
+
+
+
+# ___REGIONAL SUB-MESH OF BOX__________________________________________________
+#| regional sub-mesh of box, see mesh.subset(). The sub-mesh is memorized per  |
+#| mesh and box, so that repeated loads of the same region, e.g. year by year  |
+#| for a Hovmoeller diagram, do not cut out the sub-mesh again                 |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
+#| box          :   list, [lonmin, lonmax, latmin, latmax], polygon [2 x npts] |
+#|                  shapefile or boolean vertice mask, see do_boxmask          |
+#| ___RETURNS_______________________________________________________________   |
+#| submesh      :   fesom2 mesh object of the region                           |
+#|_____________________________________________________________________________|
+_BOXMESH_CACHE = weakref.WeakKeyDictionary()
+def do_boxmesh(mesh, box):
+    import shapefile as shp
+    from shapely.geometry import Polygon, MultiPolygon
+    #___________________________________________________________________________
+    if   isinstance(box, np.ndarray)              : key = (box.dtype.str, box.shape, box.tobytes())
+    elif isinstance(box, shp.Reader)              : key = os.path.abspath(box.shapeName)
+    elif isinstance(box, (Polygon, MultiPolygon)) : key = box.wkb
+    else                                          : key = json.dumps(box, default=_datacache_jsonify)
+    
+    #___________________________________________________________________________
+    cache = _BOXMESH_CACHE.setdefault(mesh, dict())
+    if key not in cache: cache[key] = mesh.subset(box, do_info=False)
+    return(cache[key])
+
+
+
+# ___CHUNKS ALIGNED TO INDEX RUNS OF SUB-MESH__________________________________
+#| splits nod2 and elem into blocks whose boundaries are the starts and ends   |
+#| of the contiguous index runs of the sub-mesh in the files. Runs that are    |
+#| separated by less than 1/100 of the chunk size are merged and long runs     |
+#| are split at the chunk size. After the selection of the sub-mesh indices    |
+#| dask only reads the blocks within the runs, the bytes read scale with the   |
+#| size of the region                                                          |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
+#| chunks       :   dict, chunk sizes of load_data_fesom2                      |
+#| pathlist     :   list, str, paths of the files, the first is opened to get  |
+#|                  the dimension size                                         |
+#| ___RETURNS_______________________________________________________________   |
+#| chunks       :   dict, chunks with tuple of block sizes for nod2 and elem   |
+#|_____________________________________________________________________________|
+def do_chunks_submesh(mesh, chunks, pathlist):
+    if getattr(mesh, 'n_idx_g', None) is None: return(chunks)
+    
+    #___________________________________________________________________________
+    fpath = pathlist if isinstance(pathlist, str) else pathlist[0]
+    fpath = (sorted(glob.glob(fpath)) or [fpath])[0]
+    with xr.open_dataset(fpath, decode_times=False) as aux: sizes = dict(aux.sizes)
+    
+    #___________________________________________________________________________
+    chunks = dict(chunks)
+    for dim, idx_g in [('nod2', mesh.n_idx_g), ('elem', mesh.e_idx_g)]:
+        if dim not in sizes: continue
+        chunk = int(chunks.get(dim, 1e4))
+        gap   = max(chunk//100, 1)
+        # start and end of the runs
+        idx_brk = np.flatnonzero(np.diff(idx_g) > gap)
+        run_s   = np.hstack((idx_g[0]     , idx_g[idx_brk+1]))
+        run_e   = np.hstack((idx_g[idx_brk], idx_g[-1]))+1
+        # block boundaries
+        bnd     = [np.arange(s, e, chunk) for s, e in zip(run_s, run_e)]
+        bnd     = np.unique(np.hstack(bnd + [run_e, [0, sizes[dim]]]))
+        chunks[dim] = tuple(int(x) for x in np.diff(bnd))
+        
+    #___________________________________________________________________________
+    return(chunks)
+
+
+
 # _____________________________________________________________________________
 #|                                                                             |
 #| ___INPUT_________________________________________________________________   |
@@ -434,25 +1143,30 @@ def do_pathlist(year, datapath, do_filename, do_file, vname, runid):
 #|_____________________________________________________________________________|
 def do_gridinfo_and_weights(mesh, data, do_hweight=True, do_zweight=None):
     dim_vert = None
+    # level indices, only a part of the levels is there when they were 
+    # already selected at reading, see do_select_levidx_read
+    nzi = data['nzi'].values if 'nzi' in data.coords else slice(None)
     if   ('nz_1' in data.dims): 
         dim_vert = 'nz_1'
-        data = data.assign_coords(nz_1 = ("nz_1" , -mesh.zmid))
-        data = data.assign_coords(nzi  = ("nz_1" , np.arange(0,mesh.zmid.size)))
+        data = data.assign_coords(nz_1 = ("nz_1" , -mesh.zmid[nzi]))
+        data = data.assign_coords(nzi  = ("nz_1" , np.arange(0,mesh.zmid.size)[nzi]))
     elif ('nz1'  in data.dims): 
         dim_vert = 'nz1'
-        data = data.assign_coords(nz1  = ("nz1"  , -mesh.zmid))
-        data = data.assign_coords(nzi  = ("nz1"  , np.arange(0,mesh.zmid.size)))
+        data = data.assign_coords(nz1  = ("nz1"  , -mesh.zmid[nzi]))
+        data = data.assign_coords(nzi  = ("nz1"  , np.arange(0,mesh.zmid.size)[nzi]))
     elif ('nz'   in data.dims): 
         dim_vert = 'nz'
-        data = data.assign_coords(nz   = ("nz"  , -mesh.zlev))
-        data = data.assign_coords(nzi  = ("nz"  , np.arange(0,mesh.zlev.size)))
+        data = data.assign_coords(nz   = ("nz"  , -mesh.zlev[nzi]))
+        data = data.assign_coords(nzi  = ("nz"  , np.arange(0,mesh.zlev.size)[nzi]))
     
     dim_horz = None
     if   ('nod2' in data.dims):
         dim_horz = 'nod2'
         data = data.assign_coords(lon  = xr.DataArray(mesh.n_x              , dims=['nod2']).chunk(data.chunksizes['nod2']))
         data = data.assign_coords(lat  = xr.DataArray(mesh.n_y              , dims=['nod2']).chunk(data.chunksizes['nod2']))
-        data = data.assign_coords(nodi = xr.DataArray(np.arange(0,mesh.n2dn, dtype='int32'), dims=['nod2']).chunk(data.chunksizes['nod2']))
+        # global vertice index, also for the regional sub-mesh
+        nodi = np.arange(0,mesh.n2dn) if getattr(mesh, 'n_idx_g', None) is None else mesh.n_idx_g
+        data = data.assign_coords(nodi = xr.DataArray(np.asarray(nodi, dtype='int32'), dims=['nod2']).chunk(data.chunksizes['nod2']))
         if dim_vert in ['nz_1', 'nz1']: 
             data = data.assign_coords(nodiz = xr.DataArray(mesh.n_iz-1       , dims=['nod2']).chunk(data.chunksizes['nod2']))
         elif dim_vert in ['nz']: 
@@ -472,15 +1186,16 @@ def do_gridinfo_and_weights(mesh, data, do_hweight=True, do_zweight=None):
                 #data = data.assign_coords(w_z=w_z*w_An)
             elif 'nz' == dim_vert:
                 w_An = xr.DataArray(mesh.n_area, dims=['nz', 'nod2']).chunk(data.chunksizes['nod2'])
-                w_z  = xr.DataArray(np.hstack(((mesh.zlev[0]-mesh.zlev[1])/2.0, mesh.zmid[:-1]-mesh_zmid[1:], (mesh.zlev[-2]-mesh.zlev[-1])/2.0)), dims=['nz'])
-            data = data.assign_coords(w_z=w_z*w_An)
+                w_z  = xr.DataArray(np.hstack(((mesh.zlev[0]-mesh.zlev[1])/2.0, mesh.zmid[:-1]-mesh.zmid[1:], (mesh.zlev[-2]-mesh.zlev[-1])/2.0)), dims=['nz'])
+            data = data.assign_coords(w_z=(w_z*w_An)[{dim_vert:nzi}])
             del(w_z, w_An)
         
     elif ('elem' in data.dims):                          
         dim_horz = 'elem'
-        data = data.assign_coords(lon  = xr.DataArray(mesh.n_x[mesh.e_i].sum(axis=1)/3.0, dims=['elem']).chunk(data.chunksizes['elem']))
-        data = data.assign_coords(lat  = xr.DataArray(mesh.n_y[mesh.e_i].sum(axis=1)/3.0, dims=['elem']).chunk(data.chunksizes['elem']))
-        data = data.assign_coords(elemi= xr.DataArray(np.arange(0,mesh.n2de)            , dims=['elem']).chunk(data.chunksizes['elem']))
+        data = data.assign_coords(lon  = xr.DataArray(mesh.e_x                          , dims=['elem']).chunk(data.chunksizes['elem']))
+        data = data.assign_coords(lat  = xr.DataArray(mesh.e_y                          , dims=['elem']).chunk(data.chunksizes['elem']))
+        elemi= np.arange(0,mesh.n2de) if getattr(mesh, 'e_idx_g', None) is None else mesh.e_idx_g
+        data = data.assign_coords(elemi= xr.DataArray(elemi                             , dims=['elem']).chunk(data.chunksizes['elem']))
         if dim_vert in ['nz_1', 'nz1']: 
             data = data.assign_coords(elemiz= xr.DataArray(mesh.e_iz-1                   , dims=['elem']).chunk(data.chunksizes['elem']))
         elif dim_vert in ['nz']: 
@@ -489,37 +1204,112 @@ def do_gridinfo_and_weights(mesh, data, do_hweight=True, do_zweight=None):
         # do weighting for weighted mean computation on elements
         if do_hweight:
             data = data.assign_coords(w_A  = xr.DataArray(mesh.e_area                   , dims=['elem']).chunk(data.chunksizes['elem']))
+        # vertical weights: element area times layer thickness, NaN below 
+        # bottom, see do_zweight_elem
         if do_zweight=='wmean':    
-            if   'nz1' == dim_vert:
-                w_A  = np.zeros((mesh.nlev-1, mesh.n2de))
-                for ei in range(0,mesh.n2de): w_A[mesh.e_iz[ei]+1-1:,ei]=np.nan
-                w_Ae = xr.DataArray(w_A, dims=['nz1', 'elem']).chunk(data.chunksizes['elem'])
-                w_z  = xr.DataArray(mesh.zlev[:-1]-mesh.zlev[1:], dims=['nz1'])
-                #data = data.assign_coords(w_z=w_z*w_Ae)
-            elif 'nz_1' == dim_vert:
-                w_A  = np.zeros((mesh.nlev-1, mesh.n2de))
-                for ei in range(0,mesh.n2de): w_A[mesh.e_iz[ei]+1-1:,ei]=np.nan
-                w_Ae = xr.DataArray(w_A, dims=['nz_1', 'elem']).chunk(data.chunksizes['elem'])
-                w_z  = xr.DataArray(mesh.zlev[:-1]-mesh.zlev[1:], dims=['nz_1'])
-                #data = data.assign_coords(w_z=w_z*w_Ae)
-            elif 'nz' == dim_vert:
-                w_A  = np.zeros((mesh.nlev, mesh.n2de))
-                for ei in range(0,mesh.n2de): w_A[mesh.e_iz[ei]+1:,ei]=np.nan
-                w_Ae = xr.DataArray(w_A, dims=['nz', 'elem']).chunk(data.chunksizes['elem'])
-                w_z  = xr.DataArray(mesh.zlev[:-1]-mesh.zlev[1:], dims=['nz'])
-            data = data.assign_coords(w_z=w_z*w_Ae)
-            del(w_z, w_Ae, w_A)
+            data = data.assign_coords(w_z=do_zweight_elem(mesh, dim_vert, data.chunksizes['elem'])[{dim_vert:nzi}])
     
     #___________________________________________________________________________
     return(data, dim_vert, dim_horz)
 
     
 
-# _____________________________________________________________________________
-#|                                                                             |
+# ___VERTICAL WEIGHTS OF ELEMENTS______________________________________________
+#| lazy dask array [nlev x n2de] with element area times layer thickness and   |
+#| NaN below the bottom. It is chunked level wise and like the data along the  |
+#| elements, only the blocks of the levels that are selected later are ever    |
+#| computed. The array is memorized per mesh, vertical dimension and element   |
+#| chunks and reused for all variables and calls of load_data_fesom2           |
 #| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
+#| dim_vert     :   str, vertical dimension 'nz1', 'nz_1' or 'nz'              |
+#| chunks_e     :   tuple, chunks of element dimension                         |
+#| ___RETURNS_______________________________________________________________   |
+#| w_z          :   xarray DataArray, dims=[dim_vert, 'elem']                  |
+#|_____________________________________________________________________________|
+_ZWEIGHT_CACHE = weakref.WeakKeyDictionary()
+def do_zweight_elem(mesh, dim_vert, chunks_e):
+    cache = _ZWEIGHT_CACHE.setdefault(mesh, dict())
+    key   = (dim_vert, tuple(chunks_e))
+    if key in cache: return(cache[key])
+    
+    #___________________________________________________________________________
+    # layer thickness, full level data see a level above the bottom as wet 
+    if dim_vert in ['nz1', 'nz_1']:
+        w_z  = mesh.zlev[:-1]-mesh.zlev[1:]
+        ioff = 0
+    elif dim_vert=='nz':
+        w_z  = np.hstack(((mesh.zlev[0]-mesh.zlev[1])/2.0, mesh.zmid[:-1]-mesh.zmid[1:], (mesh.zlev[-2]-mesh.zlev[-1])/2.0))
+        ioff = 1
+    else: raise ValueError(' the vertical dimension dim_vert={} is not supported'.format(str(dim_vert)))
+    
+    #___________________________________________________________________________
+    mesh   = mesh.compute_e_area()
+    e_iz   = da.from_array(np.asarray(mesh.e_iz, dtype=np.int32)+ioff     , chunks=(tuple(chunks_e),))
+    e_area = da.from_array(np.asarray(np.ma.getdata(mesh.e_area), dtype=np.float64), chunks=(tuple(chunks_e),))
+    lev    = da.arange(0, w_z.size, chunks=1)
+    w_z    = da.from_array(w_z, chunks=1)
+    w_Ae   = da.where(lev[:, None] < e_iz[None, :], w_z[:, None]*e_area[None, :], np.nan)
+    
+    #___________________________________________________________________________
+    cache[key] = xr.DataArray(w_Ae, dims=[dim_vert, 'elem'])
+    return(cache[key])
+
+
+
+# ___SET ARRAY VALUES BELOW THE BOTTOM TO NAN__________________________________
+#| set all entries with level index >= number of wet levels of their column to |
+#| NaN. Dask arrays are processed block by block with the part of nlev and levi|
+#| that belongs to the block, so only a block sized mask exists at any time    |
+#| ___INPUT_________________________________________________________________   |
+#| array        :   numpy or dask array                                        |
+#| nlev         :   array, number of wet levels per column, see                |
+#|                  mesh.get_bottom_nlev                                       |
+#| h_axis       :   int, axis of array along the vertices/elements             |
+#| z_axis       :   int, axis of array along the levels                        |
+#| levi         :   array, level index of the entries along z_axis, default:   |
+#|                  None, than np.arange(array.shape[z_axis])                  |
+#| ___RETURNS_______________________________________________________________   |
+#| array        :   array, with NaN below the bottom, integer data become      |
+#|                  float64                                                    |
+#|_____________________________________________________________________________|
+def do_bottomnan_array(array, nlev, h_axis, z_axis, levi=None):
+    if levi is None: levi = np.arange(array.shape[z_axis])
+    levi  = np.asarray(levi)
+    dtype = array.dtype if np.issubdtype(array.dtype, np.floating) else np.dtype(np.float64)
+    
+    #___________________________________________________________________________
+    if hasattr(array, 'dask'):
+        h_off = np.cumsum((0,)+array.chunks[h_axis])
+        z_off = np.cumsum((0,)+array.chunks[z_axis])
+        def _bottomnan_block(block, block_info=None):
+            loc = block_info[0]['chunk-location']
+            ih, iz = loc[h_axis], loc[z_axis]
+            return(_do_apply_bottomnan(block, nlev[h_off[ih]:h_off[ih+1]], levi[z_off[iz]:z_off[iz+1]], h_axis, z_axis, dtype))
+        array = array.map_blocks(_bottomnan_block, dtype=dtype)
+    else:
+        array = _do_apply_bottomnan(np.asarray(array), nlev, levi, h_axis, z_axis, dtype)
+    
+    #___________________________________________________________________________
+    return(array)
+
+
+def _do_apply_bottomnan(block, nlev, levi, h_axis, z_axis, dtype):
+    shape_h, shape_z = [1]*block.ndim, [1]*block.ndim
+    shape_h[h_axis], shape_z[z_axis] = nlev.size, levi.size
+    is_bot = levi.reshape(shape_z) >= nlev.reshape(shape_h)
+    return(np.where(is_bot, np.array(np.nan, dtype=dtype), block).astype(dtype, copy=False))
+
+
+
+# ___SET VALUES BELOW THE BOTTOM TO NAN________________________________________
+#| the bottom fill value in the files is zero, set it to NaN. Uses the cached  |
+#| number of wet levels per column of the mesh and is applied lazily block by  |
+#| block to every variable with horizontal and vertical dimension              |
+#| ___INPUT_________________________________________________________________   |
+#| mesh         :   fesom2 mesh object                                         |
 #| data         :   xarray dataset object                                      |
-#|                                                                             |
+#| do_nan       :   bool, set bottom values to nan                             |
 #| ___RETURNS_______________________________________________________________   |
 #| data         :   returns xarray dataset object                              |
 #|_____________________________________________________________________________|
@@ -527,27 +1317,24 @@ def do_setbottomnan(mesh, data, do_nan):
     # set bottom to nan --> in moment the bottom fill value is zero would be 
     # better to make here a different fill value in the netcdf files !!!
     if do_nan and any(x in data.dims for x in ['nz_1','nz1','nz']): 
-        if   ('nod2' in data.dims):
-            #if vname in ['Kv', 'Av']: 
-            if   ('nz_1' in data.dims): mat_nodiz= data['nodiz'].expand_dims({'nz_1': data['nz_1']}).transpose()
-            elif ('nz1'  in data.dims): mat_nodiz= data['nodiz'].expand_dims({'nz1': data['nz1']}).transpose()
-            elif ('nz'   in data.dims): mat_nodiz= data['nodiz'].expand_dims({'nz': data['nz']}).transpose()
-            mat_nzinod= data['nzi'].expand_dims({'nod2': data['nod2']}).drop_vars('nod2')
-            
-            # kickout all cooordinates from mat_nodiz and mat_nzinod
-            mat_nodiz = mat_nodiz.drop_vars(list(mat_nodiz.coords))
-            mat_nzinod= mat_nzinod.drop_vars(list(mat_nzinod.coords))
-            
-            data = data.where(mat_nzinod<=mat_nodiz)
-            del mat_nodiz, mat_nzinod
-                
-        elif('elem' in data.dims):
-            if   ('nz_1' in data.dims): mat_elemiz= data['elemiz'].expand_dims({'nz_1': data['nz_1']}).transpose()
-            elif ('nz1'  in data.dims): mat_elemiz= data['elemiz'].expand_dims({'nz1': data['nz1']}).transpose()
-            elif ('nz'   in data.dims): mat_elemiz= data['elemiz'].expand_dims({'nz': data['nz']}).transpose()
-            mat_nzielem= data['nzi'].expand_dims({'elem': data['elemi']})
-            data = data.where(mat_nzielem<=mat_elemiz)
-            del mat_elemiz, mat_nzielem
+        dim_vert = [x for x in ['nz_1','nz1','nz'] if x in data.dims][0]
+        if   ('nod2' in data.dims): dim_horz, coord_iz = 'nod2', 'nodiz'
+        elif ('elem' in data.dims): dim_horz, coord_iz = 'elem', 'elemiz'
+        else: return(data)
+        
+        #_______________________________________________________________________
+        # number of wet levels per column, from the mesh or when data do not 
+        # fit to the mesh anymore from the bottom index coordinate
+        nlev = mesh.get_bottom_nlev(dim_horz, dim_vert)
+        if nlev.size != data.sizes[dim_horz]: nlev = np.asarray(data[coord_iz].values, dtype=np.int16)+np.int16(1)
+        levi = data['nzi'].values if 'nzi' in data.coords else np.arange(data.sizes[dim_vert])
+        
+        #_______________________________________________________________________
+        for vname in list(data.data_vars):
+            dims = data[vname].dims
+            if (dim_horz not in dims) or (dim_vert not in dims): continue
+            data[vname] = data[vname].copy(data=do_bottomnan_array(data[vname].data, nlev, 
+                                           dims.index(dim_horz), dims.index(dim_vert), levi))
         
     #___________________________________________________________________________
     return(data)
@@ -671,6 +1458,10 @@ def do_select_levidx(data, mesh, depth, depidx):
         ndimax = mesh.n_iz.max()-1
         sel_levidx = do_comp_sel_levidx(-mesh.zmid, depth, depidx, ndimax)
         
+        # position of the level indices when levels were already selected at 
+        # reading, see do_select_levidx_read
+        sel_levidx = np.searchsorted(data['nzi'].values, sel_levidx)
+        
         #_______________________________________________________________________        
         # select vertical levels from data
         if ('nz1'  in data.dims): data = data.isel(nz1=sel_levidx)        
@@ -684,6 +1475,7 @@ def do_select_levidx(data, mesh, depth, depidx):
         # compute selection index either single layer of for interpolation 
         ndimax  = mesh.n_iz.max()
         sel_levidx = do_comp_sel_levidx(-mesh.zlev, depth, depidx, ndimax)
+        sel_levidx = np.searchsorted(data['nzi'].values, sel_levidx)
         
         #_______________________________________________________________________        
         # select vertical levels from data
@@ -702,6 +1494,48 @@ def do_select_levidx(data, mesh, depth, depidx):
 
 
 
+# ___DO VERTICAL LEVEL SELECTION AT READING____________________________________
+#| select directly after opening the files only the levels that are needed for |
+#| the depth interpolation (two bracketing levels) or for the vertical mean    |
+#| over a list of depths. The files are opened with one dask block per level,  |
+#| so that after this selection dask reads from every file only the selected   |
+#| nz1/nz slices instead of the entire water column. The selected level        |
+#| indices are kept in the coordinate nzi, do_gridinfo_and_weights and         |
+#| do_select_levidx use them later on                                          |
+#| ___INPUT_________________________________________________________________   |
+#| data         :   xarray dataset object, as opened from the files            |
+#| mesh         :   fesom2 mesh object                                         |
+#| depth        :   int, list, np.array, range (default=None), see             |
+#|                  do_select_levidx                                           |
+#| depidx       :   bool, (default:False), see do_select_levidx                |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#|_____________________________________________________________________________|
+def do_select_levidx_read(data, mesh, depth, depidx):
+    if depth is None: return(data)
+    
+    #___________________________________________________________________________
+    # same level selection as in do_select_levidx, but always keep the vertical
+    # dimension and levels in increasing order
+    if   ('nz1'  in data.dims) or ('nz_1' in data.dims):
+        dim_vert   = 'nz1' if 'nz1' in data.dims else 'nz_1'
+        sel_levidx = do_comp_sel_levidx(-mesh.zmid, depth, depidx, mesh.n_iz.max()-1)
+    elif ('nz'   in data.dims):
+        dim_vert   = 'nz'
+        sel_levidx = do_comp_sel_levidx(-mesh.zlev, depth, depidx, mesh.n_iz.max())
+    else: 
+        return(data)
+    sel_levidx = np.unique(sel_levidx)
+    
+    #___________________________________________________________________________
+    data = data.isel({dim_vert:sel_levidx}).chunk({dim_vert:-1})
+    data = data.assign_coords(nzi=(dim_vert, sel_levidx))
+    
+    #___________________________________________________________________________
+    return(data)
+
+
+
 # ___COMPUTE VERTICAL LEVEL SELECTION INDEX____________________________________
 #| compute level indices that are needed to interpolate the depth levels       |                                                                             |
 #| ___INPUT_________________________________________________________________   |
@@ -753,7 +1587,7 @@ def do_comp_sel_levidx(zlev, depth, depidx, ndimax):
 #| data         :   xarray dataset object                                      |
 #| do_tarithm   :   str (default='mean') do time arithmetic on time selection  |
 #|                  option are: None, 'None', 'mean', 'median', 'std', 'var',  |
-#|                  'max', 'min', 'sum'                                        |
+#|                  'max', 'min', 'sum', 'pXX' (XX-th percentile)              |
 #| ___RETURNS_______________________________________________________________   |
 #| data         :   xarray dataset object                                      |
 #|_____________________________________________________________________________|    
@@ -778,6 +1612,8 @@ def do_time_arithmetic(data, do_tarithm):
             data = data.min(   dim="time", keep_attrs=True)  
         elif do_tarithm=='sum':
             data = data.sum(   dim="time", keep_attrs=True)      
+        elif do_tarithm_quantile(do_tarithm) is not None:
+            data = data.quantile(do_tarithm_quantile(do_tarithm), dim="time", keep_attrs=True).drop_vars('quantile')
         elif do_tarithm=='None':
             ...
         else:
@@ -787,6 +1623,243 @@ def do_time_arithmetic(data, do_tarithm):
     return(data, str_atim)
 
 
+
+# ___COMPUTE STREAMING TIME ARITHMETICS ON DATA________________________________
+#| do arithmetic on time dimension block by block, a block is a dask chunk     |
+#| along time, which is at most one file. The arithmetic is build as lazy dask |
+#| tree reduction (da.reduction): every block is reduced to small partial      |
+#| results (count, sum, min, max, mean/variance or histogram) that are merged  |
+#| after Welford (in the parallel form of Chan et al.), so the peak memory is  |
+#| about one block independent of the number of files. Blocks keep their own   |
+#| dtype, only the partial results are float64. The result stays lazy, it is   |
+#| computed by load_data_fesom2(..., do_compute=True). Bottom values, NaNs are |
+#| treated like in do_time_arithmetic (skipna).                                |
+#| 'median' and 'pXX' are computed from a mergeable histogram of nbins bins    |
+#| per point between the minimum and maximum of the time series, the error is  |
+#| a fraction of the bin width (max-min)/nbins. The histograms cost nbins x    |
+#| float32 per point and spatial chunk. Use do_tstream=False for exact         |
+#| quantiles.                                                                  |
+#| ___INPUT_________________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#| do_tarithm   :   str (default='mean') do time arithmetic on time selection  |
+#|                  option are: None, 'None', 'mean', 'median', 'std', 'var',  |
+#|                  'max', 'min', 'sum', 'pXX' (XX-th percentile)              |
+#| nbins        :   int (default=256) number of histogram bins for 'median'    |
+#|                  and 'pXX'                                                  |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#|_____________________________________________________________________________|
+def do_time_arithmetic_stream(data, do_tarithm, nbins=256):
+    if do_tarithm is None or do_tarithm=='None': return(data, None)
+    str_atim = str(do_tarithm)
+    q        = do_tarithm_quantile(do_tarithm)
+    if do_tarithm not in ['mean', 'median', 'std', 'var', 'max', 'min', 'sum'] and q is None:
+        raise ValueError(' the time arithmetic of do_tarithm={} is not supported'.format(str(do_tarithm))) 
+    
+    #___________________________________________________________________________
+    # variables and coordinates without time dimension are taken over
+    vnames = [vname for vname in data.data_vars if 'time' in data[vname].dims]
+    out    = data.isel(time=0, drop=True)
+    for vname in vnames:
+        #_______________________________________________________________________
+        # time axis to front, reduce lazy over the time chunks
+        dims  = [dim for dim in data[vname].dims if dim!='time']
+        aux   = data[vname].transpose('time', ...).data
+        if not isinstance(aux, da.Array): aux = da.from_array(aux, chunks=aux.shape)
+        dtype = np.result_type(aux.dtype, np.float32)
+        aux   = da.reduction(aux, 
+                             lambda x, axis, keepdims, computing_meta=False: _do_tstream_chunk(x, do_tarithm, nbins, computing_meta), 
+                             lambda x, axis, keepdims: _do_tstream_aggregate(x, do_tarithm, q, dtype, keepdims), 
+                             combine=lambda x, axis, keepdims: _do_tstream_combine(x, do_tarithm), 
+                             axis=0, dtype=dtype, concatenate=False, 
+                             meta=np.empty((0,)*len(dims), dtype=dtype), 
+                             name='tstream-{}'.format(do_tarithm))
+        out[vname] = (dims, aux)
+        out[vname].attrs = data[vname].attrs
+    
+    #___________________________________________________________________________
+    return(out, str_atim)
+
+
+
+# ___PARTIAL RESULT OF STREAMING TIME ARITHMETIC OF SINGLE BLOCK________________
+#| reduce time block [nt x ...] to dictionary of partial results [1 x ...].    |
+#| The block keeps its dtype, statistics are accumulated in float64 slice by   |
+#| slice so that no float64 copy of the entire block is created                |
+#|_____________________________________________________________________________|
+def _do_tstream_chunk(block, do_tarithm, nbins, computing_meta=False):
+    if computing_meta: return(block)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        shape = (1,)+block.shape[1:]
+        nb    = np.zeros(shape, dtype=np.int64)
+        for it in range(block.shape[0]): nb[0] += np.isfinite(block[it])
+        part  = dict({'n':nb})
+        
+        #_______________________________________________________________________
+        if   do_tarithm in ['mean', 'std', 'var', 'sum']:
+            sb = np.zeros(shape, dtype=np.float64)
+            for it in range(block.shape[0]): sb[0] += np.nan_to_num(block[it], nan=0.0)
+            if do_tarithm=='sum': 
+                part['s'] = sb
+            else:
+                mb = np.where(nb>0, sb/np.maximum(nb, 1), 0.0)
+                M2 = np.zeros(shape, dtype=np.float64)
+                for it in range(block.shape[0]): 
+                    M2[0] += np.nan_to_num((block[it]-mb[0])**2, nan=0.0)
+                part['m'], part['M2'] = mb, M2
+        elif do_tarithm=='max': part['v'] = np.fmax.reduce(block, axis=0, keepdims=True).astype(np.float64)
+        elif do_tarithm=='min': part['v'] = np.fmin.reduce(block, axis=0, keepdims=True).astype(np.float64)
+        else:
+            # histogram with nbins equidistant bins between the minimum and 
+            # maximum of the block at every point, bins are the last dimension
+            part['lo'] = np.fmin.reduce(block, axis=0, keepdims=True).astype(np.float64)
+            part['hi'] = np.fmax.reduce(block, axis=0, keepdims=True).astype(np.float64)
+            lo    = part['lo'].ravel()
+            dx    = (part['hi'].ravel()-lo)/nbins
+            hist  = np.zeros(lo.size*nbins, dtype=np.float32)
+            ipts  = np.arange(lo.size)*nbins
+            for it in range(block.shape[0]):
+                aux    = block[it].ravel()
+                isok   = np.isfinite(aux)
+                ibin   = np.zeros(lo.size, dtype=np.int64)
+                isdx   = isok & (dx>0)
+                ibin[isdx] = np.minimum(((aux[isdx]-lo[isdx])/dx[isdx]).astype(np.int64), nbins-1)
+                hist[ipts[isok]+ibin[isok]] += 1
+            part['h'] = hist.reshape(block.shape[1:]+(nbins,))
+    #___________________________________________________________________________
+    return(part)
+
+
+
+# ___MERGE PARTIAL RESULTS OF STREAMING TIME ARITHMETIC_________________________
+#|                                                                             |
+#|_____________________________________________________________________________|
+def _do_tstream_combine(parts, do_tarithm):
+    parts = list(parts)
+    if do_tarithm_quantile(do_tarithm) is not None: return(_do_tstream_combine_hist(parts))
+    acc = None
+    for part in parts:
+        if acc is None: 
+            acc = dict(part)
+            continue
+        n_new = acc['n']+part['n']
+        if   do_tarithm in ['mean', 'std', 'var']:
+            # merge block mean and variance into running mean and variance
+            delta     = part['m']-acc['m']
+            acc['M2'] = acc['M2'] + part['M2'] + delta**2*acc['n']*part['n']/np.maximum(n_new, 1)
+            acc['m']  = np.where(n_new>0, acc['m'] + delta*part['n']/np.maximum(n_new, 1), 0.0)
+        elif do_tarithm=='sum': acc['s'] = acc['s']+part['s']
+        elif do_tarithm=='max': acc['v'] = np.fmax(acc['v'], part['v'])
+        elif do_tarithm=='min': acc['v'] = np.fmin(acc['v'], part['v'])
+        acc['n'] = n_new
+    return(acc)
+
+
+
+# ___FINAL RESULT OF STREAMING TIME ARITHMETIC__________________________________
+#|                                                                             |
+#|_____________________________________________________________________________|
+def _do_tstream_aggregate(parts, do_tarithm, q, dtype, keepdims):
+    a = _do_tstream_combine(parts, do_tarithm)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if   do_tarithm=='mean': aux = np.where(a['n']>0, a['m'], np.nan)
+        elif do_tarithm=='var' : aux = np.where(a['n']>0, a['M2']/a['n'], np.nan)
+        elif do_tarithm=='std' : aux = np.where(a['n']>0, np.sqrt(a['M2']/a['n']), np.nan)
+        elif do_tarithm=='sum' : aux = a['s']
+        elif do_tarithm in ['max', 'min']: aux = a['v']
+        else                   : aux = _do_tstream_quantile_hist(a, q)
+    if not keepdims: aux = aux[0]
+    return(aux.astype(dtype))
+
+
+
+# ___MERGE HISTOGRAMS OF STREAMING QUANTILE_____________________________________
+#| the histograms of the parts are rebinned to the common range [lo, hi] of    |
+#| all parts and summed up, the counts within an old bin are assumed to be     |
+#| uniformly distributed. Once the range does not grow anymore the rebinning   |
+#| is exact, so the error stays in the order of the width of one bin           |
+#|_____________________________________________________________________________|
+def _do_tstream_combine_hist(parts):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lo, hi = parts[0]['lo'], parts[0]['hi']
+        for part in parts[1:]: lo, hi = np.fmin(lo, part['lo']), np.fmax(hi, part['hi'])
+        nbins  = parts[0]['h'].shape[-1]
+        frac   = (np.arange(nbins+1)/nbins).astype(np.float32)
+        ipts   = (np.arange(lo.size)*nbins).reshape(-1, 1)
+        acc    = dict({'n':0, 'lo':lo, 'hi':hi, 'h':0.0})
+        for part in parts:
+            acc['n'] = acc['n']+part['n']
+            if np.array_equal(part['lo'], lo, equal_nan=True) and np.array_equal(part['hi'], hi, equal_nan=True):
+                acc['h'] = acc['h']+part['h']
+                continue
+            # position of the new bin edges in units of old bins, the single 
+            # valued old histograms (or empty) are a step at their value
+            h     = part['h'].reshape(-1, nbins)
+            plo   = part['lo'].reshape(-1, 1)
+            scale = nbins/(part['hi'].reshape(-1, 1)-plo)
+            pos   = ((lo.reshape(-1, 1)-plo)*scale).astype(np.float32) \
+                    + ((hi-lo).reshape(-1, 1)*scale).astype(np.float32)*frac
+            isstp = ~np.isfinite(scale[:, 0])
+            if np.any(isstp):
+                edges      = lo.reshape(-1, 1)[isstp] + (hi-lo).reshape(-1, 1)[isstp]*frac
+                pos[isstp] = np.where(edges>=plo[isstp], nbins, 0)
+            np.clip(pos, 0, nbins, out=pos)
+            ibin  = np.minimum(pos.astype(np.int64), nbins-1)
+            pos  -= ibin
+            ibin += ipts
+            
+            # cumulative distribution of part at the new bin edges, piecewise
+            # linear within the old bins
+            cdf   = np.cumsum(h, axis=1, dtype=np.float64).ravel()[ibin]
+            cdf  -= (1.0-pos)*h.ravel()[ibin]
+            cdf[:, 0], cdf[:, -1] = 0.0, part['n'].ravel()
+            acc['h'] = acc['h'] + np.diff(cdf, axis=1).astype(np.float32).reshape(part['h'].shape)
+    return(acc)
+
+
+
+# ___QUANTILE FROM HISTOGRAM OF STREAMING QUANTILE______________________________
+#| linear interpolated quantile (like np.quantile) between the k-th and k+1-th |
+#| of the n sorted values, the k-th value is located in the histogram where    |
+#| the cumulative distribution reaches k+1/2                                   |
+#|_____________________________________________________________________________|
+def _do_tstream_quantile_hist(a, q):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n, lo, hi = a['n'].ravel(), a['lo'].ravel(), a['hi'].ravel()
+        nbins   = a['h'].shape[-1]
+        h       = a['h'].reshape(-1, nbins)
+        cdf     = np.cumsum(h, axis=1, dtype=np.float64)
+        qidx    = q*np.maximum(n-1, 0)
+        qlo     = np.floor(qidx)
+        qhi     = np.minimum(qlo+1, np.maximum(n-1, 0))
+        ipts    = np.arange(n.size)*nbins
+        aux     = list()
+        for trgt in [qlo+0.5, qhi+0.5]:
+            ibin  = np.minimum(np.sum(cdf<=trgt[:, None], axis=1), nbins-1)
+            hbin  = h.ravel()[ipts+ibin]
+            frac  = np.clip(np.where(hbin>0, (trgt-cdf.ravel()[ipts+ibin]+hbin)/hbin, 0.0), 0.0, 1.0)
+            aux.append(lo + (hi-lo)*(ibin+frac)/nbins)
+        aux     = aux[0] + (aux[1]-aux[0])*(qidx-qlo)
+        if   q==0.0: aux = lo
+        elif q==1.0: aux = hi
+        aux     = np.where(n>0, np.clip(aux, lo, hi), np.nan)
+    return(aux.reshape(a['n'].shape))
+
+
+# ___PERCENTILE OF TIME ARITHMETIC_____________________________________________
+#| returns quantile for do_tarithm='pXX' (e.g. 'p90' --> 0.9), 'median' -->    |
+#| 0.5 and None otherwise                                                      |
+#|_____________________________________________________________________________|
+def do_tarithm_quantile(do_tarithm):
+    if do_tarithm=='median': return(0.5)
+    if isinstance(do_tarithm, str) and do_tarithm.startswith('p'):
+        try   : q = float(do_tarithm[1:])/100.0
+        except ValueError: return(None)
+        if 0.0<=q<=1.0: return(q)
+    return(None)
+
+
 # ___COMPUTE HORIZONTAL ARITHMETICS ON DATA____________________________________
 #| do arithmetic on depth dimension                                            |
 #| ___INPUT_________________________________________________________________   |
@@ -891,23 +1964,25 @@ def do_vector_rotation(data, mesh, do_vec, do_vecrot):
         # which varaibles are in data, must be two to compute vector rotation
         vname = list(data.keys())
         
+        dims  = list(data[vname[0]].dims)
+        
         # vector data are on vertices 
-        if ('nod2' in data[vname[0]].dims) or ('node' in data[vname[0]].dims):
+        if ('nod2' in dims) or ('node' in dims):
             print(' > do vector rotation')
             data[vname[0] ].data,\
-            data[vname[1]].data = vec_r2g(mesh.abg, mesh.n_x, mesh.n_y, 
+            data[vname[1]].data = vec_r2g(mesh.abg, None, None, 
                                         data[vname[0]].data, data[vname[1]].data, 
-                                        gridis='geo' )
+                                        gridis='geo', rcoef=mesh.n_rcoef, 
+                                        axis=dims.index('nod2' if 'nod2' in dims else 'node'))
         
         # vector data are on elements
-        if ('elem' in data[vname[0]].dims):
+        if ('elem' in dims):
             print(' > do vector rotation')
             data[vname[0] ].data,\
-            data[vname[1]].data = vec_r2g(mesh.abg, 
-                                        mesh.n_x[mesh.e_i].sum(axis=1)/3, 
-                                        mesh.n_y[mesh.e_i].sum(axis=1)/3, 
+            data[vname[1]].data = vec_r2g(mesh.abg, None, None, 
                                         data[vname[0]].data, data[vname[1]].data, 
-                                        gridis='geo' )  
+                                        gridis='geo', rcoef=mesh.e_rcoef, 
+                                        axis=dims.index('elem'))  
     #___________________________________________________________________________
     return(data)
 
@@ -953,6 +2028,67 @@ def do_vector_norm(data, do_norm):
     return(data)  
 
 
+# ___ANALYSE LIST OF VARIABLES_________________________________________________
+#| split list of variables of a multi variable load into variables that are    |
+#| returned, variables that are loaded from the files and derived variable     |
+#| recipes                                                                     |
+#| ___INPUT_________________________________________________________________   |
+#| vname_list   :   list, entries are variable names (str) or recipes of       |
+#|                  derived variables (vname_new, func, [vname_in, ...]),      |
+#|                  vname_new = func(data[vname_in], ...). Inputs can also be  |
+#|                  derived variables of previous recipes                      |
+#| ___RETURNS_______________________________________________________________   |
+#| vname_keep   :   list, variables that are returned beside derived ones      |
+#| vname_load   :   list, variables that are loaded from the files             |
+#| recipes      :   list, recipes of derived variables                         |
+#|_____________________________________________________________________________|
+def do_vname_list(vname_list):
+    vname_keep, vname_load, recipes = [], [], []
+    for vname_i in vname_list:
+        if   isinstance(vname_i, str): 
+            vname_keep.append(vname_i)
+            vname_load.append(vname_i)
+        elif isinstance(vname_i, (list, tuple)) and len(vname_i)==3 and callable(vname_i[1]):
+            vname_new, func, vname_in = vname_i
+            if isinstance(vname_in, str): vname_in = [vname_in]
+            vname_load.extend([x for x in vname_in if x not in [r[0] for r in recipes]])
+            recipes.append((vname_new, func, list(vname_in)))
+        else:
+            raise ValueError(' entry {} of vname list must be a variable name or a recipe (vname_new, func, [vname_in, ...])'.format(str(vname_i)))
+    
+    #___________________________________________________________________________
+    vname_load = list(dict.fromkeys(vname_load))
+    if len(vname_load)==0: raise ValueError(' vname list contains no variable that can be loaded from the files')
+    return(vname_keep, vname_load, recipes)
+
+
+
+# ___COMPUTE DERIVED VARIABLES_________________________________________________
+#| compute derived variables of a multi variable load, inputs that were not    |
+#| requested as variable themselves are dropped afterwards                     |
+#| ___INPUT_________________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#| recipes      :   list, recipes (vname_new, func, [vname_in, ...]), see      |
+#|                  do_vname_list                                              |
+#| vname_keep   :   list, variables that are returned                          |
+#| ___RETURNS_______________________________________________________________   |
+#| data         :   xarray dataset object                                      |
+#|_____________________________________________________________________________|
+def do_derived_vars(data, recipes, vname_keep):
+    if not recipes: return(data)
+    for vname_new, func, vname_in in recipes:
+        data[vname_new] = func(*[data[x] for x in vname_in])
+    
+    #___________________________________________________________________________
+    vname_new  = [r[0] for r in recipes]
+    vname_drop = [x for r in recipes for x in r[2] if x not in vname_keep and x not in vname_new]
+    data       = data.drop_vars(list(dict.fromkeys(vname_drop)))
+    
+    #___________________________________________________________________________
+    return(data)
+
+
+
 # ___COMPUTE LOGARYTHMIC RESCALING_____________________________________________
 #| compute vector norm: vname='vec+u+v'                                        |
 #| ___INPUT_________________________________________________________________   |
@@ -1000,14 +2136,9 @@ def do_potential_desnsity(data, do_pdens, vname, vname2, vname_tmp):
         elif vname_tmp == 'sigma4' : pref=4000
         elif vname_tmp == 'sigma5' : pref=5000
         
-        if 'time' in data.dims:
-            data_depth = data['nz1'].expand_dims(dict({'time':data.dims['time'], 'nod2':data.dims['nod2']}))
-        else:
-            data_depth = data['nz1'].expand_dims(dict({'nod2':data.dims['nod2']}))
-            
-        # data = data.assign({vname_tmp: (list(data[vname].dims), sw.pden(data[vname2].data, data[vname].data, data_depth, pref)-1000.025)})
-        data = data.assign({vname_tmp: (list(data[vname].dims), sw.dens(data[vname2].data, data[vname].data, pref)-1000.025)})
-        del(data_depth)
+        # temp is potential temperature --> density at reference pressure, 
+        # block wise and lazy for dask arrays
+        data = data.assign({vname_tmp: (list(data[vname].dims), eos_unesco(data[vname2].data, data[vname].data, pref, which='dens', rhooff=1000.025))})
         data = data.drop(labels=[vname, vname2])
         data[vname_tmp].attrs['units'] = 'kg/m^3'
         vname = vname_tmp
@@ -1018,8 +2149,144 @@ def do_potential_desnsity(data, do_pdens, vname, vname2, vname_tmp):
 
 
 
+# ___EQUATION OF STATE UNESCO 1983 (EOS-80)____________________________________
+#| compiled version of seawater.dens, seawater.ptmp and seawater.pden that     |
+#| evaluates point by point in float64 and only writes the result array (in    |
+#| dtype of input or given dtype). Dask arrays are processed block by block via|
+#| map_blocks, the pressure is a scalar or a 1d array along the vertical axis  |
+#| that is sliced per block and never broadcasted to the full field.           |
+#| ___INPUT_________________________________________________________________   |
+#| salt     :   array, practical salinity (numpy or dask)                      |
+#| temp     :   array, temperature [°C], in-situ (which='ptmp','pden') or      |
+#|              potential temperature referenced to pres (which='dens')        |
+#| pres     :   float or 1d array, pressure [dbar] (depth in m is used as      |
+#|              approximation), 1d array must have the size of axis            |
+#| pref     :   float, reference pressure [dbar] for which='ptmp','pden',      |
+#|              default: 0.0                                                   |
+#| which    :   str, 'dens' in-situ density, 'ptmp' potential temperature,     |
+#|              'pden' potential density, default: 'dens'                      |
+#| axis     :   int, vertical axis of salt, temp along which the 1d pres is    |
+#|              given, default: -1                                             |
+#| rhooff   :   float, value subtracted in float64 before casting to dtype,    |
+#|              e.g. 1000.025 for sigma, default: 0.0                          |
+#| dtype    :   numpy dtype of result, default: None, dtype of temp            |
+#| ___RETURNS_______________________________________________________________   |
+#| out      :   array, density [kg/m^3] or potential temperature [°C]          |
+#|_____________________________________________________________________________|
+def eos_unesco(salt, temp, pres, pref=0.0, which='dens', axis=-1, rhooff=0.0, dtype=None):
+    iwhich = dict({'dens':0, 'ptmp':1, 'pden':2}).get(which)
+    if iwhich is None: raise ValueError(" --> which must be 'dens', 'ptmp' or 'pden'")
+    if dtype is None: dtype = np.result_type(temp.dtype, np.float32)
+    pres = np.atleast_1d(np.asarray(pres, dtype=np.float64))
+    if temp.ndim==0: axis = 0
+    if axis<0: axis = temp.ndim+axis
+    if pres.size>1 and pres.size!=temp.shape[axis]: 
+        raise ValueError(' --> size of pres {} does not fit to axis {} of data {}'.format(pres.size, axis, str(temp.shape)))
+    
+    #___________________________________________________________________________
+    # dask arrays: evaluate block by block with pressure of the block levels, 
+    # dask provides the parallelism over the blocks
+    if hasattr(salt, 'dask') or hasattr(temp, 'dask'):
+        salt, temp = da.asarray(salt), da.asarray(temp)
+        salt       = salt.rechunk(temp.chunks)
+        lev_off    = np.cumsum((0,)+temp.chunks[axis]) if temp.ndim>0 else np.zeros(2, dtype=int)
+        def _eos_block(sblock, tblock, block_info=None):
+            if pres.size==1: pblock = pres
+            else:
+                ilev   = block_info[0]['chunk-location'][axis]
+                pblock = pres[lev_off[ilev]:lev_off[ilev+1]]
+            return(_do_eos_apply(sblock, tblock, pblock, pref, iwhich, axis, rhooff, dtype, _eos_kernel_serial))
+        out = da.map_blocks(_eos_block, salt, temp, dtype=dtype)
+    
+    #___________________________________________________________________________
+    # numpy arrays: evaluate parallel over all points
+    else:
+        out = _do_eos_apply(np.asarray(salt), np.asarray(temp), pres, pref, iwhich, axis, rhooff, dtype, _eos_kernel_parallel)
+    
+    #___________________________________________________________________________
+    return(out)
+
+
+def _do_eos_apply(salt, temp, pres, pref, iwhich, axis, rhooff, dtype, kernel):
+    shape = np.broadcast_shapes(salt.shape, temp.shape)
+    salt  = np.ascontiguousarray(np.broadcast_to(salt, shape)).reshape(-1)
+    temp  = np.ascontiguousarray(np.broadcast_to(temp, shape)).reshape(-1)
+    # flat index i --> level index (i//ninner)%npres in C order
+    ninner= int(np.prod(shape[axis+1:])) if pres.size>1 else 1
+    out   = np.empty(salt.size, dtype=dtype)
+    kernel(salt, temp, pres, float(pref), iwhich, ninner, float(rhooff), out)
+    return(out.reshape(shape))
+
+
+@njit(nogil=True)
+def _eos_dens(s, t, p):
+    T68 = t*1.00024
+    sq  = s**0.5
+    # density at atmospheric pressure, UNESCO 1983 Eqn.(13)
+    rho0= (999.842594 + (6.793952e-2 + (-9.095290e-3 + (1.001685e-4 + (-1.120083e-6 + 6.536332e-9*T68)*T68)*T68)*T68)*T68
+          + (8.24493e-1 + (-4.0899e-3 + (7.6438e-5 + (-8.2467e-7 + 5.3875e-9*T68)*T68)*T68)*T68)*s
+          + (-5.72466e-3 + (1.0227e-4 - 1.6546e-6*T68)*T68)*s*sq + 4.8314e-4*s*s)
+    # secant bulk modulus, UNESCO 1983 Eqn.(15-19)
+    p   = p/10.0
+    AW  = 3.239908 + (1.43713e-3 + (1.16092e-4 - 5.77905e-7*T68)*T68)*T68
+    BW  = 8.50935e-5 + (-6.12293e-6 + 5.2787e-8*T68)*T68
+    KW  = 19652.21 + (148.4206 + (-2.327105 + (1.360477e-2 - 5.155288e-5*T68)*T68)*T68)*T68
+    A   = AW + (2.2838e-3 + (-1.0981e-5 - 1.6078e-6*T68)*T68 + 1.91075e-4*sq)*s
+    B   = BW + (-9.9348e-7 + (2.0816e-8 + 9.1697e-10*T68)*T68)*s
+    K0  = KW + (54.6746 + (-0.603459 + (1.09987e-2 - 6.1670e-5*T68)*T68)*T68 
+                + (7.944e-2 + (1.6483e-2 - 5.3009e-4*T68)*T68)*sq)*s
+    return(rho0/(1.0 - p/(K0 + (A + B*p)*p)))
+
+
+@njit(nogil=True)
+def _eos_adtg(s, t, p):
+    T68 = t*1.00024
+    return(3.5803e-5 + (8.5258e-6 + (-6.836e-8 + 6.6228e-10*T68)*T68)*T68
+           + (1.8932e-6 - 4.2393e-8*T68)*(s-35.0)
+           + ((1.8741e-8 + (-6.7795e-10 + (8.733e-12 - 5.4481e-14*T68)*T68)*T68)
+              + (-1.1351e-10 + 2.7759e-12*T68)*(s-35.0))*p
+           + (-4.6206e-13 + (1.8676e-14 - 2.1687e-16*T68)*T68)*p*p)
+
+
+@njit(nogil=True)
+def _eos_ptmp(s, t, p, pr):
+    # 4th order Runge-Kutta integration of adiabatic lapse rate (Fofonoff 1977)
+    sq2   = 2.0**0.5
+    del_P = pr - p
+    del_th= del_P*_eos_adtg(s, t, p)
+    th    = t*1.00024 + 0.5*del_th
+    q     = del_th
+    del_th= del_P*_eos_adtg(s, th/1.00024, p + 0.5*del_P)
+    th    = th + (1.0 - 1.0/sq2)*(del_th - q)
+    q     = (2.0 - sq2)*del_th + (-2.0 + 3.0/sq2)*q
+    del_th= del_P*_eos_adtg(s, th/1.00024, p + 0.5*del_P)
+    th    = th + (1.0 + 1.0/sq2)*(del_th - q)
+    q     = (2.0 + sq2)*del_th + (-2.0 - 3.0/sq2)*q
+    del_th= del_P*_eos_adtg(s, th/1.00024, p + del_P)
+    return((th + (del_th - 2.0*q)/6.0)/1.00024)
+
+
+def _eos_loop(salt, temp, pres, pref, iwhich, ninner, rhooff, out):
+    npres = pres.size
+    for ii in prange(salt.size):
+        s = np.float64(salt[ii])
+        t = np.float64(temp[ii])
+        p = pres[(ii//ninner)%npres]
+        if   iwhich==0: out[ii] = _eos_dens(s, t, p) - rhooff
+        elif iwhich==1: out[ii] = _eos_ptmp(s, t, p, pref)
+        else          : out[ii] = _eos_dens(s, _eos_ptmp(s, t, p, pref), pref) - rhooff
+
+# inside dask blocks run serial (dask threads are the parallelism, numba 
+# parallel regions must not be nested into them), for numpy arrays parallel
+_eos_kernel_serial   = njit(nogil=True)(_eos_loop)
+_eos_kernel_parallel = njit(parallel=True)(_eos_loop)
+
+
+
 # ___INTERPOLATE ELEMENTAL DATA TO VERTICES____________________________________
-#| interpolate data on elements to vertices                                    |
+#| interpolate data on elements to vertices, dask backed variables stay lazy   |
+#| and are interpolated block by block (elem dimension in a single chunk),     |
+#| also for time resolved data                                                 |
 #| ___INPUT_________________________________________________________________   |
 #| data         :   xarray dataset object                                      |
 #| mesh         :   fesom2 mesh object                                         |
@@ -1035,28 +2302,19 @@ def do_interp_e2n(data, mesh, do_ie2n):
         print(' > do interpolation e2n')
         #_______________________________________________________________________
         for vname in vname_list:
-            # interpolate elem to vertices
-            #aux = grid_interp_e2n(mesh,data[vname].data)
-            #with np.errstate(divide='ignore',invalid='ignore'):
-            aux = grid_interp_e2n(mesh,data[vname].values)
-            #print(aux.shape)
-            # new variable name 
-            vname_new = 'n_'+vname
+            dims = data[vname].dims
+            if 'elem' not in dims: continue
             
-            # add vertice interpolated variable to dataset
-            #print(data)
-            if   'nz' in data.dims:
-                data = xr.merge([ data, xr.Dataset({vname_new: ( ['nod2','nz'],aux)})], combine_attrs="no_conflicts")
-            elif 'nz1' in data.dims:
-                data = xr.merge([ data, xr.Dataset({vname_new: ( ['nod2','nz1'],aux)})], combine_attrs="no_conflicts")
-            elif 'nz_1' in data.dims:
-                data = xr.merge([ data, xr.Dataset({vname_new: ( ['nod2','nz_1'],aux)})], combine_attrs="no_conflicts")
-            else:
-                data = xr.merge([ data, xr.Dataset({vname_new: ( 'nod2',aux)})], combine_attrs="no_conflicts")
-            # copy attributes from elem to vertice variable 
-            data[vname_new].attrs = data[vname].attrs
+            # interpolate elem to vertices, keep order of dimensions
+            z_dim = [dims.index(x) for x in ['nz', 'nz1', 'nz_1'] if x in dims]
+            aux   = grid_interp_e2n(mesh, data[vname].data, e_dim=dims.index('elem'), 
+                                    z_dim=z_dim[0] if len(z_dim) else None)
             
-            # delete elem variable from dataset
+            # add vertice interpolated variable with attributes of elem variable
+            # to dataset, delete elem variable from dataset
+            vname_new = 'n_'+vname
+            dims_new  = tuple(['nod2' if x=='elem' else x for x in dims])
+            data = data.assign({vname_new: (dims_new, aux, data[vname].attrs)})
             data = data.drop(labels=vname)
     
     #___________________________________________________________________________
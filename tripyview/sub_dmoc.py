@@ -70,72 +70,55 @@ def load_dmoc_data(mesh, datapath, descript, year, which_transf, std_dens, #n_ar
     # create xarray dataset to combine dat for dmoc computation
     data_DMOC = xr.Dataset()
     
+    #___________________________________________________________________________
+    # all std_* variables on elements are loaded in a single pass, every file 
+    # set is opened once and coordinates and weights are shared
+    do_srf  = (which_transf=='srf' or which_transf=='inner') or do_dflx
+    do_h    = (not do_wdiap) and (not do_dflx)
+    vname_list = []
+    if do_srf:
+        # compute combined density flux: heat_flux+freshwater_flux+restoring_flux
+        if do_dflx: vname_list.append(('dmoc_fd', lambda fh, fw, fr: fh+fw+fr, ['std_heat_flux', 'std_frwt_flux', 'std_rest_flux']))
+        else      : vname_list.extend(['std_heat_flux', 'std_frwt_flux', 'std_rest_flux'])
+    if add_trend: vname_list.append('std_dens_dVdT')
+    if do_h     : vname_list.append('std_dens_H')
+    if len(vname_list)>0:
+        data = load_data_fesom2(mesh, datapath, vname=vname_list, year=year, 
+                                descript=descript , do_info=do_info, do_ie2n=False, 
+                                do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute)
+        data = data.assign_coords({'ndens' :("ndens",std_dens)})
+    
     #___________________________________________________________________________
     # add surface transformations 
-    if (which_transf=='srf' or which_transf=='inner') or do_dflx: # add surface fluxes
+    if do_srf: # add surface fluxes
         
-        # compute combined density flux: heat_flux+freshwater_flux+restoring_flux
+        # combined density flux: heat_flux+freshwater_flux+restoring_flux
         if do_dflx: 
-            data = load_data_fesom2(mesh, datapath, vname='std_heat_flux', year=year, 
-                                    descript=descript , do_info=do_info, do_ie2n=False, 
-                                    do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute)
-            data['std_heat_flux'].data = data['std_heat_flux'].data +\
-                        load_data_fesom2(mesh, datapath, vname='std_frwt_flux', 
-                                         year=year, descript=descript , do_info=do_info, do_ie2n=False, 
-                                         do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute)['std_frwt_flux'].data + \
-                        load_data_fesom2(mesh, datapath, vname='std_rest_flux', 
-                                         year=year, descript=descript , do_info=do_info, do_ie2n=False, 
-                                         do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute)['std_rest_flux'].data
-            data      = data.rename({'std_heat_flux':'dmoc_fd'}).assign_coords({'ndens' :("ndens",std_dens)})
-            data_DMOC = xr.merge([data_DMOC, data], combine_attrs="no_conflicts")
+            data_DMOC = data[['dmoc_fd']]
             data_DMOC = data_DMOC / weight_dens * 1024
             #data_DMOC = data_DMOC / e_area
             data_DMOC = data_DMOC / data['w_A']#--> element area
             data_DMOC = data_DMOC.assign_attrs(data.attrs)
-            del(data)
         
-        # compute single flux from heat_flux & freshwater_flux &restoring_flux
+        # single flux from heat_flux & freshwater_flux &restoring_flux
         else:
-            data_DMOC = xr.merge([data_DMOC, 
-                                load_data_fesom2(mesh, datapath, vname='std_heat_flux', 
-                                                 year=year, descript=descript , do_info=do_info, do_ie2n=False, 
-                                                 do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute).rename({'std_heat_flux':'dmoc_fh'})],
-                                combine_attrs="no_conflicts") 
-            data_DMOC = xr.merge([data_DMOC, 
-                                load_data_fesom2(mesh, datapath, vname='std_frwt_flux', 
-                                                 year=year, descript=descript , do_info=do_info, do_ie2n=False, 
-                                                 do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute).rename({'std_frwt_flux':'dmoc_fw'})],
-                                combine_attrs="no_conflicts")   
-            data_DMOC = xr.merge([data_DMOC, 
-                                load_data_fesom2(mesh, datapath, vname='std_rest_flux', 
-                                                 year=year, descript=descript , do_info=do_info, do_ie2n=False, 
-                                                 do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute).rename({'std_rest_flux':'dmoc_fr'})],
-                                combine_attrs="no_conflicts")   
-            data_attrs= data_DMOC.attrs # rescue attributes will get lost during multipolication
-            data_DMOC = data_DMOC.assign_coords({'ndens' :("ndens",std_dens)})
+            data_DMOC = data[['std_heat_flux', 'std_frwt_flux', 'std_rest_flux']].rename(
+                            {'std_heat_flux':'dmoc_fh', 'std_frwt_flux':'dmoc_fw', 'std_rest_flux':'dmoc_fr'})
             data_DMOC = data_DMOC / weight_dens * 1024
-            data_DMOC = data_DMOC.assign_attrs(data_attrs)
-            del(data_attrs)
+            data_DMOC = data_DMOC.assign_attrs(data.attrs)
     
     #___________________________________________________________________________
     # add volume trend  
     if add_trend:  
-        data_DMOC = xr.merge([data_DMOC, 
-                              load_data_fesom2(mesh, datapath, vname='std_dens_dVdT', 
-                                               year=year, descript=descript , do_info=do_info, do_ie2n=False, 
-                                               do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute).rename({'std_heat_flux':'dmoc_dvdt'})],
+        data_DMOC = xr.merge([data_DMOC, data[['std_dens_dVdT']].rename({'std_dens_dVdT':'dmoc_dvdt'})],
                               combine_attrs="no_conflicts")
     
     #___________________________________________________________________________
     # skip this when doing diapycnal vertical velocity
-    if (not do_wdiap) and (not do_dflx):
+    if do_h:
         #_______________________________________________________________________
         # add vertical density class thickness
-        data_h = load_data_fesom2(mesh, datapath, vname='std_dens_H'   , 
-                                     year=year, descript=descript , do_info=do_info, 
-                                     do_ie2n=False, do_tarithm=do_tarithm, do_nan=False, do_compute=do_compute)
-        data_h = data_h.rename({'std_dens_H':'ndens_h'})
-        data_h = data_h.assign_coords({'ndens' :("ndens",std_dens)})
+        data_h = data[['std_dens_H']].rename({'std_dens_H':'ndens_h'})
         data_DMOC = xr.merge([data_DMOC, data_h], combine_attrs="no_conflicts")
         
         if do_ndensz:
@@ -37,6 +37,8 @@ def load_index_fesom2(mesh, data, box_list, boxname=None, do_harithm='wmean',
         #_______________________________________________________________________
         # compute  mask index
         idx_IN=do_boxmask(mesh,box)
+        # data might be loaded only for a region, see load_data_fesom2(box=...)
+        if 'nod2' in data.dims: idx_IN=do_boxmask_data(mesh, data, idx_IN, 'nod2')
         
         #_______________________________________________________________________
         # selected points in xarray dataset object and  average over selected 
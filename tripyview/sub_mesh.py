@@ -3,11 +3,22 @@
 import sys
 import os
 import time
+import json
+import shutil
+import copy
+import hashlib
+import weakref
 import numpy  as np
 import pandas as pa
+import dask.array as da
 import joblib
 import pickle5 as pickle
 from   netCDF4 import Dataset
+from   scipy.sparse import csr_matrix
+from   scipy.spatial import cKDTree
+from   numba import njit, prange
+try   : import fcntl
+except ImportError: fcntl = None
 from .sub_mesh import *
 
 # ___INITIALISE/LOAD FESOM2.0 MESH CLASS IN MAIN PROGRAMM______________________
@@ -19,9 +30,11 @@ from .sub_mesh import *
 def load_mesh_fesom2(
                     meshpath, abg=[50,15,-90], focus=0, do_rot='None', 
                     do_augmpbnd=True, do_cavity=False, do_info=True, 
-                    do_lsmask=True, do_lsmshp=True, do_pickle=True, 
+                    do_lsmask=True, do_lsmshp=False, do_pickle=True, 
                     do_earea=True, do_narea=True,
-                    do_eresol=[False,'mean'], do_nresol=[False,'e_resol'] 
+                    do_eresol=[False,'mean'], do_nresol=[False,'e_resol'], 
+                    which_cache='npy', do_binmesh=False, do_edges=False, 
+                    do_sindex=False, do_compact=False
                     ):
     """
     ---> load FESOM2 mesh:
@@ -43,7 +56,27 @@ def load_mesh_fesom2(
                     see mesh.lsmask, augments its periodic boundaries see 
                     mesh.lasmask_a and computes land sea mask patch see mesh.lsmask_p,
                     default: True
-    do_pickle   :   bool, store and load mesh from *.pckl binary file, default: True
+    do_lsmshp   :   bool, write the shapefiles of the land-sea mask (periodic 
+                    boundary and augmented) already when the mesh is loaded, 
+                    default: False, than they are written only at their first
+                    use, see mesh.get_lsmask_shapefile
+    do_pickle   :   bool, store and load mesh from binary cache, default: True. 
+                    Every combination of mesh files, abg, do_rot, focus, 
+                    do_augmpbnd and do_cavity is stored as own cache variant 
+                    (see compute_meshcache_key). When stored in the cache folder 
+                    MESHPATH_TRIPYVIEW, least recently used variants are 
+                    removed when the folder exceeds MESHPATH_TRIPYVIEW_MAXSIZE 
+                    (in GB, default: 20), see meshcache_evict
+    which_cache :   str, format of the binary mesh cache, default: 'npy'
+                    'npy'  : directory with one memory-mappable *.npy file per 
+                             array and a json manifest, arrays are only loaded 
+                             on first attribute access, see npycache_2mesh
+                    'pckl' : single *.pckl file with entire mesh object 
+    do_binmesh  :   bool, store the parsed ascii mesh files (nod2d.out, 
+                    elem2d.out, nlvls.out, ...) once as binary *.tpv.npy 
+                    sidecar files (validated by size, modification time and 
+                    shape), further mesh builds skip the text parsing, 
+                    see read_meshfile, default: False
     do_earea    :   bool, compute or load from fesom.mesh.diag.nc the area of elements
     do_eresol   :   list([bool,str]), compute resolution based on elements, 
                     str can be "mean": resolution based on mean element edge 
@@ -54,6 +87,18 @@ def load_mesh_fesom2(
                     of vertices, default: False
     do_nresol   :   bool, compute resolution at nodes from interpolation of 
                     resolution at elements, default: False
+    do_edges    :   bool, compute or load from fesom.mesh.diag.nc the edge 
+                    topology mesh.edges, mesh.edge_tri, mesh.edge_cross_dxdy, 
+                    see mesh.compute_edges(), default: False
+    do_sindex   :   bool, compute spatial index of mesh for fast queries of 
+                    nearest vertices, containing elements, vertices in box or 
+                    radius, see mesh.compute_sindex(), mesh.query_...(), 
+                    default: False
+    do_compact  :   bool, reduce memory footprint of mesh object after it is 
+                    loaded, minimal integer type for level indices, float32 
+                    areas and coordinates, drop pre-rotation copies n_xo, n_yo, 
+                    the cache keeps the full mesh, see mesh.compact() and 
+                    mesh.memory_usage(), default: False
     ___RETURNS:_________________________________________________________________
     mesh        :   object, returns fesom_mesh object
     """
@@ -75,37 +120,71 @@ def load_mesh_fesom2(
         os.makedirs(cachepath)
     
     #___________________________________________________________________________
-    # check if pickle file can be found somewhere either in mesh folder or in 
-    # cache folder 
+    # check if pickle file or npy cache directory can be found somewhere either 
+    # in mesh folder or in cache folder. Every mesh variant is stored under its 
+    # own name, that is keyed on the content of the mesh files and all options 
+    # that change the mesh geometry (abg, do_rot, focus, do_augmpbnd, do_cavity).
+    # Cache files with the old naming (tripyview_fesom2_<meshid>_focus<focus>
+    # .pckl, only focus) are still found, they are converted after loading and
+    # saved as variant
     #picklefname = 'mypymesh_fesom2.pckl'
     #picklefname = 'tripyview_fesom2_'+meshid+'.pckl'
-    picklefname = 'tripyview_fesom2_{}_focus{}.pckl'.format(meshid,focus)
+    if   which_cache=='pckl': fext = 'pckl'
+    elif which_cache=='npy' : fext = 'npycache'
+    else: raise ValueError("The option which_cache={} is not supported. (only: 'npy', 'pckl')".format(str(which_cache)))
+    
+    loadpicklepath = 'None'
     if do_pickle:
-        # check if mypy pickle meshfile is found in meshfolder
-        if    ( os.path.isfile(os.path.join(meshpath, picklefname)) ):
-            loadpicklepath = os.path.join(meshpath, picklefname)
-            if do_info: print(' > found *.pckl file: {}'.format(os.path.dirname(loadpicklepath)))    
-            
-        # check if mypy pickle meshfile is found in cache folder
-        elif ( os.path.isfile(os.path.join(cachepath, picklefname)) ):
-            loadpicklepath = os.path.join(cachepath, picklefname)
-            if do_info: print(' > found *.pckl file: {}'.format(os.path.dirname(loadpicklepath)))
-            
+        meshkey     = compute_meshcache_key(meshpath, cachepath, abg, do_rot, focus, do_augmpbnd, do_cavity)
+        picklefname = 'tripyview_fesom2_{}_{}.{}'.format(meshid, meshkey, fext)
+        legacyfname = 'tripyview_fesom2_{}_focus{}.pckl'.format(meshid, focus)
+        for fname in [picklefname, legacyfname]:
+            # check if mypy pickle meshfile is found in meshfolder or cache folder
+            for path in [meshpath, cachepath]:
+                if ( os.path.exists(os.path.join(path, fname)) ):
+                    loadpicklepath = os.path.join(path, fname)
+                    break
+            if os.path.exists(loadpicklepath): break
+        
+        if os.path.exists(loadpicklepath):
+            if do_info: print(' > found *.{} file: {}'.format(os.path.splitext(loadpicklepath)[1][1:], os.path.dirname(loadpicklepath)))    
         else:
-            loadpicklepath = 'None'
-            print(' > found no .pckl file in cach or mesh path')    
+            print(' > found no .{} file in cach or mesh path'.format(which_cache))    
+    
+    #___________________________________________________________________________
+    # load npy cache, if it has an outdated version it is ignored and the mesh 
+    # is build again from the *.out files
+    mesh = None
+    if do_pickle and os.path.exists(loadpicklepath): 
+        if do_info: print(' > load  *.{} file: {}'.format(os.path.splitext(loadpicklepath)[1][1:], os.path.basename(loadpicklepath)))
+        if loadpicklepath.endswith('.npycache'):
+            mesh = npycache_2mesh(loadpicklepath, do_info=do_info)
+        else:
+            fid  = open(loadpicklepath, "rb")
+            mesh = pickle.load(fid)
+            fid.close()
+        
+        # attributes that dont exist in older cache files get their default
+        if mesh is not None:
+            lazy = mesh.__dict__.get('_lazy_cache', dict())
+            for key, val in _MESH_DEFAULTS.items():
+                if key not in mesh.__dict__ and key not in lazy: setattr(mesh, key, copy.deepcopy(val))
+        
+        # mark cache as recently used for the eviction of old cache files
+        try   : os.utime(loadpicklepath)
+        except OSError: pass
             
     #___________________________________________________________________________
     # load pickle file if it exists and load it from .pckl file, if it does not 
     # exist create mesh object with fesom_mesh
     # do_pickle==True and .pckl file exists
-    if   do_pickle and ( os.path.isfile(loadpicklepath) ): 
-        if do_info: print(' > load  *.pckl file: {}'.format(os.path.basename(loadpicklepath)))
+    if mesh is not None: 
         #_______________________________________________________________________
-        fid  = open(loadpicklepath, "rb")
-        mesh = pickle.load(fid)
-        fid.close()
+        # remember state of loaded mesh, when it changes the mesh variant is 
+        # saved again
+        meshstate = _do_meshcache_state(mesh)
         
+        #_______________________________________________________________________
         do_pbndfind=False
         #_______________________________________________________________________
         # rotate mesh if its not done in .pckle file 
@@ -162,8 +241,10 @@ def load_mesh_fesom2(
                     del auxx, auxy
                         
         #_______________________________________________________________________
-        # find periodic boundary
+        # find periodic boundary, centroids and rotation coefficients have to 
+        # be recomputed
         if do_pbndfind:
+            mesh.reset_derived()
             mesh.pbnd_find()
         
         #_______________________________________________________________________
@@ -196,15 +277,32 @@ def load_mesh_fesom2(
                 mesh.compute_lsmask()
                 if mesh.do_augmpbnd:
                     mesh.augment_lsmask()
+        if not getattr(mesh, 'do_edges', False) and do_edges:
+            mesh.compute_edges()
+        if do_pbndfind and getattr(mesh, 'do_sindex', False):
+            mesh.compute_sindex()
+        elif not getattr(mesh, 'do_sindex', False) and do_sindex:
+            mesh.compute_sindex()
         
         #_______________________________________________________________________
+        # store mesh variant when it was loaded from old cache file or 
+        # additional properties were computed
+        if (os.path.basename(loadpicklepath)!=picklefname) or (_do_meshcache_state(mesh)!=meshstate):
+            _do_save_meshcache(mesh, meshpath, cachepath, picklefname, which_cache, pickleprotocol, do_info)
+        
+        #_______________________________________________________________________
+        mesh.do_lsmshp = do_lsmshp
+        _do_write_lsmshp(mesh, do_info)
+        
+        #_______________________________________________________________________
+        if do_compact: mesh.compact(do_info=do_info)
         if do_info: print(mesh.info())
         
         #_______________________________________________________________________
         return(mesh)
     
     # (do_pickle==True and .pckl file does not exists) or (do_pickle=False)
-    elif (do_pickle and not ( os.path.isfile(loadpicklepath)) ) or not do_pickle:
+    else:
         if do_info: print(' > load mesh from *.out files: {}'.format(meshpath))
         #_______________________________________________________________________
         mesh = mesh_fesom2(
@@ -220,37 +318,445 @@ def load_mesh_fesom2(
                     do_narea   = do_narea     ,
                     do_nresol  = do_nresol    ,
                     do_lsmask  = do_lsmask    ,
-                    do_lsmshp  = do_lsmshp)
+                    do_lsmshp  = do_lsmshp    ,
+                    do_binmesh = do_binmesh   ,
+                    do_edges   = do_edges     ,
+                    do_sindex  = do_sindex)
         
         #_______________________________________________________________________
-        # save mypy mesh .pckl file
-        # --> try 1.st to store it in the mesh in the meshfolder, will depend of 
-        #     there is permission to write
+        # save mypy mesh .pckl file, together with the derived geometry
         if do_pickle:
-            try: 
-                savepicklepath = os.path.join(meshpath,picklefname)
-                if do_info: print(' > save mesh to *.pckl in {}'.format(savepicklepath))
-                fid = open(savepicklepath, "wb")
-                pickle.dump(mesh, fid, protocol=pickleprotocol)
-                fid.close()
-            # if no permission rights for writing in meshpath folder try 
-            # cachefolder   
-            except PermissionError:
-                try: 
-                    savepicklepath = os.path.join(cachepath,picklefname)
-                    mesh.cachepath = cachepath
-                    if do_info: print(' > save mesh to *.pckl in {}'.format(savepicklepath))
-                    fid = open(savepicklepath, "wb")
-                    pickle.dump(mesh, fid, protocol=pickleprotocol)
-                    fid.close()
-                except PermissionError:
-                    print(" > could not write *.pckl file in {} or {}".format(meshpath,cachepath))
+            mesh.compute_e_xy().compute_rcoef()
+            _do_save_meshcache(mesh, meshpath, cachepath, picklefname, which_cache, pickleprotocol, do_info)
         
         #_______________________________________________________________________
+        _do_write_lsmshp(mesh, do_info)
+        
+        #_______________________________________________________________________
+        if do_compact: mesh.compact(do_info=do_info)
         return(mesh)
 
 
 
+# ___WRITE LAND-SEA MASK SHAPEFILES____________________________________________
+#| with mesh.do_lsmshp=True the land-sea mask shapefiles are written directly  |
+#| after the mesh is loaded, otherwise only when they are needed, see          |
+#| mesh.get_lsmask_shapefile(). Is called after the mesh cache is saved, so    |
+#| that the shapefiles are placed next to it                                   |
+#|_____________________________________________________________________________|
+def _do_write_lsmshp(mesh, do_info):
+    if not getattr(mesh, 'do_lsmshp', False): return
+    if len(mesh.lsmask  )!=0: mesh.get_lsmask_shapefile(which='pbnd', do_info=do_info)
+    if len(mesh.lsmask_a)!=0: mesh.get_lsmask_shapefile(which='a'   , do_info=do_info)
+    return
+
+
+
+# ___SAVE MESH OBJECT TO BINARY CACHE__________________________________________
+#| write mesh object either as single pickle file or as npy cache directory    |
+#| --> try 1.st to store it in the mesh in the meshfolder, will depend of      |
+#|     there is permission to write, otherwise store it in the cachefolder     |
+#|     and evict old cache files there, only after the mesh was saved          |
+#|_____________________________________________________________________________|
+def _do_save_meshcache(mesh, meshpath, cachepath, picklefname, which_cache, pickleprotocol, do_info):
+    is_saved = False
+    for path in [meshpath, cachepath]:
+        savepicklepath = os.path.join(path, picklefname)
+        try: 
+            if do_info: print(' > save mesh to *.{} in {}'.format(which_cache, savepicklepath))
+            if path==cachepath: mesh.cachepath = cachepath
+            if which_cache=='npy':
+                mesh_2npycache(mesh, savepicklepath)
+            else:    
+                # write into temporary file and replace, so that other 
+                # processes never load an incomplete pickle file
+                tmpfname = '{}.tmp{}'.format(savepicklepath, os.getpid())
+                try:
+                    with open(tmpfname, "wb") as fid: pickle.dump(mesh, fid, protocol=pickleprotocol)
+                    os.replace(tmpfname, savepicklepath)
+                except BaseException:
+                    if os.path.isfile(tmpfname): os.remove(tmpfname)
+                    raise
+            is_saved = True
+            break
+        # if no permission rights for writing in meshpath folder try 
+        # cachefolder   
+        except OSError:
+            if path==cachepath: 
+                print(" > could not write *.{} file in {} or {}".format(which_cache, meshpath, cachepath))
+    
+    #___________________________________________________________________________
+    if is_saved and path==cachepath: meshcache_evict(do_info=do_info)
+    return
+
+
+
+# ___STATE OF MESH OBJECT THAT IS STORED IN CACHE______________________________
+#|                                                                             |
+#|_____________________________________________________________________________|
+def _do_meshcache_state(mesh):
+    return((mesh.do_rot, mesh.focus, mesh.do_augmpbnd, mesh.do_earea, mesh.do_eresol[0], 
+            mesh.do_narea, mesh.do_nresol[0], mesh.do_lsmask, getattr(mesh, 'do_edges', False), 
+            getattr(mesh, 'do_sindex', False)))
+
+
+
+# ___COMPUTE KEY OF MESH CACHE VARIANT_________________________________________
+#| key is a hash of the content of the mesh files together with all options    |
+#| that change the geometry of the mesh object. The content hash of the mesh   |
+#| files is computed only once and is memorized in the cache folder together   |
+#| with the size and modification time of the files.                           |
+#| ___INPUT_________________________________________________________________   |
+#| meshpath     :   str, path of mesh files                                    |
+#| cachepath    :   str, path of mesh cache folder                             |
+#| abg, do_rot, focus, do_augmpbnd, do_cavity : see load_mesh_fesom2           |
+#| ___RETURNS_______________________________________________________________   |
+#| key          :   str, 16 character hex string                               |
+#|_____________________________________________________________________________|
+def compute_meshcache_key(meshpath, cachepath, abg, do_rot, focus, do_augmpbnd, do_cavity):
+    #___________________________________________________________________________
+    fnames = ['nod2d.out', 'elem2d.out', 'aux3d.out', 'nlvls.out', 'elvls.out']
+    if do_cavity: fnames = fnames + ['cavity_nlvls.out', 'cavity_elvls.out']
+    
+    #___________________________________________________________________________
+    # load memorized content hashes of mesh files 
+    hashfname = os.path.join(cachepath, 'tripyview_meshhash.json')
+    hashinfo  = dict()
+    if os.path.isfile(hashfname):
+        try:
+            with open(hashfname, 'r') as fid: hashinfo = json.load(fid)
+        except ValueError: 
+            hashinfo = dict()
+    
+    #___________________________________________________________________________
+    do_update, meshhash = False, hashlib.blake2b(digest_size=16)
+    for fname in fnames:
+        fpath = os.path.join(meshpath, fname)
+        if not os.path.isfile(fpath): continue
+        fstat = os.stat(fpath)
+        finfo = hashinfo.get(fpath, dict())
+        if finfo.get('size')!=fstat.st_size or finfo.get('mtime')!=fstat.st_mtime_ns:
+            fhash = hashlib.blake2b(digest_size=16)
+            with open(fpath, 'rb') as fid:
+                for block in iter(lambda: fid.read(2**24), b''): fhash.update(block)
+            finfo = dict({'size':fstat.st_size, 'mtime':fstat.st_mtime_ns, 'hash':fhash.hexdigest()})
+            hashinfo[fpath], do_update = finfo, True
+        meshhash.update('{}:{};'.format(fname, finfo['hash']).encode())
+    
+    #___________________________________________________________________________
+    if do_update:
+        try:
+            with open(hashfname, 'w') as fid: json.dump(hashinfo, fid, indent=1)
+        except OSError: 
+            pass
+    
+    #___________________________________________________________________________
+    if do_rot is None: do_rot = 'None'
+    meshhash.update(json.dumps([[float(x) for x in abg], str(do_rot), float(focus), 
+                                bool(do_augmpbnd), bool(do_cavity)]).encode())
+    return(meshhash.hexdigest()[:16])
+
+
+
+# ___EVICT OLD FILES FROM MESH CACHE FOLDER____________________________________
+#| remove least recently used mesh cache variants (*.pckl files and *.npycache |
+#| directories) from all mesh folders in the cache folder MESHPATH_TRIPYVIEW   |
+#| until their total size is below maxsize. Loading a mesh from cache marks it |
+#| as used. Only the cache folder is touched, never the mesh folder. *.npycache|
+#| directories from which a mesh object of any process can still load arrays   |
+#| lazily are skipped, these processes hold a shared lock on the directory,    |
+#| see _do_lock_npycache. A directory is removed only with an exclusive lock   |
+#| and after it was renamed, so that no process can load it half removed.      |
+#| Leftovers of interrupted saves or evictions older than one hour are removed.|
+#| ___INPUT_________________________________________________________________   |
+#| maxsize  :   float, maximum size of mesh cache in GB, default: None, than it |
+#|              is taken from environment variable MESHPATH_TRIPYVIEW_MAXSIZE  |
+#|              or is 20GB                                                     |
+#| do_info  :   bool, print info                                               |
+#| ___RETURNS_______________________________________________________________   |
+#| nothing                                                                     |
+#|_____________________________________________________________________________|
+def meshcache_evict(maxsize=None, do_info=True):
+    #___________________________________________________________________________
+    cacheroot = os.environ.get('MESHPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "meshcache_tripyview"))
+    if maxsize is None: maxsize = float(os.environ.get('MESHPATH_TRIPYVIEW_MAXSIZE', 20))
+    if not os.path.isdir(cacheroot): return
+    
+    #___________________________________________________________________________
+    # npy cache directories that are still referenced by unloaded arrays of 
+    # living mesh objects
+    inuse = set()
+    for mesh in list(_NPYCACHE_MESHES):
+        for val in mesh.__dict__.get('_lazy_cache', dict()).values():
+            if val[0]!='lsmask_p': inuse.add(os.path.realpath(val[1]))
+    
+    #___________________________________________________________________________
+    # collect size and last usage of all cache variants
+    entries = []
+    for meshid in os.listdir(cacheroot):
+        path = os.path.join(cacheroot, meshid)
+        if not os.path.isdir(path): continue
+        for fname in os.listdir(path):
+            if not fname.startswith('tripyview_fesom2_'): continue
+            fpath = os.path.join(path, fname)
+            if '.npycache.' in fname or '.pckl.' in fname:
+                try:
+                    if time.time()-os.path.getmtime(fpath) < 3600: continue
+                    if os.path.isdir(fpath): shutil.rmtree(fpath, ignore_errors=True)
+                    else                   : os.remove(fpath)
+                except OSError: 
+                    pass
+                continue
+            if not (fname.endswith('.pckl') or fname.endswith('.npycache')): continue
+            # variant can be evicted meanwhile by an other process
+            try:
+                if os.path.isdir(fpath):
+                    fsize = sum([os.path.getsize(os.path.join(fpath, x)) for x in os.listdir(fpath)])
+                else:
+                    fsize = os.path.getsize(fpath)
+                entries.append((os.path.getmtime(fpath), fsize, fpath))
+            except OSError:
+                continue
+    
+    #___________________________________________________________________________
+    # remove oldest variants, the most recent one is always kept
+    entries.sort()
+    totsize = sum([x[1] for x in entries])
+    for mtime, fsize, fpath in entries[:-1]:
+        if totsize <= maxsize*1024**3: break
+        if os.path.realpath(fpath) in inuse: continue
+        if os.path.isdir(fpath):
+            is_lock, fid = _do_lock_npycache(fpath, exclusive=True)
+            if not is_lock: continue
+            evictpath = '{}.evict{}'.format(fpath, os.getpid())
+            try   : os.rename(fpath, evictpath)
+            except OSError: evictpath = None
+            if evictpath is not None: 
+                if do_info: print(' > evict mesh cache: {}'.format(fpath))
+                shutil.rmtree(evictpath, ignore_errors=True)
+            if fid is not None: fid.close()
+            if evictpath is None: continue
+        else:
+            if do_info: print(' > evict mesh cache: {}'.format(fpath))
+            try   : os.remove(fpath)
+            except OSError: continue
+        totsize -= fsize
+    
+    #___________________________________________________________________________
+    return
+
+
+
+# ___SAVE MESH OBJECT TO NPY CACHE DIRECTORY___________________________________
+#| write every array of the mesh object into its own *.npy file, the remaining |
+#| scalar attributes together with the list of arrays go into manifest.json.   |
+#| Lists of arrays (lsmask, lsmask_a) are stored concatenated together with    |
+#| an offset array, sparse matrices by their CSR components. The shapely       |
+#| lsmask_p is not stored, it is recomputed from lsmask_a on first access.     |
+#| Every file is first written under a temporary name and than replaces the    |
+#| existing one, manifest.json comes last. The directory itself is never       |
+#| removed or renamed while it is written, so processes that load the same     |
+#| cache variant concurrently, see either the old or the new complete file.    |
+#| Files of older manifests are kept for processes that still load them.       |
+#| ___INPUT_________________________________________________________________   |
+#| mesh     :   fesom2 mesh object                                             |
+#| cachedir :   str, path of npy cache directory                               |
+#| ___RETURNS_______________________________________________________________   |
+#| nothing                                                                     |
+#|_____________________________________________________________________________|
+def mesh_2npycache(mesh, cachedir):
+    #___________________________________________________________________________
+    # resolve all arrays that are not loaded yet from an older cache
+    lazy = mesh.__dict__.get('_lazy_cache', dict())
+    for key in list(lazy.keys()): getattr(mesh, key)
+    
+    #___________________________________________________________________________
+    # hold a shared lock while writing, it fails when the directory is just 
+    # evicted by an other process
+    os.makedirs(cachedir, exist_ok=True)
+    is_lock, lockfid = _do_lock_npycache(cachedir)
+    if not is_lock: raise OSError('npy cache {} is evicted by an other process'.format(cachedir))
+    tmpext = '.tmp{}'.format(os.getpid())
+    
+    # write file under temporary name and replace existing one
+    def _save_npy(fname, value):
+        with open(os.path.join(cachedir, fname+tmpext), 'wb') as fid: np.save(fid, value)
+        os.replace(os.path.join(cachedir, fname+tmpext), os.path.join(cachedir, fname))
+    
+    #___________________________________________________________________________
+    manifest = dict({'version':_NPYCACHE_VERSION, 'attrs':dict(), 'arrays':dict(), 
+                     'arraylists':dict(), 'sparse':dict()})
+    try: 
+        for key, val in mesh.__dict__.items():
+            if key.startswith('_') or key=='lsmask_p': continue
+            #___________________________________________________________________
+            # numpy arrays 
+            if isinstance(val, np.ndarray):
+                _save_npy(key+'.npy', np.ma.getdata(val))
+                manifest['arrays'][key] = key+'.npy'
+            
+            # sparse matrices
+            elif isinstance(val, csr_matrix):
+                for comp in ['data', 'indices', 'indptr']:
+                    _save_npy(key+'_'+comp+'.npy', getattr(val, comp))
+                manifest['sparse'][key] = list(val.shape)
+                
+            # non empty list of arrays
+            elif isinstance(val, list) and len(val)>0 and all(isinstance(x, np.ndarray) for x in val):
+                off = np.cumsum([0]+[x.shape[0] for x in val])
+                _save_npy(key+'.npy', np.concatenate(val, axis=0))
+                _save_npy(key+'_off.npy', off)
+                manifest['arraylists'][key] = key+'.npy'
+                
+            # scalars, strings and lists of them 
+            else:
+                if isinstance(val, np.generic): val = val.item()
+                try: 
+                    json.dumps(val)
+                    manifest['attrs'][key] = val
+                except TypeError:
+                    print(' > npycache: attribute {} of type {} is not stored'.format(key, type(val)))
+        
+        #_______________________________________________________________________
+        with open(os.path.join(cachedir, 'manifest.json'+tmpext), 'w') as fid:
+            json.dump(manifest, fid, indent=1)
+        os.replace(os.path.join(cachedir, 'manifest.json'+tmpext), os.path.join(cachedir, 'manifest.json'))
+    
+    #___________________________________________________________________________
+    # remove temporary file of the failed write
+    finally:
+        for fname in os.listdir(cachedir):
+            if fname.endswith(tmpext): os.remove(os.path.join(cachedir, fname))
+        if lockfid is not None: lockfid.close()
+    
+    #___________________________________________________________________________
+    return
+
+
+
+# ___LOAD MESH OBJECT FROM NPY CACHE DIRECTORY_________________________________
+#| create mesh object from npy cache directory. Only the manifest is read, the |
+#| arrays are registered in mesh._lazy_cache and are loaded as memory mapped   |
+#| (copy on write) arrays at their first access, see mesh_fesom2.__getattr__.  |
+#| Several processes that load the same cache share the same memory pages.     |
+#| The process keeps a shared lock on the directory, so that it is not evicted |
+#| by an other process as long as arrays can still be loaded from it.          |
+#| ___INPUT_________________________________________________________________   |
+#| cachedir :   str, path of npy cache directory                               |
+#| do_info  :   bool, print info                                               |
+#| ___RETURNS_______________________________________________________________   |
+#| mesh     :   fesom2 mesh object or None if cache version is outdated or the |
+#|              cache is incomplete or just evicted                            |
+#|_____________________________________________________________________________|
+def npycache_2mesh(cachedir, do_info=True):
+    #___________________________________________________________________________
+    cachekey = os.path.realpath(cachedir)
+    if cachekey not in _NPYCACHE_LOCKS:
+        is_lock, fid = _do_lock_npycache(cachedir)
+        if not is_lock: 
+            if do_info: print(' > npycache is just evicted by an other process')
+            return(None)
+        if fid is not None: _NPYCACHE_LOCKS[cachekey] = fid
+    
+    #___________________________________________________________________________
+    try:
+        with open(os.path.join(cachedir, 'manifest.json'), 'r') as fid:
+            manifest = json.load(fid)
+    except (OSError, ValueError):
+        if do_info: print(' > npycache has no complete manifest.json')
+        fid = _NPYCACHE_LOCKS.pop(cachekey, None)
+        if fid is not None: fid.close()
+        return(None)
+    if manifest.get('version', None) != _NPYCACHE_VERSION:
+        if do_info: print(' > npycache version {} is outdated'.format(str(manifest.get('version', None))))
+        return(None)
+    
+    #___________________________________________________________________________
+    mesh = mesh_fesom2.__new__(mesh_fesom2)
+    mesh.__dict__.update(manifest['attrs'])
+    lazy = dict()
+    for key in manifest['arrays'    ]: lazy[key] = ('array'    , cachedir)
+    for key in manifest['arraylists']: lazy[key] = ('arraylist', cachedir)
+    for key in manifest['sparse'    ]: lazy[key] = ('sparse'   , cachedir, manifest['sparse'][key])
+    lazy['lsmask_p'] = ('lsmask_p', cachedir)
+    mesh._lazy_cache = lazy
+    _NPYCACHE_MESHES.add(mesh)
+    
+    #___________________________________________________________________________
+    return(mesh)
+
+
+
+# ___LOCK NPY CACHE DIRECTORY___________________________________________________
+#| non blocking lock on the lock file of a npy cache directory, which is       |
+#| shared by all other processes. Readers and writers take a shared lock,      |
+#| meshcache_evict an exclusive one. Without fcntl (no POSIX system) nothing is|
+#| locked and only the mesh objects of the own process protect their cache.    |
+#| ___INPUT_________________________________________________________________   |
+#| cachedir :   str, path of npy cache directory                               |
+#| exclusive:   bool, take exclusive lock, default: False                      |
+#| ___RETURNS_______________________________________________________________   |
+#| is_lock  :   bool, False if an other process holds a conflicting lock       |
+#| fid      :   file object that holds the lock until it is closed, None if    |
+#|              nothing is locked                                              |
+#|_____________________________________________________________________________|
+def _do_lock_npycache(cachedir, exclusive=False):
+    if fcntl is None: return(True, None)
+    lockfname = os.path.join(cachedir, _NPYCACHE_LOCKFILE)
+    try: 
+        fid = open(lockfname, 'a')
+    except OSError:
+        # read only cache folder, lock file is there if a writer created it
+        try   : fid = open(lockfname, 'r')
+        except OSError: return(True, None)
+    
+    #___________________________________________________________________________
+    try: 
+        fcntl.flock(fid, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+    except OSError:
+        fid.close()
+        return(False, None)
+    return(True, fid)
+
+
+
+# version of npy mesh cache format, increase when the stored content changes
+_NPYCACHE_VERSION = 1
+
+# lock file in npy cache directory and shared locks of the npy cache 
+# directories from which the process has loaded a mesh, they are held until 
+# the process ends, see _do_lock_npycache
+_NPYCACHE_LOCKFILE = '.lock'
+_NPYCACHE_LOCKS    = dict()
+
+# mesh objects loaded from npy cache, npy cache directories they still read 
+# from are not evicted, see meshcache_evict
+_NPYCACHE_MESHES = weakref.WeakSet()
+
+# attributes that were added to the mesh object after older cache files were
+# written (*.pckl, *.npycache), they are set to their default when a mesh is 
+# loaded from such a cache: name --> default
+_MESH_DEFAULTS = dict({'do_binmesh':False, 'do_edges':False, 'do_sindex':False, 
+                       'do_compact':False, 'e2n_mat':None, 'e2n_area':None, 
+                       'n_idx_g':None, 'e_idx_g':None, 'edges':[], 'edge_tri':[], 
+                       'edge_cross_dxdy':[], 'n2ded':0, 'sidx_eptr':[], 
+                       'sidx_elem':[], 'sidx_grid':[]})
+
+# derived mesh arrays that are computed at their first access: name --> method 
+_MESH_DERIVED = dict({'e_x'    :'compute_e_xy' , 'e_y'    :'compute_e_xy' , 
+                      'n_rcoef':'compute_rcoef', 'e_rcoef':'compute_rcoef'})
+
+# attributes that are converted by mesh.compact(), level indices to smallest 
+# unsigned integer, element/vertice index lists to uint32, areas, resolutions, 
+# coordinates and rotation coefficients to float32
+_MESH_COMPACT_IZ  = ['n_iz', 'e_iz', 'n_ic', 'e_ic', 'n_iza', 'n_ica']
+_MESH_COMPACT_IDX = ['e_pbnd_0', 'e_pbnd_1', 'e_pbnd_a', 'n_pbnd_a']
+_MESH_COMPACT_F32 = ['n_x', 'n_y', 'n_z', 'n_c', 'n_xa', 'n_ya', 'n_za', 'n_ca', 
+                     'e_x', 'e_y', 'n_area', 'e_area', 'n_resol', 'e_resol', 
+                     'n_rcoef', 'e_rcoef']
+
+
+
 # _____________________________________________________________________________
 #|                                                                             |
 #|                        *** FESOM2.0 MESH CLASS ***                          |
@@ -282,6 +788,25 @@ class mesh_fesom2(object):
     ___if do_narea, do_nresol, do_earea, do_eresol == True:_____________________
     n_area,n_resol: array, vertices area and resolution
     e_area,e_resol: array, element area and resolution
+    e2n_mat       : sparse matrix, [n2dn x n2de] area weighted elem to vertice 
+                    interpolation operator, see compute_e2n_mat()
+    e2n_area      : array, [nlev x n2dn] clusterarea used to normalize e2n_mat,
+                    only set for sub-meshes (build from the sub-mesh elements),
+                    None --> n_area is used
+    ___if do_edges == True:_____________________________________________________
+    edges         : array, [2 x n2ded] vertice indices of edges
+    edge_tri      : array, [2 x n2ded] left and right element of edges, -1 if 
+                    right element does not exist (boundary edge)
+    edge_cross_dxdy: array, [4 x n2ded] distance vector edge mid point to 
+                    left/right element centroid, see compute_edges()
+    n2ded         : int, number of 2d edges
+    ___if do_sindex == True:____________________________________________________
+    sidx_eptr,    : array, element bucket grid of spatial index in CSR format, 
+    sidx_elem       see compute_sindex(), query_nearest_node(), query_elem(), 
+    sidx_grid       query_radius(), query_box()
+    ___if mesh is sub-mesh, see subset():_____________________________________
+    n_idx_g,      : array, global vertice and element indices of sub-mesh 
+    e_idx_g         vertices and elements, None for full mesh
         
     e_pbnd_1      : array, elem indices of pbnd elements
     e_pbnd_0      : array, elem indices of not pbnd elements
@@ -320,7 +845,8 @@ class mesh_fesom2(object):
     def __init__(self, meshpath, abg=[50,15,-90], focus=0, focus_old=0, do_rot='None', 
                  do_augmpbnd=True, do_cavity=False, do_info=True, do_earea=False,do_earea2=False, 
                  do_eresol=[False,'mean'], do_narea=False, do_nresol=[False,'n_area'], 
-                 do_lsmask=True, do_lsmshp=True, do_pickle=True ):
+                 do_lsmask=True, do_lsmshp=False, do_pickle=True, do_binmesh=False, 
+                 do_edges=False, do_sindex=False ):
         
         #_______________________________________________________________________
         # define meshpath and mesh id 
@@ -344,6 +870,10 @@ class mesh_fesom2(object):
         self.do_nresol          = do_nresol
         self.do_lsmask          = do_lsmask
         self.do_lsmshp          = do_lsmshp
+        self.do_binmesh         = do_binmesh
+        self.do_edges           = do_edges
+        self.do_sindex          = do_sindex
+        self.do_compact         = False
         
         #_______________________________________________________________________
         # define basic mesh file path
@@ -382,6 +912,26 @@ class mesh_fesom2(object):
         self.n_area,self.n_resol= [], []           
         self.e_area,self.e_resol= [], []
         
+        #_______________________________________________________________________
+        # define sparse area weighted elem to vertice interpolation operator
+        self.e2n_mat            = None
+        self.e2n_area           = None
+        
+        #_______________________________________________________________________
+        # define edge topology
+        self.edges, self.edge_tri = [], []
+        self.edge_cross_dxdy    = []
+        self.n2ded              = 0
+        
+        #_______________________________________________________________________
+        # define spatial index, element bucket grid 
+        self.sidx_eptr, self.sidx_elem = [], []
+        self.sidx_grid          = []
+        
+        #_______________________________________________________________________
+        # define local --> global vertice and element index of sub-mesh 
+        self.n_idx_g, self.e_idx_g = None, None
+        
         #_______________________________________________________________________
         # define element indices for periodic and non periodic elements
         self.e_pbnd_1           = [] # elem indices of pbnd elements
@@ -457,25 +1007,24 @@ class mesh_fesom2(object):
         if do_nresol[0]:
             self.compute_n_resol(which=do_nresol[1])
         
-        # compute lsmask
+        # compute/load edge topology
+        if do_edges:
+            self.compute_edges()
+        
+        # compute spatial index
+        if do_sindex:
+            self.compute_sindex()
+        
+        # compute lsmask, the shapefiles of the land-sea mask are written by 
+        # load_mesh_fesom2(..., do_lsmshp=True) or when they are needed, see 
+        # get_lsmask_shapefile()
         if do_lsmask:
             self.compute_lsmask()
             
-            #___________________________________________________________________
-            # save land-sea mask with periodic boundnaries to shapefile
-            if do_lsmshp:
-                shpfname = 'tripyview_fesom2'+'_'+self.id+'_'+'pbnd'
-                lsmask_2shapefile(self, lsmask=self.lsmask, fname=shpfname)
-            
             #___________________________________________________________________
             # augment periodic boundaries of land sea mask
             if do_augmpbnd:
                 self.augment_lsmask()
-                
-                #_______________________________________________________________
-                # save land-sea mask with augmented  pbnd to shapefile
-                if do_lsmshp:
-                    lsmask_2shapefile(self,lsmask=[])
             
         if do_info:
             print(self.info())
@@ -486,18 +1035,20 @@ class mesh_fesom2(object):
     #| read files: nod2d.out, elem2d.out, aux3d.out, nlvls.out, elvls.out      |                                                         
     #|_________________________________________________________________________|
     def read_mesh(self):
+        do_binmesh = getattr(self, 'do_binmesh', False)
         #____load 2d node matrix________________________________________________
-        file_content = pa.read_csv(self.fname_nod2d, delim_whitespace=True, skiprows=1, \
-                                      names=['node_number','x','y','flag'] )
-        self.n_x     = file_content.x.values.astype('float32')
-        self.n_y     = file_content.y.values.astype('float32')
-        self.n_i     = file_content.flag.values.astype('uint16')   
+        with open(self.fname_nod2d) as f: self.n2dn = int(next(f).split()[0])
+        file_content = read_meshfile(self.fname_nod2d, 4, np.float64, skiprows=1, nrows=self.n2dn,
+                                     do_binmesh=do_binmesh)
+        self.n_x     = file_content[:,1].astype('float32')
+        self.n_y     = file_content[:,2].astype('float32')
+        self.n_i     = file_content[:,3].astype('uint16')   
         self.n2dn    = len(self.n_x)
         
         #____load 2d element matrix_____________________________________________
-        file_content = pa.read_csv(self.fname_elem2d, delim_whitespace=True, skiprows=1, \
-                                       names=['1st_node_in_elem','2nd_node_in_elem','3rd_node_in_elem'])
-        self.e_i     = file_content.values.astype('uint32') - 1
+        with open(self.fname_elem2d) as f: self.n2de = int(next(f).split()[0])
+        self.e_i     = read_meshfile(self.fname_elem2d, 3, np.uint32, skiprows=1, nrows=self.n2de, 
+                                     do_binmesh=do_binmesh) - 1
         self.n2de    = np.shape(self.e_i)[0]
         # print('    : #2de={:d}'.format(self.n2de))
         
@@ -511,10 +1062,7 @@ class mesh_fesom2(object):
         #____load number of levels at each node_________________________________
         print(self.fname_nlvls)
         if ( os.path.isfile(self.fname_nlvls) ):
-            file_content = pa.read_csv(self.fname_nlvls, delim_whitespace=True, skiprows=0, \
-                                           names=['numb_of_lev'])
-            self.n_iz    = file_content.values.astype('uint16') - 1
-            self.n_iz    = self.n_iz.squeeze()
+            self.n_iz    = read_meshfile(self.fname_nlvls, 1, np.uint16, do_binmesh=do_binmesh) - 1
             self.n_z     = np.float32(self.zlev[self.n_iz])
         else:
             self.n_iz    = np.zeros((self.n2dn,)) 
@@ -522,10 +1070,7 @@ class mesh_fesom2(object):
         
         #____load number of levels at each elem_________________________________
         if ( os.path.isfile(self.fname_elvls) ):
-            file_content = pa.read_csv(self.fname_elvls, delim_whitespace=True, skiprows=0, \
-                                           names=['numb_of_lev'])
-            self.e_iz    = file_content.values.astype('uint16') - 1
-            self.e_iz    = self.e_iz.squeeze()
+            self.e_iz    = read_meshfile(self.fname_elvls, 1, np.uint16, do_binmesh=do_binmesh) - 1
         else:
             self.e_iz    = np.zeros((self.n2de,)) 
             
@@ -538,6 +1083,7 @@ class mesh_fesom2(object):
     #| read files: cavity_nlvls.out, cavity_elvls.out                          |                                     
     #|_________________________________________________________________________|
     def read_cavity(self):
+        do_binmesh = getattr(self, 'do_binmesh', False)
         
         # print(' --> read cavity files')
         self.fname_cnlvls  = os.path.join(self.path,'cavity_nlvls.out')
@@ -545,18 +1091,12 @@ class mesh_fesom2(object):
         
         #____load number of levels at each node_________________________________
         # print('     > {}'.format(self.fname_cnlvls)) 
-        file_content    = pa.read_csv(self.fname_cnlvls, delim_whitespace=True, skiprows=0, \
-                                       names=['numb_of_lev'])
-        self.n_ic= file_content.values.astype('uint16') - 1
-        self.n_ic= self.n_ic.squeeze()
+        self.n_ic= read_meshfile(self.fname_cnlvls, 1, np.uint16, do_binmesh=do_binmesh) - 1
         self.n_c = np.float32(self.zlev[self.n_ic])
         
         #____load number of levels at each elem_________________________________
         # print('     > {}'.format(self.fname_celvls)) 
-        file_content    = pa.read_csv(self.fname_celvls, delim_whitespace=True, skiprows=0, \
-                                       names=['numb_of_lev'])
-        self.e_ic= file_content.values.astype('uint16') - 1
-        self.e_ic= self.e_ic.squeeze()
+        self.e_ic= read_meshfile(self.fname_celvls, 1, np.uint16, do_binmesh=do_binmesh) - 1
         #_______________________________________________________________________
         return(self)
     
@@ -591,11 +1131,204 @@ ___________________________________________""".format(
 
     def __repr__(self):
         return self.info()
+    
+    
+    
+    #___LAZY LOAD ARRAYS FROM NPY CACHE________________________________________
+    #| is only called when attribute is not found in mesh.__dict__, than check |
+    #| if attribute is registered in npy cache and load it memory mapped       |
+    #|_________________________________________________________________________|
+    def __getattr__(self, name):
+        lazy = self.__dict__.get('_lazy_cache', None)
+        if lazy is None or name not in lazy:
+            # derived geometry (centroids, rotation coefficients) is computed 
+            # at first access
+            if name in _MESH_DERIVED and 'path' in self.__dict__:
+                getattr(self, _MESH_DERIVED[name])()
+                return(self.__dict__[name])
+            raise AttributeError("'mesh_fesom2' object has no attribute '{}'".format(name))
+        
+        #_______________________________________________________________________
+        which, cachedir = lazy[name][0], lazy[name][1]
+        if   which=='array':
+            value = np.load(os.path.join(cachedir, name+'.npy'), mmap_mode='c')
+        elif which=='arraylist':
+            aux   = np.load(os.path.join(cachedir, name+'.npy'), mmap_mode='c')
+            off   = np.load(os.path.join(cachedir, name+'_off.npy'))
+            value = [aux[off[ii]:off[ii+1]] for ii in range(0, off.size-1)]
+        elif which=='sparse':
+            value = csr_matrix(tuple(np.load(os.path.join(cachedir, name+'_'+comp+'.npy')) 
+                                     for comp in ['data', 'indices', 'indptr']), shape=tuple(lazy[name][2]))
+        elif which=='lsmask_p':
+            if len(self.lsmask_a)!=0: value = lsmask_patch(self.lsmask_a)
+            else                    : value = []
+        
+        #_______________________________________________________________________
+        del lazy[name]
+        setattr(self, name, value)
+        return(value)
 
     def __str__(self):
         return self.info()
     
     
+    # ___COMPUTE ELEMENT CENTROIDS_____________________________________________
+    #| mean lon/lat of element vertices, mesh.e_x, mesh.e_y are computed at    |
+    #| first access and stored in the mesh cache                               |
+    #|_________________________________________________________________________|
+    def compute_e_xy(self):
+        self.e_x = self.n_x[self.e_i].sum(axis=1)/3.0
+        self.e_y = self.n_y[self.e_i].sum(axis=1)/3.0
+        return(self)
+    
+    
+    
+    # ___COMPUTE VECTOR ROTATION COEFFICIENTS__________________________________
+    #| coefficients to rotate vectors from rotated to geo frame at vertices    |
+    #| (mesh.n_rcoef) and elements (mesh.e_rcoef), see vec_r2g_coeff. Are      |
+    #| computed at first access and stored in the mesh cache                   |
+    #|_________________________________________________________________________|
+    def compute_rcoef(self):
+        self.n_rcoef = vec_r2g_coeff(self.abg, self.n_x, self.n_y)
+        self.e_rcoef = vec_r2g_coeff(self.abg, self.e_x, self.e_y)
+        return(self)
+    
+    
+    
+    # ___NUMBER OF WET LEVELS PER COLUMN_______________________________________
+    #| number of levels of dim_vert above the bottom for every vertice or      |
+    #| element, level index < nlev is wet. Full level data (nz) see one level  |
+    #| more. This is the compact form of the bottom mask (int16 per column     |
+    #| instead of a boolean nlev x npts matrix), it is memorized with the mesh |
+    #| (cleared by reset_derived, not stored in the mesh cache) and shared by  |
+    #| do_setbottomnan, calc_transect_scalar and calc_transect_transp          |
+    #| ___INPUT_____________________________________________________________   |
+    #| dim_horz :   str, horizontal dimension 'nod2' or 'elem'                 |
+    #| dim_vert :   str, vertical dimension 'nz1', 'nz_1' or 'nz'              |
+    #| ___RETURNS___________________________________________________________   |
+    #| nlev     :   array, int16 [npts]                                        |
+    #|_________________________________________________________________________|
+    def get_bottom_nlev(self, dim_horz='nod2', dim_vert='nz1'):
+        if self.__dict__.get('_bottomnlev', None) is None: self._bottomnlev = dict()
+        key = (dim_horz, dim_vert)
+        if key in self._bottomnlev: return(self._bottomnlev[key])
+        
+        #_______________________________________________________________________
+        if   dim_vert in ['nz1', 'nz_1']: ioff = 0
+        elif dim_vert == 'nz'           : ioff = 1
+        else: raise ValueError(' the vertical dimension dim_vert={} is not supported'.format(str(dim_vert)))
+        if   dim_horz == 'nod2': iz = self.n_iz
+        elif dim_horz == 'elem': iz = self.e_iz
+        else: raise ValueError(' the horizontal dimension dim_horz={} is not supported'.format(str(dim_horz)))
+        
+        #_______________________________________________________________________
+        self._bottomnlev[key] = np.asarray(iz, dtype=np.int16)+np.int16(ioff)
+        return(self._bottomnlev[key])
+    
+    
+    
+    # ___RESET DERIVED GEOMETRY________________________________________________
+    #| remove memorized derived arrays when rotation or focus of mesh changes, |
+    #| they are recomputed at their next access                                |
+    #|_________________________________________________________________________|
+    def reset_derived(self):
+        lazy = self.__dict__.get('_lazy_cache', dict())
+        for name in list(_MESH_DERIVED.keys())+['_bottomnlev']:
+            self.__dict__.pop(name, None)
+            lazy.pop(name, None)
+        return(self)
+    
+    
+    
+    # ___COMPACT MEMORY LAYOUT_________________________________________________
+    #| reduce memory footprint of mesh object: level indices are stored with   |
+    #| the smallest unsigned integer type that holds nlev, periodic boundary   |
+    #| index lists as uint32, areas, resolutions, coordinates and rotation     |
+    #| coefficients as float32. The pre-rotation/pre-focus copies n_xo, n_yo   |
+    #| can be dropped and the land-sea mask patch is rebuilt from lsmask_a at  |
+    #| its next access.                                                        |
+    #| ___INPUT_____________________________________________________________   |
+    #| do_droporig  :   bool, drop pre-rotation copies n_xo, n_yo              |
+    #| do_info      :   bool, print memory footprint before and after          |
+    #| ___RETURNS___________________________________________________________   |
+    #| self         :   fesom2 mesh object                                     |
+    #|_________________________________________________________________________|
+    def compact(self, do_droporig=True, do_info=False):
+        if do_info: nbytes_o = sum(self.memory_usage(do_info=False).values())
+        print(' > compact mesh')
+        #_______________________________________________________________________
+        dtype_iz = np.min_scalar_type(self.nlev)
+        for key in _MESH_COMPACT_IZ+_MESH_COMPACT_IDX+_MESH_COMPACT_F32:
+            # dont trigger computation of derived arrays
+            if key not in self.__dict__ and key not in self.__dict__.get('_lazy_cache', dict()): continue
+            val = getattr(self, key)
+            if not isinstance(val, np.ndarray) or val.size==0: continue
+            if   key in _MESH_COMPACT_IZ : dtype = dtype_iz
+            elif key in _MESH_COMPACT_IDX: dtype = np.uint32
+            else                         : dtype = np.float32
+            if val.dtype!=dtype: setattr(self, key, np.array(np.ma.getdata(val), dtype=dtype))
+        
+        #_______________________________________________________________________
+        if do_droporig: 
+            self.n_xo, self.n_yo = [], []
+        
+        # land-sea mask patch is rebuilt from lsmask_a when its needed
+        if len(self.lsmask_a)!=0 and 'lsmask_p' in self.__dict__:
+            del self.__dict__['lsmask_p']
+            if self.__dict__.get('_lazy_cache', None) is None: self._lazy_cache = dict()
+            self._lazy_cache['lsmask_p'] = ['lsmask_p', None]
+        
+        #_______________________________________________________________________
+        self.do_compact = True
+        if do_info: 
+            nbytes = sum(self.memory_usage(do_info=False).values())
+            print(' > mesh memory: {:.1f} MB --> {:.1f} MB'.format(nbytes_o/1024**2, nbytes/1024**2))
+        return(self)
+    
+    
+    
+    # ___MEMORY FOOTPRINT OF MESH ATTRIBUTES___________________________________
+    #| bytes per attribute of the mesh object, arrays that are still in the    |
+    #| npy cache and not loaded yet count zero                                 |
+    #| ___INPUT_____________________________________________________________   |
+    #| do_info      :   bool, print table of attributes sorted by size         |
+    #| ___RETURNS___________________________________________________________   |
+    #| nbytes       :   dict, {attribute: bytes}                               |
+    #|_________________________________________________________________________|
+    def memory_usage(self, do_info=True):
+        nbytes, info = dict(), dict()
+        for key, val in self.__dict__.items():
+            if key=='_lazy_cache': continue
+            if   isinstance(val, np.ndarray):
+                nbytes[key] = val.nbytes
+                info[key]   = '{} {}'.format(val.dtype, list(val.shape))
+                if isinstance(val, np.memmap): info[key] += ' memmap'
+            elif isinstance(val, csr_matrix):
+                nbytes[key] = val.data.nbytes + val.indices.nbytes + val.indptr.nbytes
+                info[key]   = 'csr_matrix {} {}'.format(val.dtype, list(val.shape))
+            elif isinstance(val, list) and len(val)>0 and all(isinstance(x, np.ndarray) for x in val):
+                nbytes[key] = sum([x.nbytes for x in val])
+                info[key]   = 'list of {} arrays'.format(len(val))
+            elif isinstance(val, dict):
+                nbytes[key] = sum([x.nbytes for x in val.values() if isinstance(x, np.ndarray)])
+                info[key]   = 'dict of {} arrays'.format(len(val))
+            else:
+                nbytes[key] = sys.getsizeof(val)
+                info[key]   = type(val).__name__
+        for key in self.__dict__.get('_lazy_cache', dict()).keys():
+            nbytes[key], info[key] = 0, 'not loaded'
+        
+        #_______________________________________________________________________
+        if do_info:
+            print(' > mesh memory footprint: {:.1f} MB'.format(sum(nbytes.values())/1024**2))
+            for key in sorted(nbytes, key=nbytes.get, reverse=True):
+                # skip scalars, strings and empty place holders
+                if nbytes[key]<1024 and info[key]!='not loaded': continue
+                print('   {:<16s} {:>10.3f} MB   {}'.format(key, nbytes[key]/1024**2, info[key]))
+        return(nbytes)
+    
+    
+    
     # ___FIND PERIODIC BOUDNARY ELEMENTS_______________________________________
     #| find elements of periodic boundary (e_pbnd_1) and elements that do not  |
     #| participate in periodic boundary (e_pbnd_0)                             |
@@ -664,22 +1397,18 @@ ___________________________________________""".format(
         # (ii.a) 2d elements:
         # List all triangles that touch the cyclic boundary segments
         #_______________________________________________________________________
-        elem_pbnd_l = np.copy(self.e_i[self.e_pbnd_1,:])
-        elem_pbnd_r = np.copy(elem_pbnd_l)
+        tri         = self.e_i[self.e_pbnd_1,:]
         
-        for ei in range(0,self.e_pbnd_1.size):
-            # node indices of periodic boundary triangle
-            tri  = np.array(self.e_i[self.e_pbnd_1[ei],:]).squeeze()
-            
-            # which triangle points belong to left periodic bnde or right periodic
-            # boundary
-            idx_l = np.where(self.n_x[tri].squeeze()<xmin+(xmax-xmin)/2)[0]
-            idx_r = np.where(self.n_x[tri].squeeze()>xmin+(xmax-xmin)/2)[0]
-            
-            # change indices to left and right augmented boundary points
-            elem_pbnd_l[ei,idx_r]=aux_pos[tri[idx_r]]
-            elem_pbnd_r[ei,idx_l]=aux_pos[tri[idx_l]]
-        del idx_l, idx_r, tri, aux_pos
+        # which triangle points belong to left periodic bnde or right periodic
+        # boundary
+        is_l        = self.n_x[tri]<xmin+(xmax-xmin)/2
+        is_r        = self.n_x[tri]>xmin+(xmax-xmin)/2
+        
+        # change indices to left and right augmented boundary points, for all 
+        # periodic boundary triangles at once
+        elem_pbnd_l = np.where(is_r, aux_pos[tri], tri)
+        elem_pbnd_r = np.where(is_l, aux_pos[tri], tri)
+        del is_l, is_r, tri, aux_pos
         
         #_______________________________________________________________________
         # change existing periodic boundary triangles in elem_2d_i to augmented 
@@ -742,6 +1471,364 @@ ___________________________________________""".format(
         return(self)
     
     
+    # ___COMPUTE/LOAD EDGE TOPOLOGY____________________________________________
+    #| either load edges, edge_tri and edge_cross_dxdy from fesom.mesh.diag.nc |
+    #| if its found in meshpath or build them from the element array with the  |
+    #| conventions of the model:                                               |
+    #| edges          : [2 x n2ded] vertice indices of edge                    |
+    #| edge_tri       : [2 x n2ded] index of left and right element with       |
+    #|                  respect to the edge direction, -1 for boundary edges   |
+    #|                  where the right element does not exist                 |
+    #| edge_cross_dxdy: [4 x n2ded] dx, dy [m] from edge mid point to centroid |
+    #|                  of left (0:2) and right (2:4) element, computed in     |
+    #|                  rotated model coordinates, 0 if right element does not |
+    #|                  exist                                                  |
+    #| Indices are zero based (as meshdiag['edges'].values-1). With            |
+    #| do_modelrot=True a geographic mesh is rotated with abg into the model   |
+    #| coordinates before computing edge_cross_dxdy. With diagpath the diag    |
+    #| file is also searched in the data directory, see find_meshdiag()        |
+    #|_________________________________________________________________________|
+    def compute_edges(self, do_modelrot=True, diagpath=None):
+        if len(getattr(self, 'edges', []))!=0: return(self)
+        self.do_edges=True
+        diagfile = self.find_meshdiag(diagpath)
+        if diagfile is not None:
+            print(' > load edges from {}'.format(diagfile))
+            #___________________________________________________________________
+            fid = Dataset(diagfile,'r')
+            self.edges           = np.asarray(fid.variables['edges'][:]).astype('int64')-1
+            self.edge_tri        = np.asarray(fid.variables['edge_tri'][:]).astype('int64')-1
+            self.edge_cross_dxdy = np.asarray(fid.variables['edge_cross_dxdy'][:])
+            self.edge_cross_dxdy[2:4, self.edge_tri[1,:]<0] = 0.0
+            fid.close()
+        else: 
+            print(' > comp edges')
+            #___________________________________________________________________
+            rad    = np.pi/180.0  
+            cycl   = 360.0*rad
+            Rearth = 6367500.0
+            trim   = lambda dx: dx - cycl*np.round(dx/cycl)
+            
+            #___________________________________________________________________
+            # collect all three edges of every element, sort them by their 
+            # vertice pair --> internal edges appear twice, boundary edges once
+            e_i    = self.e_i.astype('int64')
+            ed     = e_i[:, [0,1,1,2,2,0]].reshape(-1,2)
+            ed_e   = np.repeat(np.arange(self.n2de, dtype='int64'), 3)
+            ed_key = ed.min(axis=1)*self.n2dn + ed.max(axis=1)
+            ed_s   = np.argsort(ed_key, kind='stable')
+            ed_key = ed_key[ed_s]
+            
+            is_1st = np.hstack(([True], ed_key[1:]!=ed_key[:-1]))
+            idx_1st= np.flatnonzero(is_1st)
+            has_2nd= np.hstack((~is_1st[1:], [False]))[idx_1st]
+            del(ed_key, is_1st)
+            
+            edges  = ed[ed_s[idx_1st],:].T.copy()
+            e_tri  = -np.ones((2, idx_1st.size), dtype='int64')
+            e_tri[0,:]       = ed_e[ed_s[idx_1st]]
+            e_tri[1,has_2nd] = ed_e[ed_s[idx_1st[has_2nd]+1]]
+            del(ed, ed_e, ed_s, idx_1st)
+            
+            #___________________________________________________________________
+            # vertice and element centroid coordinates in radians, in rotated 
+            # model coordinates 
+            if do_modelrot and self.do_rot!='g2r': 
+                n_x, n_y = grid_g2r(self.abg, self.n_x, self.n_y)
+            else:
+                n_x, n_y = self.n_x, self.n_y
+            n_x, n_y = np.asarray(n_x, dtype='float64')*rad, np.asarray(n_y, dtype='float64')*rad
+            e_x    = n_x[e_i[:,0]] + (trim(n_x[e_i[:,1]]-n_x[e_i[:,0]]) + trim(n_x[e_i[:,2]]-n_x[e_i[:,0]]))/3.0
+            e_y    = n_y[e_i].sum(axis=1)/3.0
+            
+            #___________________________________________________________________
+            # orientate edges: left element (edge_tri[0]) has to be on the left 
+            # side of the edge vector, otherwise swap elements or for boundary 
+            # edges swap the edge vertices
+            ed_dx  = trim(n_x[edges[1,:]] - n_x[edges[0,:]])
+            ed_dy  = n_y[edges[1,:]] - n_y[edges[0,:]]
+            el_dx  = trim(e_x[e_tri[0,:]] - n_x[edges[0,:]])
+            el_dy  = e_y[e_tri[0,:]] - n_y[edges[0,:]]
+            is_r   = (ed_dx*el_dy - ed_dy*el_dx) < 0.0
+            is_bnd = e_tri[1,:]<0
+            e_tri[:, is_r & ~is_bnd] = e_tri[::-1, is_r & ~is_bnd]
+            edges[:, is_r &  is_bnd] = edges[::-1, is_r &  is_bnd]
+            del(ed_dx, ed_dy, el_dx, el_dy, is_r)
+            
+            #___________________________________________________________________
+            # distance vector from edge mid point to left and right element 
+            # centroid 
+            ed_x   = n_x[edges[0,:]] + 0.5*trim(n_x[edges[1,:]] - n_x[edges[0,:]])
+            ed_y   = 0.5*(n_y[edges[0,:]] + n_y[edges[1,:]])
+            e_dxdy = np.zeros((4, edges.shape[1]))
+            for ii, e_sel in enumerate([e_tri[0,:], np.where(is_bnd, 0, e_tri[1,:])]):
+                e_dxdy[2*ii  ,:] = trim(e_x[e_sel]-ed_x)*np.cos(e_y[e_sel])*Rearth
+                e_dxdy[2*ii+1,:] = (e_y[e_sel]-ed_y)*Rearth
+            e_dxdy[2:4, is_bnd] = 0.0
+            
+            #___________________________________________________________________
+            self.edges, self.edge_tri, self.edge_cross_dxdy = edges, e_tri, e_dxdy
+            
+        #_______________________________________________________________________
+        self.n2ded = self.edges.shape[1]
+        return(self)
+    
+    
+    
+    # ___EDGE CROSS VECTORS OF LEFT AND RIGHT ELEMENT__________________________
+    #| edge arrays as they are used by do_analyse_transects, calc_mhflx and    |
+    #| calc_hbarstreamf, computes/loads the edges if they are not there yet    |
+    #| ___INPUT_____________________________________________________________   |
+    #| do_normvec :   bool, False: dx, dy from edge mid point to left/right    |
+    #|                element centroid, True: its normal vector (dy, -dx)      |
+    #| diagpath   :   str, data directory that is searched for the diag file   |
+    #| ___RETURNS___________________________________________________________   |
+    #| edge       :   array, [2 x n2ded] vertice indices of edge               |
+    #| edge_tri   :   array, [2 x n2ded] index of left and right element       |
+    #| edge_dxdy_l:   array, [2 x n2ded] vector of left element                |
+    #| edge_dxdy_r:   array, [2 x n2ded] vector of right element, 0 for        |
+    #|                boundary edges                                           |
+    #|_________________________________________________________________________|
+    def get_edge_dxdy(self, do_normvec=False, diagpath=None):
+        self.compute_edges(diagpath=diagpath)
+        edge_dxdy = np.asarray(self.edge_cross_dxdy, dtype='float64')
+        if do_normvec:
+            edge_dxdy_l = np.array([ edge_dxdy[1,:], -edge_dxdy[0,:]])
+            edge_dxdy_r = np.array([-edge_dxdy[3,:],  edge_dxdy[2,:]])
+        else:
+            edge_dxdy_l = np.array([ edge_dxdy[0,:],  edge_dxdy[1,:]])
+            edge_dxdy_r = np.array([ edge_dxdy[2,:],  edge_dxdy[3,:]])
+        edge_tri = np.asarray(self.edge_tri)
+        edge_dxdy_r[:, edge_tri[1,:]<0] = 0.0
+        return(np.asarray(self.edges), edge_tri, edge_dxdy_l, edge_dxdy_r)
+    
+    
+    
+    # ___FIND MESH DIAGNOSTIC FILE_____________________________________________
+    #| search the diag file written by the model in the data directory, in the |
+    #| directory of the first simulation chunk (../1/) and in the mesh path    |
+    #| ___INPUT_____________________________________________________________   |
+    #| datapath :   str, data directory, None searches only the mesh path      |
+    #| fname    :   str, name of the diag file                                 |
+    #| ___RETURNS___________________________________________________________   |
+    #| diagfile :   str, full path of the diag file, None if it is not found   |
+    #|_________________________________________________________________________|
+    def find_meshdiag(self, datapath=None, fname='fesom.mesh.diag.nc'):
+        dname_list = list()
+        if datapath is not None: 
+            dname_list.append(datapath)
+            dname_list.append(os.path.join(os.path.dirname(os.path.normpath(datapath)),'1/'))
+        dname_list.append(self.path)
+        for dname in dname_list:
+            if os.path.isfile(os.path.join(dname, fname)): return(os.path.join(dname, fname))
+        return(None)
+    
+    
+    
+    # ___COMPUTE SPATIAL INDEX OF MESH_________________________________________
+    #| spatial index for fast batch queries of nearest vertices, containing    |
+    #| elements and vertices within radius or box, consists of:                |
+    #| KD-tree on 3d cartesian vertice coordinates (on unit sphere), is not    |
+    #|   stored in the npy cache, but is rebuild at the first query            |
+    #| bucket grid of elements: regular lon/lat grid where every bucket holds  |
+    #|   the indices of all elements whos bounding box overlaps with it in     |
+    #|   CSR format (sidx_eptr, sidx_elem), elements across the periodic       |
+    #|   boundary are unwrapped                                                |
+    #|_________________________________________________________________________|
+    def compute_sindex(self):
+        self.do_sindex = True
+        print(' > comp spatial index')
+        #_______________________________________________________________________
+        # resolution of element bucket grid --> in average about 2 elements 
+        # per bucket
+        nbx    = int(np.clip(np.ceil(np.sqrt(self.n2de)), 4, 2**14))
+        nby    = int(max(nbx//2, 2))
+        x0     = float(np.floor(self.n_x.min()))
+        dbx, dby = 360.0/nbx, 180.0/nby
+        
+        #_______________________________________________________________________
+        # unwrapped element bounding boxes in bucket indices
+        e_x    = np.asarray(self.n_x, dtype='float64')[self.e_i]
+        e_x    = e_x[:,0:1] + (e_x - e_x[:,0:1] + 180.0) % 360.0 - 180.0
+        e_y    = np.asarray(self.n_y, dtype='float64')[self.e_i]
+        bx0    = np.floor((e_x.min(axis=1)-x0)/dbx).astype('int64')
+        bx1    = np.floor((e_x.max(axis=1)-x0)/dbx).astype('int64')
+        by0    = np.clip(np.floor((e_y.min(axis=1)+90.0)/dby).astype('int64'), 0, nby-1)
+        by1    = np.clip(np.floor((e_y.max(axis=1)+90.0)/dby).astype('int64'), 0, nby-1)
+        bx1    = np.minimum(bx1, bx0+nbx-1)
+        del(e_x, e_y)
+        
+        #_______________________________________________________________________
+        # expand every element to all buckets it overlaps 
+        nx_e   = bx1-bx0+1
+        cnt    = nx_e*(by1-by0+1)
+        e_rep  = np.repeat(np.arange(self.n2de, dtype='int64'), cnt)
+        k      = np.arange(e_rep.size, dtype='int64') - np.repeat(np.cumsum(cnt)-cnt, cnt)
+        bucket = (by0[e_rep] + k//nx_e[e_rep])*nbx + (bx0[e_rep] + k%nx_e[e_rep]) % nbx
+        del(k, cnt, nx_e, bx0, bx1, by0, by1)
+        
+        #_______________________________________________________________________
+        idx            = np.argsort(bucket, kind='stable')
+        self.sidx_elem = e_rep[idx].astype('int32')
+        self.sidx_eptr = np.hstack(([0], np.cumsum(np.bincount(bucket, minlength=nbx*nby)))).astype('int64')
+        self.sidx_grid = [x0, dbx, dby, nbx, nby]
+        del(idx, e_rep, bucket)
+        
+        #_______________________________________________________________________
+        self._sidx_tree = None
+        return(self)
+    
+    
+    
+    # ___KD-TREE OF SPATIAL INDEX______________________________________________
+    #| build KD-tree on 3d cartesian vertice coordinates on first use          |
+    #|_________________________________________________________________________|
+    def _get_sidx_tree(self):
+        if self.__dict__.get('_sidx_tree', None) is None:
+            x, y, z = grid_cart3d(np.asarray(self.n_x, dtype='float64'), 
+                                  np.asarray(self.n_y, dtype='float64'), is_deg=True)
+            self._sidx_tree = cKDTree(np.column_stack((x, y, z)))
+        return(self._sidx_tree)
+    
+    
+    
+    # ___QUERY NEAREST VERTICES________________________________________________
+    #| find k nearest vertices for batch of points                             |
+    #| ___INPUT_____________________________________________________________   |
+    #| lon, lat :   float or array, coordinates of query points in degree      |
+    #| k        :   int, number of nearest vertices, default=1                 |
+    #| ___RETURNS___________________________________________________________   |
+    #| dist     :   array, great circle distance to vertices in [km]           |
+    #| idx      :   array, vertice indices                                     |
+    #|_________________________________________________________________________|
+    def query_nearest_node(self, lon, lat, k=1):
+        x, y, z   = grid_cart3d(np.asarray(lon, dtype='float64'), np.asarray(lat, dtype='float64'), is_deg=True)
+        dist, idx = self._get_sidx_tree().query(np.stack((x, y, z), axis=-1), k=k)
+        dist      = 2.0*np.arcsin(np.minimum(dist/2.0, 1.0))*6367.5
+        return(dist, idx)
+    
+    
+    
+    # ___QUERY VERTICES WITHIN RADIUS__________________________________________
+    #| ___INPUT_____________________________________________________________   |
+    #| lon, lat :   float or array, coordinates of query points in degree      |
+    #| radius   :   float, search radius in [km]                               |
+    #| ___RETURNS___________________________________________________________   |
+    #| idx      :   array of vertice indices (or array of lists for several    |
+    #|              query points)                                              |
+    #|_________________________________________________________________________|
+    def query_radius(self, lon, lat, radius):
+        x, y, z = grid_cart3d(np.asarray(lon, dtype='float64'), np.asarray(lat, dtype='float64'), is_deg=True)
+        chord   = 2.0*np.sin(min(radius/6367.5, np.pi)/2.0)
+        idx     = self._get_sidx_tree().query_ball_point(np.stack((x, y, z), axis=-1), chord)
+        if np.ndim(lon)==0: idx = np.sort(np.asarray(idx, dtype='int64'))
+        return(idx)
+    
+    
+    
+    # ___QUERY VERTICES WITHIN BOX_____________________________________________
+    #| candidates are taken from a KD-tree ball query around the box center    |
+    #| that encloses the box, than the candidates are checked exactly          |
+    #| ___INPUT_____________________________________________________________   |
+    #| box      :   list, [lonmin, lonmax, latmin, latmax] in degree           |
+    #| ___RETURNS___________________________________________________________   |
+    #| idx      :   array, sorted vertice indices within box                   |
+    #|_________________________________________________________________________|
+    def query_box(self, box):
+        #_______________________________________________________________________
+        # box outline and box center on unit sphere
+        bx   = np.hstack([np.linspace(box[0], box[1], 33), np.zeros(33)+box[1], 
+                          np.linspace(box[1], box[0], 33), np.zeros(33)+box[0]])
+        by   = np.hstack([np.zeros(33)+box[2], np.linspace(box[2], box[3], 33), 
+                          np.zeros(33)+box[3], np.linspace(box[3], box[2], 33)])
+        bxyz = np.column_stack(grid_cart3d(bx, by, is_deg=True))
+        cxyz = np.column_stack(grid_cart3d(np.array([0.5*(box[0]+box[1])]), np.array([0.5*(box[2]+box[3])]), is_deg=True))
+        
+        # search radius --> largest chord distance from center to box outline 
+        # plus a safety margin for the discretization of the outline
+        chord= np.sqrt(((bxyz-cxyz)**2).sum(axis=1)).max()*1.05 + 1.0e-6
+        idx  = np.asarray(self._get_sidx_tree().query_ball_point(cxyz[0], min(chord, 2.0)), dtype='int64')
+        
+        #_______________________________________________________________________
+        # check candidates exactly 
+        n_x  = np.asarray(self.n_x[idx], dtype='float64')
+        n_x  = box[0] + (n_x - box[0]) % 360.0
+        isin = (n_x<=box[1]) & (self.n_y[idx]>=box[2]) & (self.n_y[idx]<=box[3])
+        if box[1]-box[0]>=360.0: isin = (self.n_y[idx]>=box[2]) & (self.n_y[idx]<=box[3])
+        return(np.sort(idx[isin]))
+    
+    
+    
+    # ___QUERY ELEMENTS WITHIN BOX_____________________________________________
+    #| candidates are taken from the buckets of the element bucket grid that   |
+    #| overlap with the box together with the periodic boundary elements,     |
+    #| than their centroids (mesh.e_x, mesh.e_y) are checked exactly           |
+    #| ___INPUT_____________________________________________________________   |
+    #| box      :   list, [lonmin, lonmax, latmin, latmax] in degree           |
+    #| ___RETURNS___________________________________________________________   |
+    #| idx      :   array, sorted element indices within box                   |
+    #|_________________________________________________________________________|
+    def query_box_elem(self, box):
+        if len(getattr(self, 'sidx_eptr', []))==0: self.compute_sindex()
+        x0, dbx, dby, nbx, nby = self.sidx_grid
+        
+        #_______________________________________________________________________
+        # buckets that overlap with box, one bucket more on every side
+        if box[1]-box[0]>=360.0: 
+            bx  = np.arange(nbx, dtype='int64')
+        else:
+            bx0 = int(np.floor((box[0]-x0)/dbx))-1
+            bx1 = min(int(np.floor((box[1]-x0)/dbx))+1, bx0+nbx-1)
+            bx  = np.arange(bx0, bx1+1, dtype='int64') % nbx
+        by0 = int(np.clip(np.floor((box[2]+90.0)/dby)-1, 0, nby-1))
+        by1 = int(np.clip(np.floor((box[3]+90.0)/dby)+1, 0, nby-1))
+        bucket = (np.arange(by0, by1+1, dtype='int64')[:,None]*nbx + bx[None,:]).ravel()
+        
+        #_______________________________________________________________________
+        # elements of these buckets (CSR ranges) + periodic boundary elements, 
+        # their mean vertice longitude is not within their unwrapped bounding 
+        # box
+        eptr   = np.asarray(self.sidx_eptr)
+        start  = eptr[bucket]
+        cnt    = eptr[bucket+1]-start
+        pos    = np.repeat(start-np.cumsum(cnt)+cnt, cnt) + np.arange(cnt.sum(), dtype='int64')
+        idx    = np.unique(np.hstack((np.asarray(self.sidx_elem)[pos], 
+                                      np.asarray(self.e_pbnd_1, dtype='int64'))).astype('int64'))
+        del(eptr, start, cnt, pos, bucket)
+        
+        #_______________________________________________________________________
+        # check candidates exactly
+        e_x  = np.asarray(self.e_x[idx], dtype='float64')
+        e_x  = box[0] + (e_x - box[0]) % 360.0
+        isin = (e_x<=box[1]) & (self.e_y[idx]>=box[2]) & (self.e_y[idx]<=box[3])
+        if box[1]-box[0]>=360.0: isin = (self.e_y[idx]>=box[2]) & (self.e_y[idx]<=box[3])
+        return(idx[isin])
+    
+    
+    
+    # ___QUERY CONTAINING ELEMENT AND BARYCENTRIC WEIGHTS______________________
+    #| find element that contains point and its barycentric interpolation      |
+    #| weights with respect to the element vertices:                           |
+    #| data_pt = (weights*data_n[mesh.e_i[e_idx,:]]).sum(axis=-1)              |
+    #| ___INPUT_____________________________________________________________   |
+    #| lon, lat :   float or array, coordinates of query points in degree      |
+    #| ___RETURNS___________________________________________________________   |
+    #| e_idx    :   array, element indices, -1 if point is not within mesh     |
+    #| weights  :   array, [npts x 3] barycentric weights, nan if point is not |
+    #|              within mesh                                                |
+    #|_________________________________________________________________________|
+    def query_elem(self, lon, lat):
+        if len(getattr(self, 'sidx_eptr', []))==0: self.compute_sindex()
+        lon, lat   = np.atleast_1d(np.asarray(lon, dtype='float64')), np.atleast_1d(np.asarray(lat, dtype='float64'))
+        x0, dbx, dby, nbx, nby = self.sidx_grid
+        e_idx, w   = _do_query_elem(lon.ravel(), lat.ravel(), np.asarray(self.n_x, dtype='float64'), 
+                                    np.asarray(self.n_y, dtype='float64'), np.asarray(self.e_i, dtype='int64'), 
+                                    np.asarray(self.sidx_eptr), np.asarray(self.sidx_elem),
+                                    float(x0), float(dbx), float(dby), int(nbx), int(nby))
+        return(e_idx.reshape(lon.shape), w.reshape(lon.shape+(3,)))
+    
+    
+    
     # ___COMPUTE RESOLUTION OF ELEMENTS________________________________________
     #| compute area of elements in [m], options:                               |
     #| which :   str,                                                          |       
@@ -828,29 +1915,44 @@ ___________________________________________""".format(
                 print(' > comp n_area')
                 #_______________________________________________________________
                 # be sure that elemente area already exists
-                self.compute_e_area()
-                
-                #_______________________________________________________________
-                e_area_x3 = np.vstack((self.e_area, self.e_area, self.e_area)).transpose().flatten()
-                e_iz_n    = np.vstack((self.e_iz  , self.e_iz  , self.e_iz  )).transpose().flatten()
+                self.compute_e_area()
                 
                 #_______________________________________________________________
-                # single loop over self.e_i.flat is ~4 times faster than douple loop 
-                # over for i in range(3): ,for j in range(self.n2de):
-                self.n_area = np.zeros((self.nlev, self.n2dn))
-                count_e = 0
-                for idx in self.e_i.flat:
-                    e_iz = e_iz_n[count_e]
-                    self.n_area[:e_iz, idx] = self.n_area[:e_iz, idx] + e_area_x3[count_e]
-                    count_e = count_e+1 # count triangle index for aux_area[count] --> aux_area =[n2de*3,]
-                self.n_area = self.n_area/3.0
-                del e_area_x3, e_iz_n, count_e
+                self.n_area = compute_n_area_fast(self.e_i, self.e_area,
+                                                  self.e_iz, self.nlev, self.n2dn)
                 
         #_______________________________________________________________________
         return(self)
 
 
 
+    # ___COMPUTE ELEM TO VERTICE INTERPOLATION OPERATOR_______________________
+    #| build sparse [n2dn x n2de] matrix that holds the area contribution of   |
+    #| every element to its three vertices (e_area/3). Multiplied with elem    |
+    #| data and divided by the clusterarea of the respective level, gives the  |
+    #| area weighted elem to vertice interpolation. Matrix is computed only    |
+    #| once and stored with the mesh object                                    |
+    #|_________________________________________________________________________|
+    def compute_e2n_mat(self):
+        # just compute e2n_mat if it does not exist yet, getattr for mesh 
+        # objects from older *.pckl files
+        if getattr(self, 'e2n_mat', None) is None:
+            self.compute_e_area()
+            print(' > comp e2n_mat')
+            #___________________________________________________________________
+            e_area_x3    = np.repeat(np.asarray(self.e_area, dtype=np.float64), 3)/3.0
+            e_idx_x3     = np.repeat(np.arange(0, self.n2de, dtype=np.int64), 3)
+            self.e2n_mat = csr_matrix((e_area_x3, (np.asarray(self.e_i, dtype=np.int64).ravel(), e_idx_x3)), 
+                                      shape=(self.n2dn, self.n2de))
+            # sum up duplicate entries 
+            self.e2n_mat.sum_duplicates()
+            del e_area_x3, e_idx_x3
+            
+        #_______________________________________________________________________
+        return(self)
+    
+    
+    
     # ___COMPUTE RESOLUTION OF AT VERTICES_____________________________________
     #| compute resolution at vertices in m                                     |
     #| which :   str,                                                          |       
@@ -919,92 +2021,17 @@ ___________________________________________""".format(
         print(' > compute lsmask')
         self.do_lsmask = True
         #_______________________________________________________________________
-        # build land boundary edge matrix
-        t1 = time.time()
-        edge    = np.concatenate((self.e_i[:,[0,1]], \
-                                  self.e_i[:,[0,2]], \
-                                  self.e_i[:,[1,2]]),axis=0)
-        edge    = np.sort(edge,axis=1) 
-        
-        # python  sortrows algorythm --> matlab equivalent
-        # twice as fast as list sorting
-        #sortidx = np.lexsort((edge[:,0],edge[:,1]))
-        #edge    = edge[sortidx,:].squeeze()
-        #edge    = np.array(edge)
-        
-        ## python  sortrows algorythm --> matlab equivalent
-        edge    = edge.tolist()
-        edge.sort()
-        edge    = np.array(edge)
-        
-        idx     = np.diff(edge,axis=0)==0
-        idx     = np.all(idx,axis=1)
-        idx     = np.logical_or(np.concatenate((idx,np.array([False]))),\
-                                np.concatenate((np.array([False]),idx)))
-        
-        # all edges that belong to boundary
-        bnde    = edge[idx==False,:]
-        nbnde   = bnde.shape[0];
-        del edge, idx
-        
-        #_______________________________________________________________________
-        run_cont        = np.zeros((1,nbnde))*np.nan
-        run_cont[0,:2]  = bnde[0,:]  # initialise the first landmask edge
-        run_bnde        = bnde[1:,:] # remaining edges that still need to be distributed
-        count_init      = 1;
-        init_ind        = run_cont[0,0];
-        ind_lc_s        = 0;
+        # build land boundary edge matrix, edges that belong only to one triangle
+        bnde    = compute_boundary_edges(self.e_i)
         
+        #_______________________________________________________________________
+        # assemble consecutive connected boundary edges into closed polygons
         polygon_xy = []
-        for ii in range(0,nbnde):
-            #___________________________________________________________________
-            # search for next edge that contains that contains the last node index from 
-            # run_cont
-            kk_rc = np.column_stack(np.where( run_bnde==np.int(run_cont[0,count_init]) ))
-            #kk_rc = np.argwhere( run_bnde==np.int(run_cont[0,count_init]) ) --> slower than np.column_stack(np.where....
-            kk_r  = kk_rc[:,0]
-            kk_c  = kk_rc[:,1]
-            count_init  = count_init+1
-            
-            #___________________________________________________________________
-            if kk_c[0] == 0 :
-                run_cont[0,count_init] = run_bnde[kk_r[0],1]
-            else:
-                run_cont[0,count_init] = run_bnde[kk_r[0],0]
-                
-            #___________________________________________________________________
-            # if a land sea mask polygon is closed
-            if  np.any(run_bnde[kk_r[0],:] == init_ind):
-                #_______________________________________________________________
-                # add points to polygon_list
-                aux_xy = np.vstack((self.n_x[np.int64(run_cont[0,0:count_init+1])], 
-                                    self.n_y[np.int64(run_cont[0,0:count_init+1])])).transpose()
-                polygon_xy.append(aux_xy)
-                del  aux_xy
-                
-                #_______________________________________________________________
-                # delete point from list
-                run_bnde   = np.delete(run_bnde,kk_r[0],0)
-                
-                #_______________________________________________________________
-                # if no points left break the while loop
-                if np.size(run_bnde)==0:
-                    break
-                
-                #_______________________________________________________________
-                # initialise new lsmask contour
-                run_cont        = np.zeros((1,nbnde))*np.nan
-                run_cont[0,:2]  = run_bnde[0,:]
-                run_bnde        = run_bnde[1:,:]
-                count_init      = 1;
-                init_ind        = run_cont[0,0]
-            else:
-                run_bnde = np.delete(run_bnde,kk_r[0],0)
-            
+        for poly_i in compute_boundary_polygons(bnde, self.n2dn):
+            polygon_xy.append(np.vstack((self.n_x[poly_i], self.n_y[poly_i])).transpose())
+        
         #_______________________________________________________________________
         self.lsmask = polygon_xy
-        #t2 = time.time()
-        #print(t2-t1)
         return(self)
     
     
@@ -1168,6 +2195,181 @@ ___________________________________________""".format(
         
         #_______________________________________________________________________
         return(self)
+    
+    
+    
+    # ___LAND-SEA MASK SHAPEFILE_______________________________________________
+    #| path of land-sea mask shapefile of the mesh, the shapefile is written   |
+    #| at the first call and is stored next to the mesh cache. It is written   |
+    #| again only when the land-sea mask polygons changed (e.g. other focus or |
+    #| rotation), which is checked with a key stored in *.tpvkey               |
+    #| ___INPUT_____________________________________________________________   |
+    #| which    :   str, 'a'   : land-sea mask with augmented periodic         |
+    #|                           boundary mesh.lsmask_a,                       |
+    #|                           tripyview_fesom2_ID_focus=X.shp               |
+    #|                    'pbnd': land-sea mask with periodic boundary         |
+    #|                           mesh.lsmask, tripyview_fesom2_ID_pbnd.shp     |
+    #| do_info  :   bool, print info where .shp file is saved                  |
+    #| ___RETURNS___________________________________________________________   |
+    #| shppath  :   str, path of shapefile                                     |
+    #|_________________________________________________________________________|
+    def get_lsmask_shapefile(self, which='a', do_info=True):
+        if   which=='a'   : 
+            lsmask, fname = self.lsmask_a, 'tripyview_fesom2_{}_focus={}'.format(self.id, self.focus)
+        elif which=='pbnd': 
+            lsmask, fname = self.lsmask  , 'tripyview_fesom2_{}_pbnd'.format(self.id)
+        else: raise ValueError("The option which={} in get_lsmask_shapefile is not supported. (only: 'a', 'pbnd')".format(str(which)))
+        if len(lsmask)==0: raise ValueError(' --> land-sea mask is empty, compute it first with mesh.compute_lsmask()')
+        
+        #_______________________________________________________________________
+        # key of land-sea mask polygons
+        hkey = hashlib.blake2b(digest_size=16)
+        for xycoord in lsmask: hkey.update(np.ascontiguousarray(xycoord, dtype=np.float64).tobytes())
+        hkey = hkey.hexdigest()
+        
+        #_______________________________________________________________________
+        # look for existing shapefile next to mesh cache 
+        shpdir  = lsmask_shapefile_dir(self)
+        shppath = os.path.join(shpdir, fname+'.shp')
+        keypath = os.path.join(shpdir, fname+'.tpvkey')
+        if os.path.isfile(shppath) and os.path.isfile(keypath):
+            with open(keypath) as fid: 
+                if fid.read().strip()==hkey: return(shppath)
+        
+        #_______________________________________________________________________
+        shppath = lsmask_2shapefile(self, lsmask=lsmask, path=shpdir, fname=fname, do_info=do_info)
+        try:
+            with open(keypath, 'w') as fid: fid.write(hkey)
+        except OSError: pass
+        return(shppath)
+    
+    
+    
+    # ___CUTOUT REGIONAL SUB-MESH______________________________________________
+    #| create compact regional sub-mesh from box or shapefile. Vertices and    |
+    #| elements are renumbered, mesh.n_idx_g and mesh.e_idx_g hold the global  |
+    #| vertice and element indices of the sub-mesh so that load_data_fesom2    |
+    #| only selects the regional data. Depth levels, areas and cavity info are |
+    #| taken over from the full mesh, the land-sea mask is the land-sea mask   |
+    #| of the full mesh clipped at the region.                                 |
+    #| ___INPUT_____________________________________________________________   |
+    #| box      :   list, [lonmin, lonmax, latmin, latmax], polygon [2 x npts] |
+    #|              shapefile or boolean vertice mask [n2dn], see              |
+    #|              sub_utility.do_boxmask()                                   |
+    #| which    :   str, which elements are kept                               |
+    #|              'soft': elements with at least one vertice in box          |
+    #|              'mid' : elements with at least two vertices in box         |
+    #|              'hard': elements with all vertices in box                  |
+    #| do_info  :   bool, print info of sub-mesh                               |
+    #| ___RETURNS___________________________________________________________   |
+    #| submesh  :   fesom2 mesh object of the region                           |
+    #| ___INFO______________________________________________________________   |
+    #| elem to vertice interpolation on the sub-mesh uses the clusterarea of   |
+    #| the full mesh, vertices at the cut boundary miss the contribution of    |
+    #| the elements outside the region                                         |
+    #|_________________________________________________________________________|
+    def subset(self, box, which='mid', do_info=True):
+        from .sub_utility import do_boxmask
+        print(' > cutout sub-mesh')
+        #_______________________________________________________________________
+        # select elements by their vertices in box, than keep all vertices of 
+        # the selected elements
+        n_inbox = do_boxmask(self, box, do_elem=False)
+        e_inbox = n_inbox[self.e_i]
+        if   which == 'soft': e_inbox =  np.any(e_inbox,axis=1)
+        elif which == 'mid' : e_inbox = (np.sum(e_inbox,axis=1)>1)
+        elif which == 'hard': e_inbox =  np.all(e_inbox,axis=1) 
+        else: raise ValueError("The option which={} in subset is not supported. \n(only: 'hard', 'mid', 'soft')".format(str(which)))
+        e_idx   = np.flatnonzero(e_inbox)
+        n_idx   = np.unique(self.e_i[e_idx,:])
+        del n_inbox, e_inbox
+        if e_idx.size==0: raise ValueError(' --> there are no elements of the mesh within the given box')
+        
+        # areas are taken over from the full mesh
+        self.compute_e_area()
+        self.compute_n_area()
+        
+        #_______________________________________________________________________
+        sub = mesh_fesom2.__new__(mesh_fesom2)
+        for key in ['path', 'cachepath', 'id', 'abg', 'focus', 'focus_old', 'cyclic', 
+                    'do_rot', 'do_augmpbnd', 'do_cavity', 'do_earea', 'do_eresol', 
+                    'do_narea', 'do_nresol', 'do_binmesh', 'fname_nod2d', 
+                    'fname_elem2d', 'fname_aux3d', 'fname_nlvls', 'fname_elvls', 
+                    'fname_cnlvls', 'fname_celvls', 'nlev', 'zlev', 'zmid']:
+            setattr(sub, key, copy.deepcopy(getattr(self, key, _MESH_DEFAULTS.get(key, None))))
+        sub.do_lsmshp, sub.do_edges, sub.do_sindex = False, False, False
+        sub.do_compact = getattr(self, 'do_compact', False)
+        sub.info_txt = ''
+        
+        # local --> global index map, if self is already a sub-mesh map to 
+        # indices of the full mesh
+        n_idx_g, e_idx_g = getattr(self, 'n_idx_g', None), getattr(self, 'e_idx_g', None)
+        sub.n_idx_g = n_idx if n_idx_g is None else np.asarray(n_idx_g)[n_idx]
+        sub.e_idx_g = e_idx if e_idx_g is None else np.asarray(e_idx_g)[e_idx]
+        
+        #_______________________________________________________________________
+        # vertice arrays
+        sub.n2dn = n_idx.size
+        for key in ['n_x', 'n_y', 'n_i', 'n_z', 'n_iz', 'n_c', 'n_ic', 'n_xo', 'n_yo', 'n_resol']:
+            val = getattr(self, key, [])
+            if isinstance(val, np.ndarray) and val.shape[-1]==self.n2dn: 
+                setattr(sub, key, np.array(val[..., n_idx]))
+            else: 
+                setattr(sub, key, [])
+        sub.n_area = np.array(np.ma.getdata(self.n_area)[:, n_idx])
+        
+        # element arrays, renumber vertice indices of elements
+        sub.n2de = e_idx.size
+        n_l2g    = np.full(self.n2dn, -1, dtype=np.int64)
+        n_l2g[n_idx] = np.arange(0, n_idx.size)
+        sub.e_i  = n_l2g[self.e_i[e_idx,:]].astype(self.e_i.dtype)
+        del n_l2g
+        for key in ['e_iz', 'e_ic', 'e_resol']:
+            val = getattr(self, key, [])
+            if isinstance(val, np.ndarray) and val.shape[-1]==self.n2de: 
+                setattr(sub, key, np.array(val[..., e_idx]))
+            else: 
+                setattr(sub, key, [])
+        sub.e_area = np.array(np.ma.getdata(self.e_area)[e_idx])
+        
+        # vertices along the cut boundary lost the contribution of the elements 
+        # outside the box --> e2n interpolation on the sub-mesh must be normalized
+        # with the clusterarea of the remaining sub-mesh elements, the full mesh
+        # n_area is kept for the area weights
+        sub.e2n_area = compute_n_area_fast(sub.e_i, sub.e_area, sub.e_iz, 
+                                           sub.nlev, sub.n2dn)
+        
+        #_______________________________________________________________________
+        # edges, spatial index and elem to vertice operator need to be rebuild
+        # for the sub-mesh
+        sub.e2n_mat = None
+        sub.edges, sub.edge_tri, sub.edge_cross_dxdy, sub.n2ded = [], [], [], 0
+        sub.sidx_eptr, sub.sidx_elem, sub.sidx_grid = [], [], []
+        
+        #_______________________________________________________________________
+        # periodic boundary 
+        sub.e_pbnd_a, sub.n_pbnd_a = [], []
+        sub.n_xa, sub.n_ya, sub.n_za, sub.n_ia = [], [], [], []
+        sub.n_iza, sub.n_ca, sub.n_ica = [], [], []
+        sub.e_ia = np.empty(shape=[0, 3])
+        sub.n2dna, sub.n2dea = sub.n2dn, sub.n2de
+        sub.pbnd_find()
+        if sub.do_augmpbnd and sub.e_pbnd_1.size>0: sub.pbnd_augment()
+        
+        #_______________________________________________________________________
+        # land-sea mask of full mesh clipped at region
+        sub.do_lsmask = False
+        sub.lsmask, sub.lsmask_a, sub.lsmask_p = [], [], []
+        lsmask = self.lsmask_a if len(self.lsmask_a)!=0 else self.lsmask
+        if len(lsmask)!=0:
+            sub.do_lsmask= True
+            sub.lsmask   = lsmask_clip(lsmask, subset_regpoly(sub, box))
+            sub.lsmask_a = sub.lsmask
+            sub.lsmask_p = lsmask_patch(sub.lsmask_a)
+        
+        #_______________________________________________________________________
+        if do_info: print(sub.info())
+        return(sub)
 
 
     
@@ -1205,6 +2407,68 @@ def lsmask_patch(lsmask):
 
 
 
+# ___CLIP LAND-SEA MASK POLYGONS AT REGION_____________________________________
+#| clip land-sea mask polygons at region polygon, used to derive the land-sea  |
+#| mask of a sub-mesh from the land-sea mask of the full mesh                  |
+#| ___INPUT_________________________________________________________________   |
+#| lsmask   :   list([array1[npts,2], array2[npts,2]], ...)                    |
+#| regpoly  :   shapely Polygon or MultiPolygon of region                      |
+#| ___RETURNS_______________________________________________________________   |
+#| lsmask_c :   list([array1[npts,2], array2[npts,2]], ...) clipped polygons   |
+#|_____________________________________________________________________________|
+def lsmask_clip(lsmask, regpoly):
+    from shapely.geometry import Polygon
+    #___________________________________________________________________________
+    lsmask_c = []
+    for xycoord in lsmask: 
+        if xycoord.shape[0]<3: continue
+        poly = Polygon(xycoord)
+        if not poly.is_valid: poly = poly.buffer(0)
+        poly = poly.intersection(regpoly)
+        if poly.is_empty: continue
+        for part in getattr(poly, 'geoms', [poly]):
+            if part.geom_type=='Polygon' and part.area>0: 
+                lsmask_c.append(np.array(part.exterior.coords))
+    
+    #___________________________________________________________________________
+    return(lsmask_c)
+
+
+
+# ___REGION POLYGON OF SUB-MESH________________________________________________
+#| shapely geometry of the region of a sub-mesh, for a rectangular box the     |
+#| bounding box of the sub-mesh vertices is used since the elements at the     |
+#| cut boundary can extend beyond the box                                      |
+#| ___INPUT_________________________________________________________________   |
+#| mesh     :   fesom2 sub-mesh object                                         |
+#| box      :   box or shapefile given to mesh.subset()                        |
+#| ___RETURNS_______________________________________________________________   |
+#| regpoly  :   shapely Polygon or MultiPolygon                                |
+#|_____________________________________________________________________________|
+def subset_regpoly(mesh, box):
+    import shapefile as shp
+    from shapely.geometry import Polygon, MultiPolygon, box as shpbox
+    #___________________________________________________________________________
+    if   box is None or isinstance(box, str) or (isinstance(box, (list, np.ndarray)) and len(box)==4) or \
+         (isinstance(box, np.ndarray) and box.dtype==bool):
+        regpoly = shpbox(mesh.n_x.min(), mesh.n_y.min(), mesh.n_x.max(), mesh.n_y.max())
+    elif isinstance(box, list) and len(box)==2: 
+        regpoly = Polygon(list(zip(box[0], box[1])))
+    elif isinstance(box, np.ndarray): 
+        regpoly = Polygon(list(zip(box[0,:], box[1,:])))
+    elif isinstance(box, (Polygon, MultiPolygon)): 
+        regpoly = box
+    elif isinstance(box, shp.Reader): 
+        regpoly = MultiPolygon([Polygon(shape.points) for shape in box.shapes()])
+    else:
+        raise ValueError('the given box information to compute the region polygon has no valid format')
+    if not regpoly.is_valid: regpoly = regpoly.buffer(0)
+    
+    #___________________________________________________________________________
+    return(regpoly)
+
+
+
 # ___SAVE POLYGON LAND-SEA MASK CONTOUR TO SHAPEFILE___________________________
 #| save FESOM2 grid land-sea mask polygons to shapefile                        |
 #| ___INPUT_________________________________________________________________   |
@@ -1222,7 +2486,8 @@ def lsmask_patch(lsmask):
 #|              filename for shape file                                        |
 #| do_info  :   bool, print info where .shp file is saved, default = True      |       
 #| ___RETURNS_______________________________________________________________   |
-#| nothing                                                                     |
+#| shppath  :   str, path of written shapefile, see also                       |
+#|              mesh.get_lsmask_shapefile() that writes the shapefile only once|
 #| ___INFO__________________________________________________________________   |
 #| --> to load and plot shapefile patches                                      |
 #|      import shapefile as shp                                                |
@@ -1251,56 +2516,22 @@ def lsmask_2shapefile(mesh, lsmask=[], path=[], fname=[], do_info=True):
     from shapely.geometry import Polygon
     
     #___________________________________________________________________________
-    # Create an empty geopandas GeoDataFrame
-    newdata = gpd.GeoDataFrame()
-
-    #___________________________________________________________________________
-    # Add every polygon to GeoDataFrame
-    
     # do not use polygon that is stored in mesh object use polygon that is given 
     # by lsmask=lsmask
-    if not lsmask:
-        for ii in range(0,len(mesh.lsmask_a)):
-            coordinates = mesh.lsmask_a[ii]
-            if coordinates.shape[0]==2: continue
-            
-            # Create a Shapely polygon from the coordinate-tuple list
-            poly = Polygon(coordinates)
-            
-            # Insert the polygon into 'geometry' -column at index 0
-            newdata.loc[ii, 'geometry'] = poly
-            newdata.loc[ii, 'location'] = "{} {}".format('polygon',str(ii))
-            
-    # use polygon storred in mesh object
-    else:
-        for ii in range(0,len(lsmask)):
-            coordinates = lsmask[ii]
-            if coordinates.shape[0]==2: continue
-            
-            # Create a Shapely polygon from the coordinate-tuple list
-            poly = Polygon(coordinates)
-            
-            # Insert the polygon into 'geometry' -column at index 0
-            newdata.loc[ii, 'geometry'] = poly
-            newdata.loc[ii, 'location'] = "{} {}".format('polygon',str(ii))
+    if len(lsmask)==0: lsmask = mesh.lsmask_a
+    
+    #___________________________________________________________________________
+    # create GeoDataFrame with all polygons at once
+    idx     = [ii for ii in range(0,len(lsmask)) if lsmask[ii].shape[0]!=2]
+    newdata = gpd.GeoDataFrame({'location':['{} {}'.format('polygon',str(ii)) for ii in idx]}, 
+                               geometry=[Polygon(lsmask[ii]) for ii in idx], index=idx)
     
     #___________________________________________________________________________
     # write shapefile either in meshpath when there is writing permission 
     # otherwise write in cachepath
-    if not path:
-        if os.access(mesh.path, os.W_OK): 
-            shppath = mesh.path
-        else:
-#             cachepath = path = os.environ.get('MYPY_MESHPATH', os.path.join(os.path.expanduser("~"), "mesh_mypycache"))
-            cachepath = path = os.environ.get('MESHPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "meshcache_tripyview"))
-            cachepath = os.path.join(cachepath, mesh.id)
-            if not os.path.isdir(cachepath):
-                if do_info: print(' > create cache directory: {}'.format(cachepath))
-                os.makedirs(cachepath)
-            shppath = cachepath  
     # if an extra path is given us this to store the shapefile         
-    else:
-        shppath = path
+    if not path: shppath = lsmask_shapefile_dir(mesh, do_info=do_info)
+    else       : shppath = path
         
     #___________________________________________________________________________
     # write lsmask to shapefile 
@@ -1313,7 +2544,34 @@ def lsmask_2shapefile(mesh, lsmask=[], path=[], fname=[], do_info=True):
     newdata.to_file(shppath)
     
     #___________________________________________________________________________
-    return
+    return(shppath)
+
+
+
+# ___DIRECTORY OF LAND-SEA MASK SHAPEFILE______________________________________
+#| shapefiles are stored next to the mesh cache: in the cache folder if the    |
+#| mesh cache is stored there, otherwise in the mesh folder when there is      |
+#| writing permission or in the cache folder                                   |
+#| ___INPUT_________________________________________________________________   |
+#| mesh     :   fesom2 mesh object                                             |
+#| do_info  :   bool, print info when cache folder is created                  |
+#| ___RETURNS_______________________________________________________________   |
+#| shpdir   :   str, directory of shapefiles                                   |
+#|_____________________________________________________________________________|
+def lsmask_shapefile_dir(mesh, do_info=True):
+    cachepath = getattr(mesh, 'cachepath', 'None')
+    if cachepath!='None' and os.path.isdir(cachepath): 
+        return(cachepath)
+    if os.access(mesh.path, os.W_OK): 
+        return(mesh.path)
+    
+    #___________________________________________________________________________
+    cachepath = os.environ.get('MESHPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "meshcache_tripyview"))
+    cachepath = os.path.join(cachepath, mesh.id)
+    if not os.path.isdir(cachepath):
+        if do_info: print(' > create cache directory: {}'.format(cachepath))
+        os.makedirs(cachepath)
+    return(cachepath)
 
 
 
@@ -1501,19 +2759,119 @@ def grid_focus(focus, rlon, rlat):
 # ___ROTATE VECTOR FROM: ROT-->GEO_____________________________________________
 #| in FESOM2 the vector variables are always given in the rotated coordiante   | 
 #| frame in which the model works and need to be rotated into normal geo       |
-#| coordinates                                                                 |
+#| coordinates. The rotation coefficients are computed once per coordinate set |
+#| and are broadcasted along all other dimensions, so arrays of any rank       |
+#| ([npts], [npts x nlev], [ntime x npts x nlev], ...) are rotated in one pass.|
+#| Dask arrays are rotated lazily chunk by chunk.                              |
 #| ___INPUT_________________________________________________________________   |
 #| abg      :   list, with euler angles [alpha, beta, gamma]                   |
-#| lon, lat :   array, longitude and latitude                                  |
+#| lon, lat :   array, longitude and latitude, can be None when rcoef is given |
 #| urot,vrot:   array, zonal and meridional velocities in rotated frame        |
 #| gridis   :   str, in which coordinate frame are given lon, lat              |
 #|              'geo','g','geographical': lon,lat is given in geo coordinates  |
 #|              'rot','r','rotated'     : lon,lat is given in rot coordinates  |
+#| rcoef    :   array, [4 x npts] precomputed rotation coefficients, see       |
+#|              vec_r2g_coeff, mesh.n_rcoef, mesh.e_rcoef, when given lon, lat |
+#|              and gridis are not used, default: None                         |
+#| axis     :   int, dimension of urot, vrot along the points, must be given   |
+#|              for multi dimensional urot, vrot, default: None (1d input)     |
+#| do_inplace:  bool, overwrite urot, vrot (numpy arrays) and compute in their |
+#|              dtype (e.g. float32) to avoid full size float64 temporaries,   |
+#|              default: False                                                 |
 #| ___RETURNS_______________________________________________________________   |
 #| ugeo,vgeo|   array, zonal and meridional velocities in normal geo frame     |
-#|_____________________________________________________________________________|    
-def vec_r2g(abg, lon, lat, urot, vrot, gridis='geo', do_info=False ):
+#|_____________________________________________________________________________|
+def vec_r2g(abg, lon, lat, urot, vrot, gridis='geo', do_info=False, rcoef=None, 
+            axis=None, do_inplace=False):
+    
+    #___________________________________________________________________________
+    # rotation coefficients 
+    if rcoef is None: 
+        if lon is None or lat is None: 
+            raise ValueError(' --> vec_r2g needs lon, lat or the rotation coefficients rcoef')
+        rcoef = vec_r2g_coeff(abg, lon, lat, gridis=gridis)
+    rcoef = np.asarray(rcoef)
+    npts  = rcoef.shape[1]
+    
+    #___________________________________________________________________________
+    # dimension along the points
+    if urot.ndim==0 or urot.shape!=vrot.shape: 
+        raise ValueError('This number of dimensions is in moment not supported for vector rotation')    
+    if axis is None:
+        if urot.ndim>1: raise ValueError(' --> vec_r2g needs the dimension axis along the points for urot, vrot of shape {}'.format(str(urot.shape)))
+        axis = 0
+    if axis<0: axis = urot.ndim+axis
+    if urot.shape[axis]!=npts: 
+        raise ValueError(' --> dimension axis={} of urot, vrot {} does not fit to the {} rotation coefficients'.format(axis, str(urot.shape), npts))
+    
+    #___________________________________________________________________________
+    # dask arrays: rotate chunk by chunk with coefficients of the chunk points
+    if hasattr(urot, 'dask') or hasattr(vrot, 'dask'):
+        urot, vrot = da.asarray(urot), da.asarray(vrot)
+        vrot       = vrot.rechunk(urot.chunks)
+        pts_off    = np.cumsum((0,)+urot.chunks[axis])
+        def _rot_block(ublock, vblock, which, block_info=None):
+            ipts = block_info[0]['chunk-location'][axis]
+            return(_do_apply_r2g(rcoef[:, pts_off[ipts]:pts_off[ipts+1]], ublock, vblock, axis, which))
+        dtype= urot.dtype if urot.ndim>1 else np.result_type(urot.dtype, np.float64)
+        ugeo = da.map_blocks(_rot_block, urot, vrot, 'u', dtype=dtype)
+        vgeo = da.map_blocks(_rot_block, urot, vrot, 'v', dtype=dtype)
+        
+    #___________________________________________________________________________
+    # numpy arrays: rotate in place in dtype of urot
+    elif do_inplace:
+        shape = [1]*urot.ndim
+        shape[axis] = npts
+        c     = rcoef.astype(urot.dtype).reshape([4]+shape)
+        ugeo  = urot*c[0]
+        ugeo += vrot*c[1]
+        vrot *= c[3]
+        vrot += urot*c[2]
+        urot[...] = ugeo
+        ugeo, vgeo = urot, vrot
+        
+    #___________________________________________________________________________
+    # numpy arrays
+    else: 
+        ugeo, vgeo = _do_apply_r2g(rcoef, np.asarray(urot), np.asarray(vrot), axis, 'uv')
     
+    #___________________________________________________________________________
+    return(ugeo, vgeo)
+
+
+
+# ___APPLY VECTOR ROTATION COEFFICIENTS________________________________________
+#| 1d input is returned as float64, multi dimensional input keeps its dtype   |
+#|_____________________________________________________________________________|
+def _do_apply_r2g(rcoef, urot, vrot, axis, which):
+    shape = [1]*urot.ndim
+    shape[axis] = rcoef.shape[1]
+    c     = rcoef.reshape([4]+shape)
+    dtype = urot.dtype if urot.ndim>1 else np.result_type(urot.dtype, np.float64)
+    if which in ['u', 'uv']: ugeo = (c[0]*urot + c[1]*vrot).astype(dtype, copy=False)
+    if which in ['v', 'uv']: vgeo = (c[2]*urot + c[3]*vrot).astype(dtype, copy=False)
+    if   which=='u': return(ugeo)
+    elif which=='v': return(vgeo)
+    else           : return(ugeo, vgeo)
+
+
+
+# ___COEFFICIENTS FOR VECTOR ROTATION ROT-->GEO________________________________
+#| the rotation of vector (urot, vrot) at a point from the rotated into the    |
+#| geo frame is a 2x2 matrix, that only depends on the point coordinates:      |
+#| ugeo = rcoef[0]*urot + rcoef[1]*vrot                                        |
+#| vgeo = rcoef[2]*urot + rcoef[3]*vrot                                        |
+#| The unit vectors in zonal and meridional direction of the rotated frame are |
+#| transformed into the cartesian geo frame and projected on the zonal and     |
+#| meridional unit vectors of the geo frame.                                   |
+#| ___INPUT_________________________________________________________________   |
+#| abg      :   list, with euler angles [alpha, beta, gamma]                   |
+#| lon, lat :   array, longitude and latitude                                  |
+#| gridis   :   str, in which coordinate frame are given lon, lat, see vec_r2g |
+#| ___RETURNS_______________________________________________________________   |
+#| rcoef    :   array, [4 x npts] rotation coefficients                        |
+#|_____________________________________________________________________________|
+def vec_r2g_coeff(abg, lon, lat, gridis='geo'):
     #___________________________________________________________________________
     # create grid coorinates for geo and rotated frame
     if any(x in gridis for x in ['geo','g','geographical']): 
@@ -1529,70 +2887,28 @@ def vec_r2g(abg, lon, lat, urot, vrot, gridis='geo', do_info=False ):
     rmat = grid_rotmat(abg)
     rmat = np.linalg.pinv(rmat)
     rad  = np.pi/180 
-
+    
     #___________________________________________________________________________
     # degree --> radian  
-    lon , lat  = lon*rad , lat*rad
-    rlon, rlat = rlon*rad, rlat*rad
+    lon , lat  = np.asarray(lon)*rad , np.asarray(lat)*rad
+    rlon, rlat = np.asarray(rlon)*rad, np.asarray(rlat)*rad
     
     #___________________________________________________________________________
-    # rotation of one dimensional vector data
-    if vrot.ndim==1 or urot.ndim==1: 
-        #_______________________________________________________________________
-        # compute vector in rotated cartesian coordinates
-        vxr = -vrot*np.sin(rlat)*np.cos(rlon) - urot*np.sin(rlon)
-        vyr = -vrot*np.sin(rlat)*np.sin(rlon) + urot*np.cos(rlon)
-        vzr =  vrot*np.cos(rlat)
-        
-        #_______________________________________________________________________
-        # compute vector in geo cartesian coordinates
-        vxg = rmat[0,0]*vxr + rmat[0,1]*vyr + rmat[0,2]*vzr
-        vyg = rmat[1,0]*vxr + rmat[1,1]*vyr + rmat[1,2]*vzr
-        vzg = rmat[2,0]*vxr + rmat[2,1]*vyr + rmat[2,2]*vzr
-        
-        #_______________________________________________________________________
-        # compute vector in geo coordinates 
-        vgeo= np.array(vxg*-np.sin(lat)*np.cos(lon) - 
-                       vyg* np.sin(lat)*np.sin(lon) + 
-                       vzg* np.cos(lat))
-        ugeo= np.array(vxg*-np.sin(lon) + vyg*np.cos(lon))
-        
-    #___________________________________________________________________________
-    # rotation of two dimensional vector data    
-    elif vrot.ndim==2 or urot.ndim==2: 
-        nd1,nd2=urot.shape
-        ugeo, vgeo = urot.copy(), vrot.copy()
-        if do_info: print('nlev:{:d}'.format(nd2))
-        for nd2i in range(0,nd2):
-            #___________________________________________________________________
-            if do_info: 
-                print('{:02d}|'.format(nd2i), end='')
-                if np.mod(nd2i+1,10)==0: print('')
-            #___________________________________________________________________
-            aux_urot, aux_vrot = urot[:,nd2i], vrot[:,nd2i]
-            #___________________________________________________________________
-            # compute vector in rotated cartesian coordinates
-            vxr = -aux_vrot*np.sin(rlat)*np.cos(rlon) - aux_urot*np.sin(rlon)
-            vyr = -aux_vrot*np.sin(rlat)*np.sin(rlon) + aux_urot*np.cos(rlon)
-            vzr =  aux_vrot*np.cos(rlat)
-            
-            #___________________________________________________________________
-            # compute vector in geo cartesian coordinates
-            vxg = rmat[0,0]*vxr + rmat[0,1]*vyr + rmat[0,2]*vzr
-            vyg = rmat[1,0]*vxr + rmat[1,1]*vyr + rmat[1,2]*vzr
-            vzg = rmat[2,0]*vxr + rmat[2,1]*vyr + rmat[2,2]*vzr
-            
-            #___________________________________________________________________
-            # compute vector in geo coordinates 
-            vgeo[:,nd2i]= np.array(vxg*-np.sin(lat)*np.cos(lon) - 
-                                   vyg* np.sin(lat)*np.sin(lon) + 
-                                   vzg* np.cos(lat))
-            ugeo[:,nd2i]= np.array(vxg*-np.sin(lon) + vyg*np.cos(lon))
-        
-    #___________________________________________________________________________    
-    else: raise ValueError('This number of dimensions is in moment not supported for vector rotation')    
+    # zonal (eu) and meridional (ev) unit vectors of rotated frame in rotated 
+    # cartesian coordinates --> geo cartesian coordinates
+    eur  = np.array([-np.sin(rlon), np.cos(rlon), np.zeros(rlon.shape)])
+    evr  = np.array([-np.sin(rlat)*np.cos(rlon), -np.sin(rlat)*np.sin(rlon), np.cos(rlat)])
+    eur  = np.einsum('ij,j...->i...', rmat, eur)
+    evr  = np.einsum('ij,j...->i...', rmat, evr)
+    
+    # zonal and meridional unit vectors of geo frame 
+    eug  = np.array([-np.sin(lon), np.cos(lon), np.zeros(lon.shape)])
+    evg  = np.array([-np.sin(lat)*np.cos(lon), -np.sin(lat)*np.sin(lon), np.cos(lat)])
+    
     #___________________________________________________________________________
-    return(ugeo, vgeo)
+    rcoef= np.array([(eug*eur).sum(axis=0), (eug*evr).sum(axis=0), 
+                     (evg*eur).sum(axis=0), (evg*evr).sum(axis=0)])
+    return(rcoef)
 
 
 
@@ -1653,51 +2969,115 @@ def grid_cutbox_n(n_x, n_y, box):# , do_outTF=False):
 
 
 # ___INTERPOLATE FROM ELEMENTS TO VERTICES_____________________________________
-#|                                                                             |
+#| area weighted interpolation of elemental data to vertices by using the      |
+#| sparse operator mesh.e2n_mat, that is computed once per mesh. Works for     |
+#| numpy and dask arrays, dask arrays stay lazy and are interpolated block by  |
+#| block                                                                       |
+#| ___INPUT_________________________________________________________________   |
+#| mesh     :   fesom2 mesh object                                             |
+#| data_e   :   array, elemental data [n2de], [n2de x nlev] or                 |
+#|              [ntime x n2de x nlev]                                          |
+#| e_dim    :   int, index of elem dimension, default: None, than 0 for 1d/2d  |
+#|              and 1 for 3d data                                              |
+#| z_dim    :   int, index of vertical dimension, default: None, than last     |
+#|              dimension for data with more than one dimension. With e_dim    |
+#|              given and z_dim=None the data have no vertical dimension       |
+#| ___RETURNS_______________________________________________________________   |
+#| data_n   :   array, vertice data [n2dn], [n2dn x nlev] or                   |
+#|              [ntime x n2dn x nlev]                                          |
 #|_____________________________________________________________________________|
-def grid_interp_e2n(mesh,data_e):
+def grid_interp_e2n(mesh, data_e, e_dim=None, z_dim=None):
     
     #___________________________________________________________________________
     mesh = mesh.compute_e_area()
     mesh = mesh.compute_n_area()
-    if data_e.ndim==1:
-        # print('~~ >-)))°> .°oO A')
-        aux  = np.vstack((mesh.e_area,mesh.e_area,mesh.e_area)).transpose().flatten()
-        aux  = aux * np.vstack((data_e,data_e,data_e)).transpose().flatten()
-        
-        #___________________________________________________________________________
-        # single loop over self.e_i.flat is ~4 times faster than douple loop 
-        # over for i in range(3): ,for j in range(self.n2de):
-        data_n = np.zeros((mesh.n2dn,))
-        count = 0
-        for idx in mesh.e_i.flat:
-            data_n[idx]=data_n[idx] + aux[count]
-            count=count+1 # count triangle index for aux_area[count] --> aux_area =[n2de*3,]
-        del aux, count
-        #with np.errstate(divide='ignore',invalid='ignore'):
-        data_n=data_n/mesh.n_area[0,:]/3.0
-        
-    elif data_e.ndim==2:
-        # print('~~ >-)))°> .°oO B')
-        nd     = data_e.shape[1]
-        data_n = np.zeros((mesh.n2dn, nd))
-        aux1   = np.vstack((mesh.e_area,mesh.e_area,mesh.e_area)).transpose().flatten()
-        for ndi in range(0,nd):
-            aux  = aux1 * np.vstack((data_e[:,ndi],data_e[:,ndi],data_e[:,ndi])).transpose().flatten()
-            #___________________________________________________________________________
-            # single loop over self.e_i.flat is ~4 times faster than douple loop 
-            # over for i in range(3): ,for j in range(self.n2de):
-            count = 0
-            for idx in mesh.e_i.flat:
-                data_n[idx, ndi]=data_n[idx, ndi] + aux[count]
-                count=count+1 # count triangle index for aux_area[count] --> aux_area =[n2de*3,]
-            del aux, count
-            #with np.errstate(divide='ignore',invalid='ignore'):
-            data_n[:, ndi]=data_n[:, ndi]/mesh.n_area[ndi, :]/3.0
+    mesh = mesh.compute_e2n_mat()
+    
+    #___________________________________________________________________________
+    # dimension index of elem and vertical dimension 
+    if e_dim is None:
+        if   data_e.ndim in [1, 2]: e_dim = 0
+        elif data_e.ndim == 3     : e_dim = 1
+        else: raise ValueError('This number of dimensions is in moment not supported for elem to vertice interpolation')
+        if data_e.ndim > 1: z_dim = data_e.ndim-1
+    
+    #___________________________________________________________________________
+    # dask array: elem dimension must be within a single chunk, the other 
+    # dimensions are processed chunk by chunk, the chunks of the dimensions 
+    # that are neither elem nor vertical (e.g. time) are adapted so that the 
+    # blocks keep the default dask chunk size 
+    if hasattr(data_e, 'dask'):
+        rechunk  = dict({e_dim: -1})
+        for idim in range(data_e.ndim):
+            if idim not in [e_dim, z_dim]: rechunk[idim] = 'auto'
+        data_e   = data_e.rechunk(rechunk)
+        chunks   = list(data_e.chunks)
+        chunks[e_dim] = (mesh.n2dn,)
+        
+        # level offset of each vertical chunk to select proper n_area level
+        if z_dim is not None:
+            lev_off = np.cumsum((0,)+data_e.chunks[z_dim][:-1])
+            def _apply_block(block, block_info=None):
+                ilev = block_info[0]['chunk-location'][z_dim]
+                return(_do_apply_e2n(mesh, block, e_dim, z_dim, lev_off[ilev]))
+        else:
+            def _apply_block(block):
+                return(_do_apply_e2n(mesh, block, e_dim, None, 0))
+        
+        data_n = data_e.map_blocks(_apply_block, chunks=tuple(chunks), 
+                                   dtype=np.result_type(data_e.dtype, np.float64))
+    else:    
+        data_n = _do_apply_e2n(mesh, np.asarray(data_e), e_dim, z_dim, 0)
         
     #___________________________________________________________________________
     return(data_n)
 
+
+
+# ___APPLY ELEM TO VERTICE INTERPOLATION OPERATOR______________________________
+#| apply sparse operator mesh.e2n_mat to numpy array along dimension e_dim     |
+#| and normalize with the clusterarea of the respective level                  |
+#| ___INPUT_________________________________________________________________   |
+#| mesh     :   fesom2 mesh object, with e2n_mat and n_area (or e2n_area)      |
+#| data_e   :   np.array, elemental data                                       |
+#| e_dim    :   int, index of elem dimension                                   |
+#| z_dim    :   int, index of vertical dimension, None when there is none,     |
+#|              than the surface clusterarea is used                           |
+#| lev_off  :   int, level index of first level in data_e                      |
+#| ___RETURNS_______________________________________________________________   |
+#| data_n   :   np.array, vertice data                                         |
+#|_____________________________________________________________________________|
+def _do_apply_e2n(mesh, data_e, e_dim, z_dim, lev_off):
+    #___________________________________________________________________________
+    # move elem dimension to front and flatten all other dimensions --> single
+    # sparse matrix product
+    aux    = np.moveaxis(data_e, e_dim, 0)
+    shape  = aux.shape
+    data_n = mesh.e2n_mat.dot(aux.reshape(shape[0], -1)).reshape((mesh.n2dn,)+shape[1:])
+    del aux
+    data_n = np.moveaxis(data_n, 0, e_dim)
+    
+    #___________________________________________________________________________
+    # normalize with clusterarea of corresponding level, sub-meshes use the 
+    # clusterarea of their own elements
+    n_area = getattr(mesh, 'e2n_area', None)
+    if n_area is None: n_area = mesh.n_area
+    n_area = np.asarray(n_area)
+    shape  = [1]*data_n.ndim
+    shape[e_dim] = mesh.n2dn
+    with np.errstate(divide='ignore',invalid='ignore'):
+        if z_dim is None: 
+            data_n = data_n/n_area[0,:].reshape(shape)
+        else:
+            nlev   = data_n.shape[z_dim]
+            n_area = n_area[lev_off:lev_off+nlev, :]
+            if z_dim < e_dim: shape[z_dim] = nlev
+            else            : n_area, shape[z_dim] = n_area.T, nlev
+            data_n = data_n/n_area.reshape(shape)
+            
+    #___________________________________________________________________________
+    return(data_n)
+
     
 # ___EQUIVALENT OF MATLAB ISMEMBER FUNCTION____________________________________
 #|                                                                             |
@@ -1707,24 +3087,369 @@ def ismember_rows(a, b):
 
 
 # ___COMPUTE BOUNDARY EDGES____________________________________________________
-#| compute edges that have only one adjacenbt trinagle                         |
+#| compute edges that have only one adjacenbt trinagle. Every edge is encoded  |
+#| as single integer key n1*(nmax+1)+n2 (n1<n2), edges whos key occurs only    |
+#| once are boundary edges. Returned edges are sorted by rows.                 |
 #|_____________________________________________________________________________|
 def compute_boundary_edges(e_i):
     # set boundary depth to zero
     edge    = np.concatenate((e_i[:,[0,1]], e_i[:,[0,2]], e_i[:,[1,2]]),axis=0)
-    edge    = np.sort(edge,axis=1) 
+    edge    = np.sort(edge,axis=1).astype(np.int64)
+    
+    #___________________________________________________________________________
+    # unique edge keys and how often they occur
+    nkey    = edge.max()+1
+    key, cnt= np.unique(edge[:,0]*nkey + edge[:,1], return_counts=True)
+    del edge
+    
+    # all edges that belong to boundary own jsut one triangle 
+    key     = key[cnt==1]
+    bnde    = np.column_stack((key//nkey, key%nkey))
+    
+    return(bnde)
+
+
+
+# ___COMPUTE CLOSED POLYGONS FROM BOUNDARY EDGES_______________________________
+#| connect boundary edges to closed polygons. Uses a vertice-->edge lookup     |
+#| table so that every step of the contour walk is O(1), total cost is linear  |
+#| in the number of boundary edges.                                            |
+#| ___INPUT_________________________________________________________________   |
+#| bnde     :   array, [nbnde x 2] boundary edges, see compute_boundary_edges  |
+#| n2dn     :   int, number of vertices                                        |
+#| start    :   int, index of boundary edge where the first polygon starts,    |
+#|              default=0                                                      |
+#| do_first :   bool, return only the first polygon (the one that contains the |
+#|              start edge), default=False                                     |
+#| ___RETURNS_______________________________________________________________   |
+#| polygons :   list([array1[npts], array2[npts], ...]) vertice indices of     |
+#|              closed polygons, first index is repeated at the end            |
+#|_____________________________________________________________________________|
+def compute_boundary_polygons(bnde, n2dn, start=0, do_first=False):
+    #___________________________________________________________________________
+    if bnde.shape[0]==0: return([])
+    seq, off = _do_trace_bnde(np.asarray(bnde, dtype=np.int64), np.int64(n2dn), 
+                              np.int64(start), do_first)
+    
+    #___________________________________________________________________________
+    polygons = [seq[off[ii]:off[ii+1]] for ii in range(0, off.size-1)]
+    return(polygons)
+
+
+
+# ___TRACE BOUNDARY EDGES (NUMBA)______________________________________________
+#| walk along boundary edges, from the last vertice of the contour always the  |
+#| unused boundary edge with the smallest index is taken. Contour is closed    |
+#| when start vertice is reached again, than a new contour starts at the first |
+#| unused edge.                                                                |
+#|_____________________________________________________________________________|
+@njit
+def _do_trace_bnde(bnde, n2dn, start, do_first):
+    nbnde = bnde.shape[0]
+    
+    #___________________________________________________________________________
+    # vertice --> boundary edge lookup table in CSR format, edge indices per 
+    # vertice are sorted ascending
+    n_ptr = np.zeros(n2dn+1, dtype=np.int64)
+    for ei in range(nbnde):
+        n_ptr[bnde[ei,0]+1] += 1
+        n_ptr[bnde[ei,1]+1] += 1
+    n_ptr = np.cumsum(n_ptr)
+    n_fill= n_ptr[:-1].copy()
+    n_bnde= np.empty(2*nbnde, dtype=np.int64)
+    for ei in range(nbnde):
+        for jj in range(2):
+            ni = bnde[ei,jj]
+            n_bnde[n_fill[ni]] = ei
+            n_fill[ni] += 1
+    
+    #___________________________________________________________________________
+    is_used = np.zeros(nbnde, dtype=np.bool_)
+    seq     = np.empty(2*nbnde, dtype=np.int64)
+    off     = np.empty(nbnde+1, dtype=np.int64)
+    npoly, nseq, next_ei = 0, 0, 0
+    ei0     = start
+    while True:
+        #_______________________________________________________________________
+        # initialise new contour with first unused edge
+        if ei0<0:
+            while next_ei<nbnde and is_used[next_ei]: next_ei += 1
+            if next_ei==nbnde: break
+            ei0 = next_ei
+        is_used[ei0] = True
+        n_init, n_run = bnde[ei0,0], bnde[ei0,1]
+        off[npoly] = nseq
+        seq[nseq], seq[nseq+1] = n_init, n_run
+        nseq += 2
+        ei0 = -1
         
-    ## python  sortrows algorythm --> matlab equivalent
-    edge    = edge.tolist()
-    edge.sort()
-    edge    = np.array(edge)
+        #_______________________________________________________________________
+        # search next unused edge that contains last vertice of contour
+        while n_run!=n_init:
+            ei = -1
+            for kk in range(n_ptr[n_run], n_ptr[n_run+1]):
+                if not is_used[n_bnde[kk]]: 
+                    ei = n_bnde[kk]
+                    break
+            if ei<0: break
+            is_used[ei] = True
+            if bnde[ei,0]==n_run: n_run = bnde[ei,1]
+            else                : n_run = bnde[ei,0]
+            seq[nseq] = n_run
+            nseq += 1
+        npoly += 1
+        if do_first: break
         
-    idx     = np.diff(edge,axis=0)==0
-    idx     = np.all(idx,axis=1)
-    idx     = np.logical_or(np.concatenate((idx,np.array([False]))),\
-                            np.concatenate((np.array([False]),idx)))
+    #___________________________________________________________________________
+    off[npoly] = nseq
+    return(seq[:nseq], off[:npoly+1])
 
-    # all edges that belong to boundary own jsut one triangle 
-    bnde    = edge[idx==False,:]
+
+
+# ___COMPUTE DEPTH RESOLVED CLUSTERAREA OF VERTICES____________________________
+#| scatter-add the area of every element onto its three vertices for all the  |
+#| levels the element reaches. Instead of looping over e_i.flat and adding the |
+#| area slice wise, the element area is binned once by (bottom level, vertice) |
+#| with np.bincount and afterwards accumulated upwards with a reversed cumsum  |
+#| over the levels --> n_area[k,n] = sum(e_area[e]/3) for all e with e_iz[e]>k |
+#| ___INPUT_________________________________________________________________   |
+#| e_i      :   array, [n2de x 3] element array with vertice indices           |
+#| e_area   :   array, [n2de] area of elements                                 |
+#| e_iz     :   array, [n2de] number of full depth levels at elements (-1)     |
+#| nlev     :   int, number of vertical full levels                            |
+#| n2dn     :   int, number of vertices                                        |
+#| ___RETURNS_______________________________________________________________   |
+#| n_area   :   array, [nlev x n2dn] clusterarea of vertices                   |
+#|_____________________________________________________________________________|
+def compute_n_area_fast(e_i, e_area, e_iz, nlev, n2dn):
     
-    return(bnde)
+    #___________________________________________________________________________
+    # bin area of each element corner into (bottom level, vertice) --> every 
+    # element contributes to the levels 0...e_iz-1 of its vertices
+    e_iz   = np.clip(np.asarray(e_iz, dtype=np.int64), 0, nlev)
+    binidx = (np.repeat(e_iz, 3)*n2dn + np.asarray(e_i, dtype=np.int64).ravel())
+    n_area = np.bincount(binidx, weights=np.repeat(np.asarray(e_area, dtype=np.float64), 3), 
+                         minlength=(nlev+1)*n2dn).reshape(nlev+1, n2dn)
+    del binidx
+    
+    #___________________________________________________________________________
+    # accumulate from the bottom upwards, level k gets the area of all elements 
+    # whos bottom level index is larger than k. Since only positive areas are 
+    # summed, levels below the deepest element stay exactly zero
+    n_area = np.cumsum(n_area[:0:-1, :], axis=0)[::-1, :]
+    
+    #___________________________________________________________________________
+    return(n_area/3.0)
+
+
+
+# ___READ ASCII FESOM2 MESH FILE_______________________________________________
+#| read whitespace separated ascii mesh file (nod2d.out, elem2d.out, aux3d.out,|
+#| nlvls.out, ...) into typed numpy array. The file is read as one byte buffer |
+#| which is split at line ends into chunks that are parsed in parallel by      |
+#| numba. With do_binmesh=True the parsed array is additionally stored as      |
+#| binary sidecar file <fname>.tpv.npy next to the ascii file (or when there   |
+#| is no write permission in the cache path MESHPATH_TRIPYVIEW/meshid as       |
+#| <fname>_<hash of absolute path>.tpv.npy). Size and modification time of    |
+#| the ascii file together with the read options and the array shape are      |
+#| stored in <sidecar>.json, further reads of the same file only load the      |
+#| sidecar when all of them match.                                             |
+#| ___INPUT_________________________________________________________________   |
+#| fname     :   str, path of ascii mesh file                                  |
+#| ncol      :   int, number of columns per line                               |
+#| dtype     :   numpy dtype of returned array                                 |
+#| skiprows  :   int, number of header lines to skip, default=0                |
+#| nrows     :   int, number of lines to read after the header, default=None   |
+#|               read all lines                                                |
+#| do_binmesh:   bool, load/write binary sidecar file, default=False           |
+#| cachepath :   str, alternative path for sidecar file, default=None uses     |
+#|               MESHPATH_TRIPYVIEW/meshid                                     |
+#| chunksize :   int, size of byte chunks that are parsed in parallel          |
+#| ___RETURNS_______________________________________________________________   |
+#| data      :   array, [nrows x ncol] (or [nrows] if ncol==1)                 |
+#|_____________________________________________________________________________|
+def read_meshfile(fname, ncol, dtype, skiprows=0, nrows=None, do_binmesh=False, 
+                  cachepath=None, chunksize=2**22):
+    #___________________________________________________________________________
+    # check for valid binary sidecar file
+    # fallback sidecar in cache path is keyed on the absolute path of the ascii
+    # file --> meshes with same folder name in different places dont collide
+    fpath = os.path.abspath(fname)
+    if cachepath is None: 
+        cachepath = os.environ.get('MESHPATH_TRIPYVIEW', os.path.join(os.path.expanduser("~"), "meshcache_tripyview"))
+        cachepath = os.path.join(cachepath, os.path.basename(os.path.dirname(fpath)))
+    fhash    = hashlib.blake2b(fpath.encode(), digest_size=8).hexdigest()
+    sidecars = [fname+'.tpv.npy', os.path.join(cachepath, '{}_{}.tpv.npy'.format(os.path.basename(fname), fhash))]
+    fstat    = os.stat(fname)
+    meta     = dict({'fpath':fpath, 'size':fstat.st_size, 'mtime':fstat.st_mtime_ns, 
+                     'ncol':ncol, 'dtype':np.dtype(dtype).str, 'skiprows':skiprows, 
+                     'nrows':nrows})
+    if do_binmesh:
+        for sidecar in sidecars:
+            if not (os.path.isfile(sidecar) and os.path.isfile(sidecar+'.json')): continue
+            try:
+                with open(sidecar+'.json', 'r') as fid: meta_s = json.load(fid)
+                shape = tuple(meta_s.pop('shape'))
+                if meta_s!=meta: continue
+                data  = np.load(sidecar)
+            except (ValueError, KeyError, OSError):
+                continue
+            if data.shape==shape: return(data)
+    
+    #___________________________________________________________________________
+    # read file into byte buffer, skip header lines
+    with open(fname, 'rb') as fid:
+        for ii in range(skiprows): fid.readline()
+        buf = np.frombuffer(fid.read(), dtype=np.uint8)
+    
+    #___________________________________________________________________________
+    # chunk boundaries at line ends --> no number is split between two chunks
+    bnd = np.arange(0, buf.size, chunksize, dtype=np.int64)[1:]
+    nl  = np.flatnonzero(buf==10)
+    bnd = nl[np.minimum(np.searchsorted(nl, bnd), nl.size-1)]+1 if nl.size>0 else np.zeros(0, dtype=np.int64)
+    bnd = np.unique(np.hstack(([0], bnd, [buf.size]))).astype(np.int64)
+    
+    #___________________________________________________________________________
+    # count numbers in each chunk --> offsets --> parse in parallel
+    cnt = _do_count_ascii(buf, bnd)
+    off = np.hstack(([0], np.cumsum(cnt))).astype(np.int64)
+    data= _do_parse_ascii(buf, bnd, off)
+    
+    #___________________________________________________________________________
+    if nrows is not None: data = data[:nrows*ncol]
+    if data.size % ncol != 0: 
+        raise ValueError(' --> number of values in {} is not a multiple of {}'.format(fname, ncol))
+    data = data.reshape(-1, ncol).astype(dtype)
+    if ncol==1: data = data.squeeze(axis=1)
+    
+    #___________________________________________________________________________
+    # write binary sidecar file, try first next to ascii file than cache path 
+    if do_binmesh:
+        for sidecar in sidecars:
+            try:
+                if not os.path.isdir(os.path.dirname(sidecar)): os.makedirs(os.path.dirname(sidecar))
+                np.save(sidecar, data)
+                with open(sidecar+'.json', 'w') as fid: 
+                    json.dump(dict(meta, shape=list(data.shape)), fid)
+                break
+            except (PermissionError, OSError):
+                continue
+        
+    #___________________________________________________________________________
+    return(data)
+
+
+
+# ___COUNT NUMBERS IN CHUNKS OF ASCII BUFFER (NUMBA)___________________________
+#|                                                                             |
+#|_____________________________________________________________________________|
+@njit(parallel=True, cache=True)
+def _do_count_ascii(buf, bnd):
+    nchunk = bnd.size-1
+    cnt    = np.zeros(nchunk, dtype=np.int64)
+    for ci in prange(nchunk):
+        is_num = False
+        for ii in range(bnd[ci], bnd[ci+1]):
+            is_ws = buf[ii]==32 or (buf[ii]>=9 and buf[ii]<=13)
+            if not is_ws and not is_num: cnt[ci] += 1
+            is_num = not is_ws
+    return(cnt)
+
+
+
+# ___PARSE NUMBERS IN CHUNKS OF ASCII BUFFER (NUMBA)___________________________
+#| digits are accumulated as integer mantissa with decimal exponent, as long  |
+#| as the mantissa < 2**53 and |exponent|<=22 the conversion to float is       |
+#| correctly rounded (same as strtod), otherwise a fallback with power of ten  |
+#| is used.                                                                    |
+#|_____________________________________________________________________________|
+@njit(parallel=True, cache=True)
+def _do_parse_ascii(buf, bnd, off):
+    nchunk = bnd.size-1
+    data   = np.empty(off[-1], dtype=np.float64)
+    pow10  = np.empty(23, dtype=np.float64)
+    pow10[0] = 1.0
+    for ii in range(1, 23): pow10[ii] = pow10[ii-1]*10.0
+    for ci in prange(nchunk):
+        ii, iend, kk = bnd[ci], bnd[ci+1], off[ci]
+        while ii<iend:
+            #___________________________________________________________________
+            # skip whitespace
+            c = buf[ii]
+            if c==32 or (c>=9 and c<=13): 
+                ii += 1
+                continue
+            #___________________________________________________________________
+            # sign, mantissa and decimals
+            sgn = 1.0
+            if   c==45: sgn, ii = -1.0, ii+1
+            elif c==43: ii += 1
+            mant, nexp, ndig = np.int64(0), 0, 0
+            while ii<iend and buf[ii]>=48 and buf[ii]<=57:
+                if ndig<18: 
+                    mant, ndig = mant*10 + (buf[ii]-48), ndig + (1 if mant>0 or buf[ii]>48 else 0)
+                else: nexp += 1
+                ii += 1
+            if ii<iend and buf[ii]==46: 
+                ii += 1
+                while ii<iend and buf[ii]>=48 and buf[ii]<=57:
+                    if ndig<18: 
+                        mant, ndig = mant*10 + (buf[ii]-48), ndig + (1 if mant>0 or buf[ii]>48 else 0)
+                        nexp -= 1
+                    ii += 1
+            #___________________________________________________________________
+            # exponent
+            if ii<iend and (buf[ii]==101 or buf[ii]==69 or buf[ii]==100 or buf[ii]==68): 
+                ii += 1
+                esgn, ev = 1, 0
+                if   ii<iend and buf[ii]==45: esgn, ii = -1, ii+1
+                elif ii<iend and buf[ii]==43: ii += 1
+                while ii<iend and buf[ii]>=48 and buf[ii]<=57:
+                    ev = ev*10 + (buf[ii]-48)
+                    ii += 1
+                nexp += esgn*ev
+            #___________________________________________________________________
+            # skip rest of token if it contains something unexpected
+            while ii<iend and not (buf[ii]==32 or (buf[ii]>=9 and buf[ii]<=13)): ii += 1
+            #___________________________________________________________________
+            if   nexp==0                          : val = float(mant)
+            elif nexp>0  and nexp<=22 and mant<2**53: val = float(mant)*pow10[nexp]
+            elif nexp<0  and nexp>=-22 and mant<2**53: val = float(mant)/pow10[-nexp]
+            else                                  : val = float(mant)*10.0**nexp
+            data[kk] = sgn*val
+            kk += 1
+    return(data)
+
+
+
+# ___QUERY CONTAINING ELEMENT FROM BUCKET GRID (NUMBA)_________________________
+#| check all elements in the bucket of every point, vertice longitudes are     |
+#| unwrapped with respect to the point, so that also elements at the periodic  |
+#| boundary are found.                                                         |
+#|_____________________________________________________________________________|
+@njit
+def _do_query_elem(px, py, n_x, n_y, e_i, eptr, elem, x0, dbx, dby, nbx, nby):
+    npts  = px.size
+    e_idx = -np.ones(npts, dtype=np.int64)
+    w     = np.full((npts,3), np.nan)
+    eps   = 1.0e-9
+    for pi in range(npts):
+        ix = int(np.floor((px[pi]-x0)/dbx)) % nbx
+        iy = min(max(int(np.floor((py[pi]+90.0)/dby)), 0), nby-1)
+        bi = iy*nbx + ix
+        for kk in range(eptr[bi], eptr[bi+1]):
+            ei = elem[kk]
+            x1 = px[pi] + (n_x[e_i[ei,0]]-px[pi]+180.0) % 360.0 - 180.0
+            x2 = px[pi] + (n_x[e_i[ei,1]]-px[pi]+180.0) % 360.0 - 180.0
+            x3 = px[pi] + (n_x[e_i[ei,2]]-px[pi]+180.0) % 360.0 - 180.0
+            y1, y2, y3 = n_y[e_i[ei,0]], n_y[e_i[ei,1]], n_y[e_i[ei,2]]
+            det = (y2-y3)*(x1-x3) + (x3-x2)*(y1-y3)
+            if det==0.0: continue
+            w1  = ((y2-y3)*(px[pi]-x3) + (x3-x2)*(py[pi]-y3))/det
+            w2  = ((y3-y1)*(px[pi]-x3) + (x1-x3)*(py[pi]-y3))/det
+            w3  = 1.0-w1-w2
+            if w1>=-eps and w2>=-eps and w3>=-eps:
+                e_idx[pi] = ei
+                w[pi,0], w[pi,1], w[pi,2] = w1, w2, w3
+                break
+    return(e_idx, w)
@@ -919,6 +919,7 @@ def plot_hvec(mesh, data, cinfo=None, box=None, proj='pc', figsize=[9,4.5],
             dname = data[ii][vname[0]].attrs['datapath']
             diagpath = os.path.join(dname,fname)
             n_iz   = xr.open_mfdataset(diagpath, parallel=True)['nlevels_nod2D']-1
+            if getattr(mesh, 'n_idx_g', None) is not None: n_iz = n_iz.isel(nod2=mesh.n_idx_g)
             data_plot = np.abs(mesh.zlev[n_iz])
             data_plot = np.hstack((data_plot,data_plot[mesh.n_pbnd_a]))
             
@@ -18,8 +18,15 @@ from   .sub_colormap            import *
 #+___PRE-ANALYSE ARBITRARY CROSS-SECTION LINE__________________________________+
 #|                                                                             |
 #+_____________________________________________________________________________+
-def do_analyse_transects(input_transect, mesh, edge, edge_tri, edge_dxdy_l, edge_dxdy_r, 
-                          which_res='res', res=1.0, npts=500):
+def do_analyse_transects(input_transect, mesh, edge=None, edge_tri=None, edge_dxdy_l=None, edge_dxdy_r=None, 
+                          which_res='res', res=1.0, npts=500, diagpath=None):
+    
+    #___________________________________________________________________________
+    # without edge arrays take them from the mesh, they are loaded from the 
+    # mesh diag file (searched also in diagpath) or computed when it does not 
+    # exist
+    if edge is None:
+        edge, edge_tri, edge_dxdy_l, edge_dxdy_r = mesh.get_edge_dxdy(diagpath=diagpath)
     
     transect_list = []
     # loop over transects in list
@@ -83,10 +90,9 @@ def do_analyse_transects(input_transect, mesh, edge, edge_tri, edge_dxdy_l, edge
         
         #_______________________________________________________________________    
         # rotate path_dx and path_dy from rot --> geo coordinates
-        transect['path_dx'], transect['path_dy'] = vec_r2g(mesh.abg, 
-                                                    mesh.n_x[transect['path_ni']].sum(axis=1)/3.0, 
-                                                    mesh.n_y[transect['path_ni']].sum(axis=1)/3.0,
-                                                    transect['path_dx'], transect['path_dy'])
+        transect['path_dx'], transect['path_dy'] = vec_r2g(mesh.abg, None, None, 
+                                                    transect['path_dx'], transect['path_dy'], 
+                                                    rcoef=mesh.e_rcoef[:, transect['path_ei']])
             
         #_______________________________________________________________________ 
         # buld distance from start point array [km]
@@ -245,65 +251,57 @@ def _do_calc_csect_vec(transect):
 #                 intersected. If |X[0,0]| > |vec_a| than edge is not intersected
 def _do_find_intersected_edges(mesh, transect, edge, idx_ed):
     #___________________________________________________________________________
-    transect['edge_cut_i'   ].append(list())
-    transect['edge_cut_evec'].append(list())
-    transect['edge_cut_P'   ].append(list())
-    transect['edge_cut_midP'].append(list())
-    transect['edge_cut_lint'].append(list())
-    transect['edge_cut_ni'  ].append(list())
-    
-    #___________________________________________________________________________
-    A, P    = np.zeros((2,2)), np.zeros((2,))
-    A[0, 1] = -transect['e_vec'][-1][0]
-    A[1, 1] = -transect['e_vec'][-1][1]
-    
-    #___________________________________________________________________________
-    # loop over indices of edges-->use already lon,lat limited edge indices 
-    for edi in idx_ed: 
-        A[0, 0] = mesh.n_x[edge[1, edi]]-mesh.n_x[edge[0, edi]]
-        A[1, 0] = mesh.n_y[edge[1, edi]]-mesh.n_y[edge[0, edi]]
-        normA0  = np.sqrt(A[0, 0]**2 + A[1, 0]**2)
-        A[:, 0] = A[:, 0]/normA0
-        P[0]    = transect['Px'][-1][0]-mesh.n_x[edge[0, edi]]
-        P[1]    = transect['Py'][-1][0]-mesh.n_y[edge[0, edi]]
-        
-        # solve linear equation system: A * X = P --> solve for X[0]
-        div     = (A[0,0]*A[1,1]-A[0,1]*A[1,0])
-        X0      = (P[0]*A[1,1]-P[1]*A[0,1])/ div
-        X1      = (P[0]*A[1,0]-P[1]*A[0,0])/-div
-        
-        # determine if edge is intersected by crossection line
-        if ((X0>=0) & (X0<=normA0               +np.finfo(np.float32).eps) &
-            (X1>=0) & (X1<=transect['e_norm'][-1]+np.finfo(np.float32).eps) ):
-            # indice of cutted edge
-            transect['edge_cut_i'   ][-1].append(edi)
-            
-            # evec of cutted edge 
-            transect['edge_cut_evec'][-1].append([A[0, 0], A[1, 0]])
-            
-            # cutting point on edge
-            transect['edge_cut_P'   ][-1].append([mesh.n_x[edge[0,edi]]+A[0,0]*X0, 
-                                                  mesh.n_y[edge[0,edi]]+A[1,0]*X0])
-            
-            # mid point on edge
-            transect['edge_cut_midP'][-1].append([mesh.n_x[edge[0,edi]]+A[0,0]*normA0/2.0, 
-                                                  mesh.n_y[edge[0,edi]]+A[1,0]*normA0/2.0])
-            
-            # interpolator for cutting points on edge Vcut= V1+(V2-V1)*(rc-r1)/(r2-r1)=V1+(V2-V1)*lint
-            transect['edge_cut_lint'][-1].append(X0/normA0)
-            
-            # node indices of intersectted edges 
-            transect['edge_cut_ni'  ][-1].append(edge[:,edi])
+    # solve for all edges at once the linear equation system: A * X = P, with
+    # A = [edge unit vector, -cross-section vector] --> solve for X[0], X[1]
+    idx_ed  = np.asarray(idx_ed, dtype='int64')
+    e_x     = np.asarray(mesh.n_x, dtype='float64')[edge[:, idx_ed]]
+    e_y     = np.asarray(mesh.n_y, dtype='float64')[edge[:, idx_ed]]
+    A00     = e_x[1,:]-e_x[0,:]
+    A10     = e_y[1,:]-e_y[0,:]
+    normA0  = np.sqrt(A00**2 + A10**2)
+    A00, A10= A00/normA0, A10/normA0
+    A01     = -transect['e_vec'][-1][0]
+    A11     = -transect['e_vec'][-1][1]
+    P0      = transect['Px'][-1][0]-e_x[0,:]
+    P1      = transect['Py'][-1][0]-e_y[0,:]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        div = (A00*A11-A01*A10)
+        X0  = (P0*A11-P1*A01)/ div
+        X1  = (P0*A10-P1*A00)/-div
     
     #___________________________________________________________________________
-    # transform from list --> np.array
-    transect['edge_cut_i'   ][-1] = np.asarray(transect['edge_cut_i'   ][-1])
-    transect['edge_cut_evec'][-1] = np.asarray(transect['edge_cut_evec'][-1])
-    transect['edge_cut_P'   ][-1] = np.asarray(transect['edge_cut_P'   ][-1])
-    transect['edge_cut_midP'][-1] = np.asarray(transect['edge_cut_midP'][-1])
-    transect['edge_cut_lint'][-1] = np.asarray(transect['edge_cut_lint'][-1])
-    transect['edge_cut_ni'  ][-1] = np.asarray(transect['edge_cut_ni'  ][-1])
-    del(A, P, X0, X1, normA0)
+    # determine which edges are intersected by crossection line
+    eps     = np.finfo(np.float32).eps
+    is_cut  = ((X0>=0) & (X0<=normA0               +eps) & 
+               (X1>=0) & (X1<=transect['e_norm'][-1]+eps) )
+    
+    #___________________________________________________________________________
+    if not np.any(is_cut):
+        for key in ['edge_cut_i', 'edge_cut_evec', 'edge_cut_P', 'edge_cut_midP', 'edge_cut_lint', 'edge_cut_ni']:
+            transect[key].append(np.asarray([]))
+        return(transect)
+    
+    e_x, e_y, X0, normA0 = e_x[0,is_cut], e_y[0,is_cut], X0[is_cut], normA0[is_cut]
+    A00, A10 = A00[is_cut], A10[is_cut]
+    
+    # indice of cutted edge
+    transect['edge_cut_i'   ].append(idx_ed[is_cut])
+    
+    # evec of cutted edge 
+    transect['edge_cut_evec'].append(np.column_stack((A00, A10)))
+    
+    # cutting point on edge
+    transect['edge_cut_P'   ].append(np.column_stack((e_x+A00*X0, e_y+A10*X0)))
+    
+    # mid point on edge
+    transect['edge_cut_midP'].append(np.column_stack((e_x+A00*normA0/2.0, e_y+A10*normA0/2.0)))
+    
+    # interpolator for cutting points on edge Vcut= V1+(V2-V1)*(rc-r1)/(r2-r1)=V1+(V2-V1)*lint
+    transect['edge_cut_lint'].append(X0/normA0)
+    
+    # node indices of intersectted edges 
+    transect['edge_cut_ni'  ].append(np.asarray(edge[:, idx_ed[is_cut]]).T)
     
     #___________________________________________________________________________
     return(transect)    
@@ -663,26 +661,24 @@ def calc_transect_transp(mesh, data, transects, do_transectattr=False, do_info=T
         
         #_______________________________________________________________________
         # rotate vectors 
+        nlev = mesh.get_bottom_nlev('elem', 'nz1')[transect['path_ei']]
         if 'time' in list(data.dims):
-            for ii, ei in enumerate(transect['path_ei']):
-                vel_u[:,ii,mesh.e_iz[ei]:], vel_v[:,ii,mesh.e_iz[ei]:] = np.nan, np.nan
+            vel_u = do_bottomnan_array(vel_u, nlev, 1, 2)
+            vel_v = do_bottomnan_array(vel_v, nlev, 1, 2)
                 
-            for nti in range(data.dims['time']):
-                vel_u[nti,:,:], vel_v[nti,:,:] = vec_r2g(mesh.abg, 
-                                       mesh.n_x[transect['path_ni']].sum(axis=1)/3.0, 
-                                       mesh.n_y[transect['path_ni']].sum(axis=1)/3.0,
-                                       vel_u[nti,:,:], vel_v[nti,:,:])            
+            vel_u, vel_v = vec_r2g(mesh.abg, None, None, 
+                                   vel_u, vel_v, rcoef=mesh.e_rcoef[:, transect['path_ei']], 
+                                   axis=1, do_inplace=True)            
         else: 
             print(vel_u.shape)
             print(vel_v.shape)
             print(transect['path_ei'].shape)
-            for ii, ei in enumerate(transect['path_ei']):
-                vel_u[ii, mesh.e_iz[ei]:], vel_v[ii,mesh.e_iz[ei]:] = np.nan, np.nan
+            vel_u = do_bottomnan_array(vel_u, nlev, 0, 1)
+            vel_v = do_bottomnan_array(vel_v, nlev, 0, 1)
                  
-            vel_u, vel_v = vec_r2g(mesh.abg, 
-                                   mesh.n_x[transect['path_ni']].sum(axis=1)/3.0, 
-                                   mesh.n_y[transect['path_ni']].sum(axis=1)/3.0,
-                                   vel_u, vel_v)
+            vel_u, vel_v = vec_r2g(mesh.abg, None, None, 
+                                   vel_u, vel_v, rcoef=mesh.e_rcoef[:, transect['path_ei']], 
+                                   axis=0)
         
         #_______________________________________________________________________
         # multiply with dz
@@ -782,6 +778,7 @@ def calc_transect_scalar(mesh, data, transects, nodeinelem=None,
     
     #___________________________________________________________________________
     vname = list(data.keys())[0]
+    dim_vert = ([x for x in ['nz1', 'nz_1', 'nz'] if x in data.dims] or [None])[0]
     for transect in transects:
         #_______________________________________________________________________
         if 'nod2' in list(data.dims):
@@ -790,12 +787,10 @@ def calc_transect_scalar(mesh, data, transects, nodeinelem=None,
             scalarP2 = data[vname].isel(nod2=transect['edge_cut_ni'][:,1]).load().values
             
             # put back the nans 
-            if 'nz1' in data.dims or 'nz_1' in data.dims:
-                for ii, ni in enumerate(transect['edge_cut_ni'][:,0]): scalarP1[ii,mesh.n_iz[ni]:] = np.nan
-                for ii, ni in enumerate(transect['edge_cut_ni'][:,1]): scalarP2[ii,mesh.n_iz[ni]:] = np.nan
-            elif 'nz' in data.dims:
-                for ii, ni in enumerate(transect['edge_cut_ni'][:,0]): scalarP1[ii,mesh.n_iz[ni]+1:] = np.nan
-                for ii, ni in enumerate(transect['edge_cut_ni'][:,1]): scalarP2[ii,mesh.n_iz[ni]+1:] = np.nan
+            if dim_vert is not None:
+                nlev     = mesh.get_bottom_nlev('nod2', dim_vert)
+                scalarP1 = do_bottomnan_array(scalarP1, nlev[transect['edge_cut_ni'][:,0]], 0, 1)
+                scalarP2 = do_bottomnan_array(scalarP2, nlev[transect['edge_cut_ni'][:,1]], 0, 1)
                 
             # interpolate scalar vertice values onto cutting point position where
             # cross-section intersects with edge
@@ -816,10 +811,9 @@ def calc_transect_scalar(mesh, data, transects, nodeinelem=None,
                 scalarPcut = data[vname].isel(elem=transect['path_ei'][::2]).load().values
                 
                 # put back the nans 
-                if 'nz1' in data.dims or 'nz_1' in data.dims:
-                    for ii, ei in enumerate(transect['path_ei'][::2]): scalarPcut[ii,mesh.e_iz[ei]:  ] = np.nan
-                elif 'nz' in data.dims:
-                    for ii, ei in enumerate(transect['path_ei'][::2]): scalarPcut[ii,mesh.e_iz[ei]+1:] = np.nan
+                if dim_vert is not None:
+                    nlev       = mesh.get_bottom_nlev('elem', dim_vert)
+                    scalarPcut = do_bottomnan_array(scalarPcut, nlev[transect['path_ei'][::2]], 0, 1)
                 
                 scalarPcut = scalarPcut.T
                 
@@ -830,7 +824,7 @@ def calc_transect_scalar(mesh, data, transects, nodeinelem=None,
                 
             else:
                 # average elemental values to edge node 1
-                elem_i_P = nodeinelem[:,transects[0]['edge_cut_ni'][:,0]]
+                elem_i_P = nodeinelem[:,transect['edge_cut_ni'][:,0]]
                 elem_A_P = mesh.e_area[elem_i_P]
                 elem_A_P[elem_i_P<0]=0.0
                 scalarP1 = data[vname].isel(elem=elem_i_P.flatten()).load().values.T #.reshape(elem_i_P.shape)
@@ -849,13 +843,12 @@ def calc_transect_scalar(mesh, data, transects, nodeinelem=None,
                 del(elem_A_P)
                 
                 # put back the nans 
-                if 'nz1' in data.dims or 'nz_1' in data.dims:
-                    for ii, ni in enumerate(transect['edge_cut_ni'][:,0]): scalarP1[mesh.n_iz[ni]:  ,ii] = np.nan
-                elif 'nz' in data.dims:
-                    for ii, ni in enumerate(transect['edge_cut_ni'][:,0]): scalarP1[mesh.n_iz[ni]+1:,ii] = np.nan
+                if dim_vert is not None:
+                    nlev     = mesh.get_bottom_nlev('nod2', dim_vert)
+                    scalarP1 = do_bottomnan_array(scalarP1, nlev[transect['edge_cut_ni'][:,0]], 1, 0)
                     
                 # average elemental values to edge node 2
-                elem_i_P = nodeinelem[:,transects[0]['edge_cut_ni'][:,1]]
+                elem_i_P = nodeinelem[:,transect['edge_cut_ni'][:,1]]
                 elem_A_P = mesh.e_area[elem_i_P]
                 elem_A_P[elem_i_P<0]=0.0
                 scalarP2 = data[vname].isel(elem=elem_i_P.flatten()).load().values.T #.reshape(elem_i_P.shape)
@@ -874,10 +867,8 @@ def calc_transect_scalar(mesh, data, transects, nodeinelem=None,
                 del(elem_A_P)
                 
                 # put back the nans based on node depth
-                if 'nz1' in data.dims or 'nz_1' in data.dims:
-                    for ii, ni in enumerate(transect['edge_cut_ni'][:,1]): scalarP2[mesh.n_iz[ni]:  ,ii] = np.nan
-                elif 'nz' in data.dims:
-                    for ii, ni in enumerate(transect['edge_cut_ni'][:,1]): scalarP2[mesh.n_iz[ni]+1:,ii] = np.nan
+                if dim_vert is not None:
+                    scalarP2 = do_bottomnan_array(scalarP2, nlev[transect['edge_cut_ni'][:,1]], 1, 0)
                 
                 # interpolate scalar vertice values onto cutting point position where
                 # cross-section intersects with edge
@@ -1472,48 +1463,48 @@ def load_zmeantransect_fesom2(mesh, data, box_list, dlat=0.5, boxname=None, do_h
         #_______________________________________________________________________
         # compute box mask index for nodes 
         n_idxin=do_boxmask(mesh,box)
+        
+        # mask in data space, when data cover only a region (load_data_fesom2(
+        # ..., box=...)) mesh vertice index of the used data points --> cluster
+        # area, bottom index and latitude are selected consistent with data
+        n_idxdat = do_boxmask_data(mesh, data, n_idxin, 'nod2')
+        if n_idxdat.size!=n_idxin.size: 
+            if do_onelem: 
+                raise ValueError(' --> do_onelem=True requires data on the full mesh, data cover only a region')
+            n_idxin = data['nodi'].values[n_idxdat]
         if do_onelem: 
             e_idxin = n_idxin[mesh.e_i].sum(axis=1)>=1  
         
         #___________________________________________________________________________
         # do zonal mean calculation either on nodes or on elements        
         # keep in mind that node area info is changing over depth--> therefor load from file 
+        # when no diag file is found the areas and bottom indices of the mesh 
+        # are used instead
         fname = data[vname].attrs['runid']+'.mesh.diag.nc'            
-        if diagpath is None:
-            if   os.path.isfile( os.path.join(data[vname].attrs['datapath'], fname) ): 
-                dname = data[vname].attrs['datapath']
-            elif os.path.isfile( os.path.join( os.path.join(os.path.dirname(os.path.normpath(data[vname].attrs['datapath'])),'1/'), fname) ): 
-                dname = os.path.join(os.path.dirname(os.path.normpath(data[vname].attrs['datapath'])),'1/')
-            elif os.path.isfile( os.path.join(mesh.path,fname) ): 
-                dname = mesh.path
-            else:
-                raise ValueError('could not find directory with...mesh.diag.nc file')
-            
-            diagpath = os.path.join(dname,fname)
-            if do_info: print(' --> found diag in directory:{}', diagpath)
-        else:
-            if os.path.isfile(os.path.join(diagpath,fname)):
-                diagpath = os.path.join(diagpath,fname)
-            elif os.path.isfile(os.path.join(os.path.join(os.path.dirname(os.path.normpath(diagpath)),'1/'),fname)) :
-                diagpath = os.path.join(os.path.join(os.path.dirname(os.path.normpath(diagpath)),'1/'),fname)
+        if diagpath is None: diagpath = data[vname].attrs['datapath']
+        diagfile = mesh.find_meshdiag(diagpath, fname=fname)
+        if do_info: print(' --> found diag file:{}'.format(diagfile))
         #___________________________________________________________________________
         # compute area weighted vertical velocities on elements
         if do_onelem:
             #_______________________________________________________________________
             # load elem area from diag file
-            if ( os.path.isfile(diagpath)):
-                mat_area = xr.open_mfdataset(diagpath, parallel=True, **kwargs)['elem_area']
+            if diagfile is not None:
+                mat_area = xr.open_mfdataset(diagfile, parallel=True, **kwargs)['elem_area']
                 mat_area = mat_area.isel(elem=e_idxin).compute()   
                 mat_area = mat_area.expand_dims({which_ddim:depth}).transpose()
-                mat_iz   = xr.open_mfdataset(diagpath, parallel=True, **kwargs)['nlevels']-1
+                mat_iz   = xr.open_mfdataset(diagfile, parallel=True, **kwargs)['nlevels']-1
                 mat_iz   = mat_iz.isel(elem=e_idxin).compute()   
-                if which_ddim=='nz1': mat_iz=mat_iz-1    
             else: 
-                raise ValueError('could not find ...mesh.diag.nc file')
+                mesh.compute_e_area()
+                mat_area = xr.DataArray(np.asarray(mesh.e_area, dtype='float64')[e_idxin], dims=['elem'])
+                mat_area = mat_area.expand_dims({which_ddim:depth}).transpose()
+                mat_iz   = np.asarray(mesh.e_iz, dtype='int32')[e_idxin]
+            if which_ddim=='nz1': mat_iz=mat_iz-1    
             
             #_______________________________________________________________________
             # create meridional bins
-            e_y   = mesh.n_y[mesh.e_i[e_idxin,:]].sum(axis=1)/3.0
+            e_y   = mesh.e_y[e_idxin]
             lat   = np.arange(np.floor(e_y.min())+dlat/2, 
                             np.ceil( e_y.max())-dlat/2, 
                             dlat)
@@ -1554,16 +1545,18 @@ def load_zmeantransect_fesom2(mesh, data, box_list, dlat=0.5, boxname=None, do_h
         else:     
             #_______________________________________________________________________
             # load vertice cluster area from diag file
-            if ( os.path.isfile(diagpath)):
-                mat_area = xr.open_mfdataset(diagpath, parallel=True, **kwargs)['nod_area'].transpose() 
+            if diagfile is not None:
+                mat_area = xr.open_mfdataset(diagfile, parallel=True, **kwargs)['nod_area'].transpose() 
                 if   'nod_n' in list(mat_area.dims): mat_area = mat_area.isel(nod_n=n_idxin).compute()  
                 elif 'nod2'  in list(mat_area.dims): mat_area = mat_area.isel(nod2=n_idxin).compute()     
                 
-                mat_iz   = xr.open_mfdataset(diagpath, parallel=True, **kwargs)['nlevels_nod2D']-1
+                mat_iz   = xr.open_mfdataset(diagfile, parallel=True, **kwargs)['nlevels_nod2D']-1
                 if   'nod_n' in list(mat_area.dims): mat_iz   = mat_iz.isel(nod_n=n_idxin).compute()
                 elif 'nod2'  in list(mat_area.dims): mat_iz   = mat_iz.isel(nod2=n_idxin).compute()   
             else: 
-                raise ValueError('could not find ...mesh.diag.nc file')
+                mesh.compute_n_area()
+                mat_area = xr.DataArray(np.asarray(mesh.n_area, dtype='float64')[:, n_idxin].T, dims=['nod2', 'nz'])
+                mat_iz   = np.asarray(mesh.n_iz, dtype='int32')[n_idxin]
             
             # data are on mid depth levels
             if which_ddim=='nz1': 
@@ -1579,7 +1572,7 @@ def load_zmeantransect_fesom2(mesh, data, box_list, dlat=0.5, boxname=None, do_h
                 
             #_______________________________________________________________________    
             # select MOC basin 
-            mat_mean = data[vname].isel(nod2=n_idxin)
+            mat_mean = data[vname].isel(nod2=n_idxdat)
             isnan = np.isnan(mat_mean.values)
             mat_mean.values[isnan] = 0.0
             mat_area.values[isnan] = 0.0
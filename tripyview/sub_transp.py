@@ -13,11 +13,18 @@ from .sub_utility  import *
 #+___COMPUTE MERIDIONAL HEATFLUX FROOM TRACER ADVECTION TROUGH BINNING_________+
 #|                                                                             |
 #+_____________________________________________________________________________+
-def calc_mhflx(mesh, data, lat, edge, edge_tri, edge_dxdy_l, edge_dxdy_r):
+def calc_mhflx(mesh, data, lat, edge=None, edge_tri=None, edge_dxdy_l=None, edge_dxdy_r=None):
     #___________________________________________________________________________
     vname_list = list(data.keys())
     vname, vname2 = vname_list[0], vname_list[1]
     
+    #___________________________________________________________________________
+    # without edge arrays take them from the mesh, they are loaded from the 
+    # mesh diag file or computed when it does not exist
+    if edge is None:
+        edge, edge_tri, edge_dxdy_l, edge_dxdy_r = mesh.get_edge_dxdy(
+                                    diagpath=data[vname].attrs.get('datapath', None))
+    
     #___________________________________________________________________________
     # Create xarray dataset
     list_dimname, list_dimsize = ['nlat'], [lat.size]
@@ -39,9 +46,8 @@ def calc_mhflx(mesh, data, lat, edge, edge_tri, edge_dxdy_l, edge_dxdy_r):
     inPW = 1.0e-15
     
     #___________________________________________________________________________
-    # coordinates of triangle centroids
-    e_x  = mesh.n_x[mesh.e_i].sum(axis=1)/3.0
-    e_y  = mesh.n_y[mesh.e_i].sum(axis=1)/3.0
+    # vector rotation coefficients of triangle centroids
+    e_rcoef = mesh.e_rcoef
     
     #___________________________________________________________________________
     # do zonal sum over latitudinal bins 
@@ -63,10 +69,12 @@ def calc_mhflx(mesh, data, lat, edge, edge_tri, edge_dxdy_l, edge_dxdy_r):
         tu2, tv2 = data[vname].values[edge_tri[1, ind], :], data[vname2].values[edge_tri[1, ind], :]
         
         # can not rotate them together
-        dum, tv1 = vec_r2g(mesh.abg, e_x[edge_tri[0, ind]], e_y[edge_tri[0, ind]], tu1, tv1)
-        dx1, dum = vec_r2g(mesh.abg, e_x[edge_tri[0, ind]], e_y[edge_tri[0, ind]], dx1, dy1)
-        dum, tv2 = vec_r2g(mesh.abg, e_x[edge_tri[1, ind]], e_y[edge_tri[1, ind]], tu2, tv2)
-        dx2, dum = vec_r2g(mesh.abg, e_x[edge_tri[1, ind]], e_y[edge_tri[1, ind]], dx2, dy2)
+        rcoef1, rcoef2 = e_rcoef[:, edge_tri[0, ind]], e_rcoef[:, edge_tri[1, ind]]
+        dum, tv1 = vec_r2g(mesh.abg, None, None, tu1, tv1, rcoef=rcoef1, axis=0)
+        dx1, dum = vec_r2g(mesh.abg, None, None, dx1, dy1, rcoef=rcoef1)
+        dum, tv2 = vec_r2g(mesh.abg, None, None, tu2, tv2, rcoef=rcoef2, axis=0)
+        dx2, dum = vec_r2g(mesh.abg, None, None, dx2, dy2, rcoef=rcoef2)
+        del(rcoef1, rcoef2)
         tv1, tv2 = tv1.T, tv2.T
         del(dum, dy1, dy2, tu1, tu2)
         
@@ -198,12 +206,19 @@ def calc_gmhflx_box(mesh, data, box_list, dlat=1.0):
 #+___COMPUTE HORIZONTAL BAROTROPIC STREAM FUNCTION TROUGH BINNING______________+
 #|                                                                             |
 #+_____________________________________________________________________________+
-def calc_hbarstreamf(mesh, data, lon, lat, edge, edge_tri, edge_dxdy_l, edge_dxdy_r):
+def calc_hbarstreamf(mesh, data, lon, lat, edge=None, edge_tri=None, edge_dxdy_l=None, edge_dxdy_r=None):
     
     #___________________________________________________________________________
     vname_list = list(data.keys())
     vname, vname2 = vname_list[0], vname_list[1]
     
+    #___________________________________________________________________________
+    # without edge arrays take them from the mesh, here the normal vectors of 
+    # the left and right element cross vectors are needed
+    if edge is None:
+        edge, edge_tri, edge_dxdy_l, edge_dxdy_r = mesh.get_edge_dxdy(do_normvec=True, 
+                                    diagpath=data[vname].attrs.get('datapath', None))
+    
     #___________________________________________________________________________
     # Create xarray dataset
     list_dimname, list_dimsize = ['nlon','nlat'], [lon.size, lat.size]
@@ -12,6 +12,8 @@ import shapefile as shp
 
 import json
 
+from   .sub_mesh import compute_boundary_edges, compute_boundary_polygons
+
 
 #
 #
@@ -258,7 +260,10 @@ def do_elem_smoothing(mesh, data_orig, e_nghbr_e, weaksmth_boxlist, rel_cent_wei
 #+___CALCULATE BASIN LIMITED DOMAIN____________________________________________+
 #| to calculate the regional moc (amoc,pmoc,imoc) the domain needs be limited  |
 #| to corresponding basin. here the elemental index of the triangels in the    |
-#| closed basin is calcualted                                                  |
+#| closed basin is calcualted. The outer coastline starts at the most northern |
+#| boundary edge, boundary edges are sorted after their second vertice (like   |
+#| sortrows), which decides about the path at pinch points. When the coastline |
+#| does not close a ValueError is raised.                                      |
 #+_____________________________________________________________________________+
 def calc_basindomain(mesh,box_moc,do_output=False):
     
@@ -291,99 +296,24 @@ def calc_basindomain(mesh,box_moc,do_output=False):
     #___________________________________________________________________________
     # 2nd. select main ocean basin cluster for either atlantic or pacific by finding 
     # the outer coastline of the main basin
-    edge    = np.concatenate((allbox_elem[:,[0,1]], allbox_elem[:,[0,2]], allbox_elem[:,[1,2]]),axis=0)
-    edge    = np.sort(edge,axis=1) 
+    bnde    = compute_boundary_edges(allbox_elem)
     
     # python  sortrows algorythm --> matlab equivalent
-    # twice as fast as list sorting
-    sortidx = np.lexsort((edge[:,0],edge[:,1]))
-    edge    = edge[sortidx,:].squeeze()
-    edge    = np.array(edge)
-    
-    # list sorting
-    #edge    = edge.tolist()
-    #edge.sort()
-    #edge    = np.array(edge)
-        
-    idx     = np.diff(edge,axis=0)==0
-    idx     = np.all(idx,axis=1)
-    idx     = np.logical_or(np.concatenate((idx,np.array([False]))),np.concatenate((np.array([False]),idx)))
-        
-    # all outer ocean edges that belong to preselected boxes defined domain
-    bnde    = edge[idx==False,:]
-    nbnde    = bnde.shape[0];
+    bnde    = bnde[np.lexsort((bnde[:,0],bnde[:,1])),:]
     
     # find most northern ocean edge and start from there
     maxi = np.argmax(mesh.nodes_2d_yg[bnde].sum(axis=1)/2)
     
-    #fig = plt.figure(figsize=[10,5])
-    #plt.plot(mesh.nodes_2d_xg[np.unique(bnde.flatten())],mesh.nodes_2d_yg[np.unique(bnde.flatten())],'*')
-    #plt.plot(mesh.nodes_2d_xg[np.unique(bnde[maxi].flatten())],mesh.nodes_2d_yg[np.unique(bnde[maxi].flatten())],'*',color='red')
-    #plt.axis('scaled')
-    #plt.title('Outer boundary edges')
-    #plt.show()
-    #fig.canvas.draw()
-    
     #___________________________________________________________________________
     # start with on outer coastline edge and find the next edge that is 
     # connected and so forth, like that build entire outer coastline of the main 
     # basin
+    ocebasin_polyg = compute_boundary_polygons(bnde, allbox_elem.max()+1, start=maxi, do_first=True)[0]
+    if ocebasin_polyg[0]!=ocebasin_polyg[-1]: 
+        raise ValueError(' --> outer coastline of basin box_moc={} is not closed'.format(str(box_moc.tolist())))
+    ocebasin_polyg = np.vstack((mesh.nodes_2d_xg[ocebasin_polyg], 
+                                mesh.nodes_2d_yg[ocebasin_polyg])).transpose()
     
-    run_cont        = np.zeros((1,nbnde+1))*np.nan
-    run_cont[0,:2]  = bnde[maxi,:] # initialise the first landmask edge
-    #run_bnde        = bnde[1:,:] # remaining edges that still need to be distributed
-    run_bnde        = np.delete(bnde, (maxi), axis=0)
-    count_init      = 1;
-    init_ind        = run_cont[0,0];
-    ind_lc_s        = 0;
-    
-    ocebasin_polyg = []
-    for ii in range(0,nbnde):
-        #_______________________________________________________________________
-        # search for next edge that contains the last node index from 
-        # run_cont
-        kk_rc = np.column_stack(np.where( run_bnde==np.int(run_cont[0,count_init]) ))
-        kk_r  = kk_rc[:,0]
-        kk_c  = kk_rc[:,1]
-        count_init  = count_init+1
-        if len(kk_c)==0 : break        
-        
-        #_______________________________________________________________________
-        if kk_c[0] == 0 :
-            run_cont[0,count_init] = run_bnde[kk_r[0],1]
-        else:
-            run_cont[0,count_init] = run_bnde[kk_r[0],0]
-            
-        #_______________________________________________________________________
-        # if a land sea mask polygon is closed
-        if  np.any(run_bnde[kk_r[0],:] == init_ind):
-            count_init  = count_init+1
-            
-            aux_lx = mesh.nodes_2d_xg[np.int64(run_cont[0,0:count_init])];
-            aux_ly = mesh.nodes_2d_yg[np.int64(run_cont[0,0:count_init])];
-            aux_xy = np.zeros((count_init,2))
-            aux_xy[:,0] = aux_lx
-            aux_xy[:,1] = aux_ly
-            ocebasin_polyg=aux_xy
-            del aux_lx; del aux_ly; del aux_xy
-            
-            ind_lc_s = ind_lc_s+count_init+1;
-            
-            count_init = count_init+1
-            aux_ind  = np.arange(0,run_bnde.shape[0],1)
-            run_bnde = run_bnde[aux_ind!=kk_r[0],:]
-            if np.size(run_bnde)==0:
-                break
-                
-            #___________________________________________________________________
-            run_cont        = np.zeros((1,nbnde))*np.nan
-            run_cont[0,:2]  = run_bnde[0,:]
-            run_bnde        = run_bnde[1:,:]
-            count_init=1;
-        else:
-            aux_ind =np.arange(0,run_bnde.shape[0],1)
-            run_bnde=run_bnde[aux_ind!=kk_r[0],:]
-            
     #___________________________________________________________________________
     # check which preselected triangle centroids are within main ocean basin 
     # polygon 
@@ -611,31 +541,37 @@ def calc_basindomain_fast(mesh, which_moc='amoc', do_onelem=True, exclude_medito
 #_______________________________________________________________________________
 def do_boxmask(mesh, box, do_elem=False):
     #___________________________________________________________________________
-    if do_elem: mesh_x, mesh_y = mesh.n_x[mesh.e_i].sum(axis=1)/3.0, mesh.n_y[mesh.e_i].sum(axis=1)/3.0
+    if do_elem: mesh_x, mesh_y = mesh.e_x, mesh.e_y
     else      : mesh_x, mesh_y = mesh.n_x, mesh.n_y
     
     #___________________________________________________________________________
     # a rectangular box is given --> translate into shapefile object
     if  box is None or box is 'global': # if None do global
         idx_IN = np.ones((mesh_x.shape),dtype=bool)
+    
+    # a boolean index mask of the vertices/elements is given
+    elif isinstance(box, np.ndarray) and box.dtype==bool:
+        if box.shape!=mesh_x.shape:
+            raise ValueError(' boolean index mask has wrong size must be {}, yours is {}'.format(str(mesh_x.size), str(box.size)))
+        idx_IN = box.copy()
         
     elif  (isinstance(box,list) or isinstance(box, np.ndarray)) and len(box)==4: 
         px     = [box[0], box[1], box[1], box[0], box[0]]
         py     = [box[2], box[2], box[3], box[3], box[2]]
         p      = Polygon(list(zip(px,py)))
-        idx_IN = contains(p, mesh_x, mesh_y)
+        idx_IN = _do_contains_mesh(mesh, p, mesh_x, mesh_y, do_elem)
             
     # a polygon as list or ndarray is given --> translate into shape file object
     elif isinstance(box,list) and len(box)==2: 
         px, py = box[0], box[1]  
         p      = Polygon(list(zip(px,py)))  
-        idx_IN = contains(p, mesh_x, mesh_y)
+        idx_IN = _do_contains_mesh(mesh, p, mesh_x, mesh_y, do_elem)
             
     elif isinstance(box, np.ndarray): 
         if box.shape[0]==2:
             px, py = list(box[0,:]), list(box[1,:])
             p      = Polygon(list(zip(px,py)))
-            idx_IN = contains(p, mesh_x, mesh_y)
+            idx_IN = _do_contains_mesh(mesh, p, mesh_x, mesh_y, do_elem)
                 
         else:
             raise  ValueError(' ndarray box has wrong format must be [2 x npts], yours is {}'.format(str(box.shape)))
@@ -643,12 +579,12 @@ def do_boxmask(mesh, box, do_elem=False):
     # a polygon as shapefile or shapefile collection is given
     elif (isinstance(box, (Polygon, MultiPolygon))):
         if   isinstance(box, Polygon): 
-            idx_IN = contains(box, mesh_x, mesh_y)
+            idx_IN = _do_contains_mesh(mesh, box, mesh_x, mesh_y, do_elem)
                 
         elif isinstance(box, MultiPolygon):
             idx_IN = np.zeros((mesh.n2dn,), dtype=bool)
             for p in box:
-                auxidx = contains(p, mesh_x, mesh_y)
+                auxidx = _do_contains_mesh(mesh, p, mesh_x, mesh_y, do_elem)
                 idx_IN = np.logical_or(idx_IN, auxidx)
         
     elif (isinstance(box, shp.Reader)):
@@ -656,7 +592,7 @@ def do_boxmask(mesh, box, do_elem=False):
         else      : idx_IN = np.zeros((mesh.n2dn,), dtype=bool)
         for shape in box.shapes(): 
             p      = Polygon(shape.points)
-            auxidx = contains(p, mesh_x, mesh_y)
+            auxidx = _do_contains_mesh(mesh, p, mesh_x, mesh_y, do_elem)
             idx_IN = np.logical_or(idx_IN, auxidx)
     # otherwise
     else:
@@ -664,6 +600,33 @@ def do_boxmask(mesh, box, do_elem=False):
         
     #___________________________________________________________________________
     return(idx_IN) 
+
+
+
+# ___CHECK WHICH VERTICES/ELEMENTS ARE WITHIN POLYGON__________________________
+#| when the mesh has a spatial index (do_sindex=True, see mesh.compute_sindex) |
+#| only the vertices/elements within the bounding box of the polygon are       |
+#| checked, which are found by mesh.query_box, mesh.query_box_elem. Otherwise  |
+#| all vertices/elements are checked                                           |
+#| ___INPUT_________________________________________________________________   |
+#| mesh     :   fesom2 mesh object                                             |
+#| p        :   shapely Polygon                                                |
+#| mesh_x   :   array, longitude of vertices or elements                       |
+#| mesh_y   :   array, latitude of vertices or elements                        |
+#| do_elem  :   bool, mesh_x, mesh_y are element centroids                     |
+#| ___RETURNS_______________________________________________________________   |
+#| idx_IN   :   array, boolean mask of vertices/elements within polygon        |
+#|_____________________________________________________________________________|
+def _do_contains_mesh(mesh, p, mesh_x, mesh_y, do_elem):
+    if not getattr(mesh, 'do_sindex', False): return(contains(p, mesh_x, mesh_y))
+    
+    #___________________________________________________________________________
+    bnds   = p.bounds
+    if do_elem: idx = mesh.query_box_elem([bnds[0], bnds[2], bnds[1], bnds[3]])
+    else      : idx = mesh.query_box(     [bnds[0], bnds[2], bnds[1], bnds[3]])
+    idx_IN = np.zeros(mesh_x.shape, dtype=bool)
+    idx_IN[idx] = contains(p, mesh_x[idx], mesh_y[idx])
+    return(idx_IN)
     
 
 #+___EQUIVALENT OF MATLAB ISMEMBER FUNCTION___________________________________________________________+
@@ -1335,8 +1298,8 @@ class select_scatterpts_depth(object):
                 #idx = do_boxmask(self.mesh, [aux_xlim[0],aux_xlim[1],aux_ylim[0], aux_ylim[1]], do_elem=True)
                 idx = do_boxmask(self.mesh, [xmin, xmax, ymin, ymax], do_elem=True)
                 idx[self.mesh.e_pbnd_1]=False
-                self.htxt_x   = self.mesh.n_x[self.mesh.e_i[idx,:]].sum(axis=1)/3.0
-                self.htxt_y   = self.mesh.n_y[self.mesh.e_i[idx,:]].sum(axis=1)/3.0
+                self.htxt_x   = self.mesh.e_x[idx]
+                self.htxt_y   = self.mesh.e_y[idx]
                 self.htxt_v   = self.data[idx]
             else: 
                 #idx = do_boxmask(self.mesh, [aux_xlim[0],aux_xlim[1],aux_ylim[0], aux_ylim[1]], do_elem=False)
@@ -1462,8 +1425,8 @@ class select_scatterpts_depth(object):
             self.vs   = self.data[idxn]
             self.idxd = idxn
         else:     
-            self.xs   = self.mesh.n_x[self.mesh.e_i[idxe,:]].sum(axis=1)/3.0
-            self.ys   = self.mesh.n_y[self.mesh.e_i[idxe,:]].sum(axis=1)/3.0
+            self.xs   = self.mesh.e_x[idxe]
+            self.ys   = self.mesh.e_y[idxe]
             self.vs   = self.data[idxe]
             self.idxd = idxe
         self.vs_new = self.vs.copy()    
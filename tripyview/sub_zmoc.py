@@ -136,7 +136,7 @@ def calc_zmoc(mesh, data, dlat=1.0, which_moc='gmoc', do_onelem=False,
         
         #_______________________________________________________________________
         # create meridional bins --> this trick is from Nils Brückemann (ICON)
-        lat     = mesh.n_y[mesh.e_i].sum(axis=1)/3.0
+        lat     = mesh.e_y
         lat_bin = xr.DataArray(data=np.round(lat[idxin]/dlat)*dlat, dims='elem', name='lat')  
     
     #___________________________________________________________________________